@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: fails if importing main.py gets slower than the budget.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter several
+times, takes the fastest run (least noisy) and compares main's cumulative
+import time against IMPORT_TIME_BUDGET_MS. It also fails if any module that
+should load lazily (LangChain, OpenAI) is imported at startup.
+
+Usage: python benchmarks/import_time.py [--budget-ms 1000] [--runs 5] [--top 10]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# These must only be imported when an LLM feature is first used
+LAZY_MODULES = ("langchain_openai", "langchain_core", "openai", "requests")
+
+
+def measure_once() -> Tuple[int, Dict[str, int]]:
+    """Return main's cumulative import time and every top-level module's time, in µs."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name.strip()] = int(cumulative)
+    return modules["main"], modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs: List[Tuple[int, Dict[str, int]]] = [measure_once() for _ in range(args.runs)]
+    best_us, modules = min(runs, key=lambda run: run[0])
+
+    print(f"import main: best {best_us / 1000:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("Heaviest imports (cumulative):")
+    heaviest = sorted(((us, name) for name, us in modules.items() if name != "main"), reverse=True)
+    for us, name in heaviest[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = sorted({name.split(".")[0] for name in modules} & set(LAZY_MODULES))
+    if eager:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if best_us / 1000 > args.budget_ms:
+        print(f"❌ Import time {best_us / 1000:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("✅ Import time within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark and load test for the weekend planner.
+
+For each catalogue size a fresh interpreter loads main.py against a
+synthetic catalogue (see synthetic.py) and:
+
+  * micro-benchmarks fetch_candidates, score_and_rank and build_itineraries
+    separately over a synthetic request population;
+  * load-tests POST /simple/weekend-plan in-process through httpx's ASGI
+    transport at a fixed concurrency, reporting throughput and p50/p95/p99.
+
+The plan cache is disabled unless --cache is given, so every request does
+the full work. Results (with the git commit and settings) are written to a
+JSON file; pass --compare with an earlier file to print the change per
+metric. Synthetic catalogues, their catalogue generations and travel
+matrices are cached in --work-dir, so only the first run at a size (e.g.
+1000000) pays to build them.
+
+Usage:
+    python benchmarks/pipeline.py [--sizes 1000,10000,100000] [--requests 200]
+        [--concurrency 16] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_WORK_DIR = os.path.join(BACKEND_DIR, "data", "benchmarks")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# Synthetic catalogues are far denser than the bundled one, so the travel
+# matrix keeps fewer, closer neighbours to stay quick to build
+MATRIX_SETTINGS = {"TRAVEL_MATRIX_CUTOFF_KM": "2", "TRAVEL_MATRIX_NEIGHBOURS": "32"}
+
+
+def percentiles(samples: Sequence[float], unit: str = "_ms") -> Dict[str, float]:
+    """Mean and nearest-rank p50/p95/p99 of a list of samples (timings in ms by default)."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))]
+
+    return {
+        "count": len(ordered),
+        f"mean{unit}": round(sum(ordered) / len(ordered), 3),
+        f"p50{unit}": round(rank(50), 3),
+        f"p95{unit}": round(rank(95), 3),
+        f"p99{unit}": round(rank(99), 3),
+        f"max{unit}": round(ordered[-1], 3),
+    }
+
+
+def micro_benchmarks(main: Any, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Time each CPU stage separately for every request."""
+    timings: Dict[str, List[float]] = {"fetch_candidates": [], "score_and_rank": [], "build_itineraries": []}
+    candidate_counts = []
+    for body in requests:
+        inputs = main.collect_inputs(main.WeekendRequest(**body))
+
+        start = time.perf_counter_ns()
+        candidates = main.fetch_candidates(inputs)
+        fetched = time.perf_counter_ns()
+        ranked = main.score_and_rank(candidates, inputs)
+        scored = time.perf_counter_ns()
+        main.build_itineraries(ranked, inputs)
+        built = time.perf_counter_ns()
+
+        timings["fetch_candidates"].append((fetched - start) / 1e6)
+        timings["score_and_rank"].append((scored - fetched) / 1e6)
+        timings["build_itineraries"].append((built - scored) / 1e6)
+        candidate_counts.append(len(candidates))
+
+    results: Dict[str, Any] = {stage: percentiles(samples) for stage, samples in timings.items()}
+    results["candidates_per_request"] = percentiles(candidate_counts, unit="")
+    return results
+
+
+async def load_test(main: Any, requests: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """POST every request through the ASGI app with at most `concurrency` in flight."""
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark", timeout=60) as client:
+        async def send(body: Dict[str, Any]) -> None:
+            async with slots:
+                start = time.perf_counter()
+                response = await client.post("/simple/weekend-plan", json=body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(body) for body in requests))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(statuses.get("200", 0) / elapsed, 2),
+        "status_counts": statuses,
+        "latency": percentiles(latencies),
+    }
+
+
+def run_worker(size: int, request_count: int, concurrency: int, seed: int, work_dir: str) -> Dict[str, Any]:
+    """Benchmark one catalogue size; runs in its own interpreter because main loads the catalogue at import."""
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from synthetic import synthetic_requests, write_catalogue
+
+    catalogue_path = write_catalogue(size, os.path.join(work_dir, f"venues-{size}-{seed}.json"), seed)
+    os.environ["VENUE_CATALOGUE_PATH"] = catalogue_path
+    os.environ["TRAVEL_MATRIX_DIR"] = os.path.join(work_dir, "travel_matrix")
+    os.environ["CATALOGUE_DIR"] = os.path.join(work_dir, f"catalogue-{size}-{seed}")
+
+    started = time.perf_counter()
+    import main
+    startup_s = time.perf_counter() - started
+
+    requests = synthetic_requests(request_count, seed)
+    # Warm-up: first-touch page faults and lazily built caches
+    micro_benchmarks(main, requests[:min(10, len(requests))])
+
+    return {
+        "venues": size,
+        "startup_s": round(startup_s, 3),
+        "micro": micro_benchmarks(main, requests),
+        "load": asyncio.run(load_test(main, requests, concurrency)),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(prefix: str, value: Any, into: Dict[str, float]) -> Dict[str, float]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(f"{prefix}.{key}" if prefix else key, item, into)
+    elif isinstance(value, (int, float)):
+        into[prefix] = value
+    return into
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Print timing and throughput changes for every size present in both runs."""
+    print(f"\nChange vs {baseline.get('commit', '?')} (negative ms / positive rps is better):")
+    previous_runs = {run["venues"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        previous = previous_runs.get(run["venues"])
+        if previous is None:
+            continue
+        before, after = flatten("", previous, {}), flatten("", run, {})
+        for metric in sorted(after):
+            if metric in before and (metric.endswith("_ms") or metric.endswith("_rps")) and before[metric]:
+                change = (after[metric] - before[metric]) / before[metric] * 100
+                print(f"  {run['venues']:>8} {metric:<40} {before[metric]:>10.2f} -> {after[metric]:>10.2f} ({change:+.1f}%)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated catalogue sizes")
+    parser.add_argument("--requests", type=int, default=200, help="synthetic requests per size")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the plan cache enabled")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where synthetic catalogues and matrices are kept")
+    parser.add_argument("--output", help="results file (default benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        result = run_worker(args.worker, args.requests, args.concurrency, args.seed, args.work_dir)
+        print(json.dumps(result))
+        return 0
+
+    env = dict(os.environ, **MATRIX_SETTINGS)
+    if not args.cache:
+        env["PLAN_CACHE_TTL_SECONDS"] = "0"
+    settings = {name: env.get(name) for name in (
+        "SCORING_MODE", "PLAN_EXECUTOR", "PLAN_EXECUTOR_WORKERS", "PLAN_CACHE_TTL_SECONDS", "STORE_BACKEND", *MATRIX_SETTINGS
+    )}
+
+    runs = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        print(f"Benchmarking {size} venues...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(size), "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--seed", str(args.seed), "--work-dir", args.work_dir],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            return completed.returncode
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        runs.append(run)
+        load = run["load"]
+        print(
+            f"  {size:>8} venues: fetch p50 {run['micro']['fetch_candidates']['p50_ms']} ms, "
+            f"score p50 {run['micro']['score_and_rank']['p50_ms']} ms, "
+            f"build p50 {run['micro']['build_itineraries']['p50_ms']} ms | "
+            f"{load['throughput_rps']} req/s, p50 {load['latency']['p50_ms']} ms, "
+            f"p95 {load['latency']['p95_ms']} ms, p99 {load['latency']['p99_ms']} ms",
+            file=sys.stderr,
+        )
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "settings": settings,
+        "runs": runs,
+    }
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"pipeline-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
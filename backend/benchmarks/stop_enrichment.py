@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Enrichment benchmark: one LLM call per stop, in turn, vs the enrichment
+stage's concurrent, batched and cached calls.
+
+Runs offline against the fake backend with a simulated per-prompt latency,
+over plans made of synthetic stops (3 plans of up to 4 stops per request,
+as the planner builds them). The cached pass repeats the same requests.
+
+Usage: python benchmarks/stop_enrichment.py [requests] [latency_ms]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enrichment import Enricher, FakeBackend, StopRequest, age_bucket  # noqa: E402
+from main import ActivityStop, WeekendPlan  # noqa: E402
+from stores import MemoryStore  # noqa: E402
+
+PLAN_TYPES = ("outdoor_adventure", "indoor_discovery", "mixed_experience")
+
+
+def synthetic_plans(request: int):
+    return [
+        WeekendPlan(
+            type=plan_type,
+            title=plan_type,
+            stops=[
+                ActivityStop(
+                    name=f"Venue {request * 7 + plan * 3 + stop}", category="Parks & Playgrounds", time="10:00-11:00",
+                    cost=0, note="", travelTime=10, timeBreakdown="", topTips=[], pros=[], cons=[],
+                )
+                for stop in range(4)
+            ],
+            totalCost=0, totalDuration="4 hours", totalTravelTime=30, estimatedSpend=0,
+        )
+        for plan, plan_type in enumerate(PLAN_TYPES)
+    ]
+
+
+async def sequential(backend: FakeBackend, requests: list) -> None:
+    for plans in requests:
+        for plan in plans:
+            for stop in plan.stops:
+                await backend.complete([StopRequest(stop.name, stop.category, stop.location, age_bucket(14), plan.type)])
+
+
+async def enriched(enricher: Enricher, requests: list) -> None:
+    await asyncio.gather(*(enricher.enrich_plans(plans, 14) for plans in requests))
+
+
+def main() -> None:
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+    requests = [synthetic_plans(request) for request in range(request_count)]
+    backend = FakeBackend(latency_ms=latency_ms)
+    enricher = Enricher(backend, MemoryStore("stop_enrichments", capacity=100000, ttl_seconds=3600))
+
+    for label, run in (
+        ("sequential, one stop per call", lambda: sequential(backend, requests)),
+        ("concurrent + batched", lambda: enriched(enricher, requests)),
+        ("cached (repeat requests)", lambda: enriched(enricher, requests)),
+    ):
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"{label:<32} {elapsed_ms:>10.1f} ms total  {elapsed_ms / request_count:>8.1f} ms/request")
+    print(f"Prompts sent by the enrichment stage: {enricher.prompts}")
+
+
+if __name__ == "__main__":
+    main()
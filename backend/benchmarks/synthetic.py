@@ -0,0 +1,121 @@
+"""
+Synthetic data for the benchmarks: venue catalogues and WeekendRequest
+populations around Greater London.
+
+Venues cluster around town centres, the way real catalogues do, with a
+uniform background scattered between them. Requests use postcodes from the
+geocoder's CSV so every family resolves to a real origin among the venues.
+Everything is seeded, so the same arguments always produce the same data.
+"""
+
+import csv
+import json
+import os
+import random
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POSTCODES_PATH = os.path.join(BACKEND_DIR, "data", "postcodes.csv")
+
+# Greater London bounding box
+MIN_LAT, MAX_LAT = 51.28, 51.70
+MIN_LON, MAX_LON = -0.51, 0.33
+TOWN_CENTRES = 60
+CLUSTERED_SHARE = 0.7
+CLUSTER_SPREAD_DEGREES = 0.02
+
+CATEGORIES = [
+    "Parks & Playgrounds",
+    "Nature Walks",
+    "Farm Visits",
+    "Cafes & Restaurants",
+    "Museums & Galleries",
+    "Soft Play Centers",
+    "Educational Centers",
+    "Sports Activities",
+    "Libraries",
+    "Swimming Pools",
+]
+# A few shared patterns, as in real catalogues; None is always open
+OPENING_HOURS = [
+    None,
+    "Mo-Su 07:00-20:00",
+    "Mo-Su 10:00-17:30",
+    "Mo-Sa 08:00-18:00; Su 09:00-17:00",
+    "Mo-Fr 09:30-12:00; Sa 09:00-13:00",
+    "Tu-Su 10:00-16:00",
+]
+TRANSPORT_MODES = ["car"] * 4 + ["public"] * 3 + ["walking"] * 2 + ["cycling"]
+
+
+def synthetic_venues(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Venue records in the catalogue's JSON format."""
+    rng = random.Random(seed)
+    centres = [(rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LON, MAX_LON)) for _ in range(TOWN_CENTRES)]
+    venues = []
+    for i in range(count):
+        if rng.random() < CLUSTERED_SHARE:
+            centre_lat, centre_lon = rng.choice(centres)
+            lat = rng.gauss(centre_lat, CLUSTER_SPREAD_DEGREES)
+            lon = rng.gauss(centre_lon, CLUSTER_SPREAD_DEGREES * 1.6)
+        else:
+            lat = rng.uniform(MIN_LAT, MAX_LAT)
+            lon = rng.uniform(MIN_LON, MAX_LON)
+        category = rng.choice(CATEGORIES)
+        venues.append({
+            "name": f"{category.split()[0]} {i}",
+            "category": category,
+            "location": f"{rng.randint(1, 300)} Synthetic Road",
+            "lat": round(lat, 6),
+            "lon": round(lon, 6),
+            "cost_estimate": rng.choice([0, 0, 0, 5, 8, 10, 12, 15, 20, 25, 30]),
+            "baby_friendly_score": round(rng.uniform(0.4, 1.0), 2),
+            "weather_suitable": rng.random() < 0.9,
+            "stroller_accessible": rng.random() < 0.8,
+            "opening_hours": rng.choice(OPENING_HOURS),
+        })
+    return venues
+
+
+def write_catalogue(count: int, path: str, seed: int = 0) -> str:
+    """Write a synthetic catalogue to path (reused if it already exists)."""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(synthetic_venues(count, seed), f)
+        os.replace(tmp_path, path)
+    return path
+
+
+def sample_postcodes(path: str = POSTCODES_PATH) -> List[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["pcds"] for row in csv.DictReader(f)]
+
+
+def synthetic_requests(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """WeekendRequest bodies for a population of families."""
+    rng = random.Random(seed)
+    postcodes = sample_postcodes()
+    requests = []
+    for i in range(count):
+        children = [{"ageYears": rng.randint(0, 2), "ageMonths": rng.randint(0, 11)} for _ in range(rng.choice([1, 1, 1, 2]))]
+        liked = rng.sample(CATEGORIES, rng.randint(0, 3))
+        disliked = rng.sample([category for category in CATEGORIES if category not in liked], rng.randint(0, 2))
+        start_hour = rng.choice([8, 9, 9, 10])
+        requests.append({
+            "userId": f"bench-{seed}-{i}",
+            "children": children,
+            "postcode": rng.choice(postcodes),
+            "maxTravelTime": rng.choice([15, 20, 30, 30, 45, 60]),
+            "transportMode": rng.choice(TRANSPORT_MODES),
+            "budget": rng.choice([20, 30, 40, 50, 60, 80, 100, 150]),
+            "startTime": f"2024-06-08T{start_hour:02d}:00:00",
+            "endTime": f"2024-06-08T{start_hour + rng.choice([6, 7, 8]):02d}:00:00",
+            "activityPreferences": {
+                "likedActivities": liked,
+                "dislikedActivities": disliked,
+                "eatOut": rng.random() < 0.6,
+            },
+        })
+    return requests
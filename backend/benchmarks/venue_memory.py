@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: per-venue dataclass candidates vs the slotted Venue
+record plus per-request arrays.
+
+The catalogue numbers depend on the interpreter: Python 3.11+ stores plain
+instance attributes inline, so the record saving is largest on older
+runtimes. The per-request saving holds everywhere because requests no
+longer allocate an object per venue.
+
+Usage: python benchmarks/venue_memory.py [venue_count]
+"""
+
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from venue_catalogue import CandidateSet, Venue  # noqa: E402
+
+CATEGORIES = ["Parks & Playgrounds", "Cafes & Restaurants", "Museums & Galleries", "Soft Play Centers"]
+
+
+@dataclass
+class LegacyVenueCandidate:
+    """Shape of the original per-request VenueCandidate dataclass."""
+    name: str
+    category: str
+    location: str
+    cost_estimate: int
+    baby_friendly_score: float
+    distance_km: float
+    weather_suitable: bool
+    stroller_accessible: bool
+    travel_time_minutes: int
+    booking_url: Optional[str] = None
+    score: float = 0.0
+
+
+def build_venues(count: int):
+    return [
+        Venue(
+            name=f"Venue {i}",
+            category=CATEGORIES[i % len(CATEGORIES)],
+            location=f"Street {i}",
+            lat=51.0 + i * 1e-6,
+            lon=-0.3 + i * 1e-6,
+            cost_estimate=i % 40,
+            baby_friendly_score=(i % 10) / 10 + 0.05,
+            weather_suitable=True,
+            stroller_accessible=True,
+        )
+        for i in range(count)
+    ]
+
+
+def build_legacy_catalogue(count: int):
+    return [
+        LegacyVenueCandidate(
+            name=f"Venue {i}",
+            category=CATEGORIES[i % len(CATEGORIES)],
+            location=f"Street {i}",
+            cost_estimate=i % 40,
+            baby_friendly_score=(i % 10) / 10 + 0.05,
+            distance_km=0.0,
+            weather_suitable=True,
+            stroller_accessible=True,
+            travel_time_minutes=0,
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_request(venues):
+    """Old fetch_candidates: one fresh, mutable candidate object per venue."""
+    return [
+        LegacyVenueCandidate(
+            name=venue.name,
+            category=venue.category,
+            location=venue.location,
+            cost_estimate=venue.cost_estimate,
+            baby_friendly_score=venue.baby_friendly_score,
+            distance_km=i * 0.001 + 0.05,
+            weather_suitable=venue.weather_suitable,
+            stroller_accessible=venue.stroller_accessible,
+            travel_time_minutes=i % 60 + 1,
+            score=i * 0.01 + 0.05,
+        )
+        for i, venue in enumerate(venues)
+    ]
+
+
+def compact_request(venues):
+    """New fetch_candidates: shared records plus per-request columns."""
+    count = len(venues)
+    return CandidateSet(
+        venues=venues,
+        venue_ids=np.arange(count, dtype=np.int32),
+        distances_km=np.arange(count, dtype=np.float32) * 0.001 + 0.05,
+        travel_times=np.arange(count, dtype=np.int32) % 60 + 1,
+        scores=np.arange(count, dtype=np.float32) * 0.01 + 0.05,
+    )
+
+
+def measure(builder, *args) -> int:
+    """Bytes still allocated by builder(*args) while its result is alive."""
+    tracemalloc.start()
+    result = builder(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def report(label: str, legacy_bytes: int, compact_bytes: int, count: int) -> None:
+    saved = legacy_bytes - compact_bytes
+    print(f"{label}")
+    print(f"  @dataclass VenueCandidate:  {legacy_bytes / 1e6:8.2f} MB ({legacy_bytes / count:.0f} B/venue)")
+    print(f"  Venue / CandidateSet:       {compact_bytes / 1e6:8.2f} MB ({compact_bytes / count:.0f} B/venue)")
+    print(f"  Saved per 100k venues:      {saved / count * 100_000 / 1e6:8.2f} MB ({saved / max(legacy_bytes, 1):.0%})")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Venues: {count:,} (Python {sys.version.split()[0]})")
+
+    report("Catalogue records (resident once per worker)", measure(build_legacy_catalogue, count), measure(build_venues, count), count)
+
+    venues = build_venues(count)
+    report("Per-request candidates (allocated on every request)", measure(legacy_request, venues), measure(compact_request, venues), count)
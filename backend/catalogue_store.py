@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Shared, memory-mapped venue catalogue generations.
+
+Each worker process used to parse the catalogue JSON into its own venue
+records, grid and scoring columns, so memory grew with the worker count.
+Instead the catalogue is written once as flat column files, and every
+worker maps the same files read-only. The OS page cache holds a single copy
+for all of them, and venue records are only materialised for the stops a
+plan actually uses.
+
+    data/catalogue/
+        CURRENT              name of the live generation
+        <generation>/
+            manifest.json    count, column dtypes, categories, opening hours, source
+            lat.bin, lon.bin, cost_estimate.bin, ..., cells.bin
+            name.offsets.bin, name.text.bin, ...   (UTF-8 strings)
+
+A generation is named by a hash of its content and never changes once
+written. Publishing builds it in a temporary directory and renames it into
+place. Then it builds the generation's travel matrix. Only after that does it
+replace CURRENT with an atomic rename, so readers see the old generation or
+the new one, never a mix. Workers attach to CURRENT at startup, and
+LiveCatalogue checks it every CATALOGUE_RELOAD_SECONDS, attaching and
+warming a new generation in the background before swapping it in. The
+newest CATALOGUE_KEEP_GENERATIONS generations stay on disk for workers
+still reading an older one.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence as SequenceABC
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from opening_hours import parse_opening_hours
+from scoring import MAX_CATEGORIES, VenueColumns
+from travel_matrix import TravelMatrix, load_travel_matrix
+from venue_catalogue import DEFAULT_CATALOGUE_PATH, CatalogueArrays, Venue, VenueCatalogue, grid_index
+from weather import OUTDOOR_CATEGORIES
+
+try:
+    import fcntl
+except ImportError:  # Windows: publishing is not guarded against concurrent builders
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_CATALOGUE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalogue")
+CURRENT_FILE = "CURRENT"
+
+# Columns written while venues stream in; little endian so files are portable
+RECORD_COLUMNS = {
+    "lat": "<f8",
+    "lon": "<f8",
+    "cost_estimate": "<i4",
+    "baby_friendly_score": "<f8",
+    "weather_suitable": "|b1",
+    "stroller_accessible": "|b1",
+    "category_code": "|i1",
+    "hours_id": "<i4",
+}
+TEXT_COLUMNS = ("name", "location", "booking_url")
+
+# Columns derived once every venue is written
+DERIVED_COLUMNS = {
+    "outdoor": "|b1",
+    "cells": "<i4",
+    "cell_indptr": "<i8",
+    "cell_venues": "<i4",
+}
+
+# Venues buffered per column before being appended to its file
+WRITE_CHUNK = 10000
+
+# Venue records kept materialised per worker (a few hundred bytes each)
+RECORD_CACHE_SIZE = int(os.getenv("CATALOGUE_RECORD_CACHE_SIZE", "16384"))
+
+
+def _read_column(path: str, dtype: str) -> np.ndarray:
+    """Map a column file read-only (an empty file cannot be mapped)."""
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.asarray(np.memmap(path, dtype=dtype, mode="r"))
+
+
+class VenueRecords(SequenceABC):
+    """Read-only sequence of Venue records, materialised from the columns on access."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: List[str], hours: List[Optional[str]]):
+        # Memoryviews index straight to Python values, several times faster than NumPy scalars
+        views = {name: memoryview(values) for name, values in columns.items()}
+        self._lat, self._lon = views["lat"], views["lon"]
+        self._cost_estimate, self._baby_friendly_score = views["cost_estimate"], views["baby_friendly_score"]
+        self._weather_suitable, self._stroller_accessible = views["weather_suitable"], views["stroller_accessible"]
+        self._category_codes, self._hours_ids = views["category_code"], views["hours_id"]
+        self._name_offsets, self._name_text = views["name.offsets"], views["name.text"]
+        self._location_offsets, self._location_text = views["location.offsets"], views["location.text"]
+        self._booking_url_offsets, self._booking_url_text = views["booking_url.offsets"], views["booking_url.text"]
+        self._count = len(columns["lat"])
+        self._categories = categories
+        self._hours = hours
+        # Venues near busy postcodes are read on most requests, so recent records are kept
+        self._record = lru_cache(maxsize=RECORD_CACHE_SIZE)(self._materialise)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        index = int(index)
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._record(index)
+
+    def scan(self) -> Iterator[Venue]:
+        """Every venue in order, without filling the record cache."""
+        return map(self._materialise, range(self._count))
+
+    def _materialise(self, index: int) -> Venue:
+        end = index + 1
+        # Positional: NamedTuple keyword construction is noticeably slower
+        return Venue(
+            str(self._name_text[self._name_offsets[index]:self._name_offsets[end]], "utf-8"),
+            self._categories[self._category_codes[index]],
+            str(self._location_text[self._location_offsets[index]:self._location_offsets[end]], "utf-8"),
+            self._lat[index],
+            self._lon[index],
+            self._cost_estimate[index],
+            self._baby_friendly_score[index],
+            self._weather_suitable[index],
+            self._stroller_accessible[index],
+            str(self._booking_url_text[self._booking_url_offsets[index]:self._booking_url_offsets[end]], "utf-8") or None,
+            self._hours[self._hours_ids[index]],
+        )
+
+
+class CatalogueGeneration(NamedTuple):
+    name: str
+    manifest: Dict[str, Any]
+    catalogue: VenueCatalogue
+    columns: VenueColumns
+
+
+class GenerationWriter:
+    """Streams venues into a new generation directory; finish() returns its name.
+
+    Memory stays flat however many venues are added: values are buffered for
+    WRITE_CHUNK venues at a time and appended to the column files.
+    """
+
+    def __init__(self, directory: str, source: Dict[str, Any]):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.source = source
+        self.count = 0
+        self._path = tempfile.mkdtemp(prefix=".building-", dir=directory)
+        self._files = {name: open(os.path.join(self._path, f"{name}.bin"), "wb") for name in RECORD_COLUMNS}
+        self._buffers: Dict[str, List[Any]] = {name: [] for name in RECORD_COLUMNS}
+        self._text_offsets: Dict[str, int] = {}
+        for name in TEXT_COLUMNS:
+            for part in ("offsets", "text"):
+                self._files[f"{name}.{part}"] = open(os.path.join(self._path, f"{name}.{part}.bin"), "wb")
+            self._buffers[f"{name}.offsets"] = [0]
+            self._buffers[f"{name}.text"] = []
+            self._text_offsets[name] = 0
+        self._categories: Dict[str, int] = {}
+        self._hours: Dict[Optional[str], int] = {None: 0}
+        self._digest = hashlib.sha256()
+
+    def __enter__(self) -> "GenerationWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *_: Any) -> None:
+        if exc_type is not None:
+            self.abort()
+
+    def add(self, venue: Venue) -> None:
+        category_code = self._categories.setdefault(venue.category, len(self._categories))
+        if len(self._categories) > MAX_CATEGORIES:
+            raise ValueError(f"Catalogue has more than {MAX_CATEGORIES} categories")
+        hours = venue.opening_hours or None
+        if hours not in self._hours:
+            # Fail the build, not the workers attaching to it
+            parse_opening_hours(hours)
+        hours_id = self._hours.setdefault(hours, len(self._hours))
+
+        values = {
+            "lat": venue.lat,
+            "lon": venue.lon,
+            "cost_estimate": venue.cost_estimate,
+            "baby_friendly_score": venue.baby_friendly_score,
+            "weather_suitable": venue.weather_suitable,
+            "stroller_accessible": venue.stroller_accessible,
+            "category_code": category_code,
+            "hours_id": hours_id,
+        }
+        for name, value in values.items():
+            self._buffers[name].append(value)
+        for name in TEXT_COLUMNS:
+            encoded = (getattr(venue, name) or "").encode("utf-8")
+            self._text_offsets[name] += len(encoded)
+            self._buffers[f"{name}.text"].append(encoded)
+            self._buffers[f"{name}.offsets"].append(self._text_offsets[name])
+
+        self._digest.update(json.dumps(venue, ensure_ascii=False).encode("utf-8"))
+        self._digest.update(b"\n")
+        self.count += 1
+        if self.count % WRITE_CHUNK == 0:
+            self._flush()
+
+    def add_all(self, venues: Iterable[Venue]) -> "GenerationWriter":
+        for venue in venues:
+            self.add(venue)
+        return self
+
+    def _flush(self) -> None:
+        for name, values in self._buffers.items():
+            if not values:
+                continue
+            if name.endswith(".text"):
+                self._files[name].write(b"".join(values))
+            else:
+                dtype = "<i8" if name.endswith(".offsets") else RECORD_COLUMNS[name]
+                np.asarray(values, dtype=dtype).tofile(self._files[name])
+            values.clear()
+
+    def _column(self, name: str) -> np.ndarray:
+        return _read_column(os.path.join(self._path, f"{name}.bin"), RECORD_COLUMNS[name])
+
+    def _derive(self) -> None:
+        """Write the scoring and grid columns, reading the record columns back from disk."""
+        outdoor_codes = np.array(sorted(code for category, code in self._categories.items() if category in OUTDOOR_CATEGORIES), dtype=np.int8)
+        derived = {
+            "outdoor": np.isin(self._column("category_code"), outdoor_codes),
+        }
+        cells, cell_indptr, cell_venues = grid_index(self._column("lat"), self._column("lon"))
+        derived.update(cells=cells, cell_indptr=cell_indptr, cell_venues=cell_venues)
+        for name, values in derived.items():
+            values.astype(DERIVED_COLUMNS[name]).tofile(os.path.join(self._path, f"{name}.bin"))
+
+    def finish(self) -> str:
+        """Complete the generation and move it into place; returns its name."""
+        self._flush()
+        for f in self._files.values():
+            f.close()
+        self._derive()
+
+        name = self._digest.hexdigest()[:16]
+        manifest = {
+            "format": FORMAT_VERSION,
+            "generation": name,
+            "count": self.count,
+            "created_at": time.time(),
+            "source": self.source,
+            "categories": list(self._categories),
+            "hours": list(self._hours),
+            "columns": {**RECORD_COLUMNS, **DERIVED_COLUMNS},
+        }
+        with open(os.path.join(self._path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        target = os.path.join(self.directory, name)
+        if os.path.exists(target):
+            # Same content as an existing generation: keep it, but record
+            # this source so the next ensure_catalogue sees it as current
+            existing = dict(read_manifest(self.directory, name), source=self.source)
+            with open(os.path.join(self._path, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(existing, f, indent=2)
+            os.replace(os.path.join(self._path, "manifest.json"), os.path.join(target, "manifest.json"))
+            shutil.rmtree(self._path)
+        else:
+            os.rename(self._path, target)
+        return name
+
+    def abort(self) -> None:
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self._path, ignore_errors=True)
+
+
+def current_generation(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(directory: str, generation: str) -> Dict[str, Any]:
+    with open(os.path.join(directory, generation, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def attach(directory: str, generation: str) -> CatalogueGeneration:
+    """Map a generation's columns read-only and wrap them as a catalogue plus scoring columns."""
+    manifest = read_manifest(directory, generation)
+    if manifest["format"] != FORMAT_VERSION:
+        raise ValueError(f"Catalogue generation {generation} has format {manifest['format']}, expected {FORMAT_VERSION}")
+    path = os.path.join(directory, generation)
+    columns = {name: _read_column(os.path.join(path, f"{name}.bin"), dtype) for name, dtype in manifest["columns"].items()}
+    for name in TEXT_COLUMNS:
+        columns[f"{name}.offsets"] = _read_column(os.path.join(path, f"{name}.offsets.bin"), "<i8")
+        columns[f"{name}.text"] = _read_column(os.path.join(path, f"{name}.text.bin"), "|u1")
+
+    categories, hours = manifest["categories"], manifest["hours"]
+    venues = VenueRecords(columns, categories, hours)
+    arrays = CatalogueArrays(
+        lat=columns["lat"],
+        lon=columns["lon"],
+        cells=columns["cells"].reshape(-1, 2),
+        cell_indptr=columns["cell_indptr"],
+        cell_venues=columns["cell_venues"],
+        hours_ids=columns["hours_id"],
+        hours=tuple(hours),
+    )
+    venue_columns = VenueColumns(
+        baby_friendly_score=columns["baby_friendly_score"],
+        cost_estimate=columns["cost_estimate"],
+        category_code=columns["category_code"],
+        weather_suitable=columns["weather_suitable"],
+        outdoor=columns["outdoor"],
+        category_codes={category: code for code, category in enumerate(categories)},
+    )
+    return CatalogueGeneration(generation, manifest, VenueCatalogue(venues, arrays), venue_columns)
+
+
+@contextlib.contextmanager
+def publish_lock(directory: str) -> Iterator[None]:
+    """Serialise builders across processes, e.g. workers starting together."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def publish(directory: str, generation: str, keep: Optional[int] = None) -> None:
+    """Make a written generation the live one: build its travel matrix, swap CURRENT, prune old generations.
+
+    Call with publish_lock held.
+    """
+    # Workers attaching to the new generation find its travel matrix ready
+    load_travel_matrix(attach(directory, generation).catalogue)
+
+    pointer = os.path.join(directory, CURRENT_FILE)
+    temporary = f"{pointer}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, pointer)
+    logger.info("Published catalogue generation %s", generation)
+    prune(directory, int(os.getenv("CATALOGUE_KEEP_GENERATIONS", "3")) if keep is None else keep)
+
+
+def prune(directory: str, keep: int) -> None:
+    """Delete all but the newest `keep` generations (never the live one).
+
+    Workers still mapped to a deleted generation keep reading it; its pages
+    are only freed once they unmap it.
+    """
+    live = current_generation(directory)
+    generations = []
+    for entry in os.scandir(directory):
+        manifest_path = os.path.join(entry.path, "manifest.json")
+        if entry.is_dir() and not entry.name.startswith(".") and os.path.exists(manifest_path):
+            generations.append((os.path.getmtime(manifest_path), entry.name))
+    generations.sort(reverse=True)
+    for _, name in generations[max(keep, 1):]:
+        if name != live:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def json_source(json_path: str) -> Dict[str, Any]:
+    """Source record for a JSON catalogue: its path and a hash of its content (not its mtime)."""
+    digest = hashlib.sha256()
+    with open(json_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"kind": "json", "path": os.path.abspath(json_path), "sha256": digest.hexdigest()}
+
+
+def publish_json(json_path: str, directory: str) -> str:
+    """Build a generation from a JSON list of venue objects and publish it."""
+    with open(json_path, encoding="utf-8") as f:
+        records = json.load(f)
+    with GenerationWriter(directory, json_source(json_path)) as writer:
+        generation = writer.add_all(Venue(**record) for record in records).finish()
+    publish(directory, generation)
+    return generation
+
+
+def ensure_catalogue(directory: str, json_path: str) -> str:
+    """Name of the live generation, publishing one from the JSON catalogue first if it is missing or stale.
+
+    A generation built from a different JSON file, or from an older copy of
+    this one, is stale. Generations published by other means stay live.
+    """
+    with publish_lock(directory):
+        generation = current_generation(directory)
+        if generation is not None:
+            source = read_manifest(directory, generation).get("source", {})
+            if source.get("kind") != "json" or source == json_source(json_path):
+                return generation
+        return publish_json(json_path, directory)
+
+
+def open_catalogue(directory: Optional[str] = None, json_path: Optional[str] = None) -> CatalogueGeneration:
+    """Attach to the live catalogue generation in CATALOGUE_DIR, publishing VENUE_CATALOGUE_PATH first if needed."""
+    directory = directory or os.getenv("CATALOGUE_DIR") or DEFAULT_CATALOGUE_DIR
+    json_path = json_path or os.getenv("VENUE_CATALOGUE_PATH", DEFAULT_CATALOGUE_PATH)
+    generation = attach(directory, ensure_catalogue(directory, json_path))
+    logger.info("Attached catalogue generation %s (%d venues)", generation.name, len(generation.catalogue))
+    return generation
+
+
+class ServedCatalogue(NamedTuple):
+    """Everything a request reads from one generation, swapped as a unit."""
+    name: str
+    catalogue: VenueCatalogue
+    columns: VenueColumns
+    travel_matrix: TravelMatrix
+
+
+def serve(generation: CatalogueGeneration, warm: bool = False) -> ServedCatalogue:
+    if warm:
+        # Fault the mapped pages in now rather than on the first requests
+        for column in (generation.catalogue.lat, generation.catalogue.lon, *vars(generation.columns).values()):
+            if isinstance(column, np.ndarray):
+                np.add.reduce(column, dtype=np.float64)
+    travel_matrix = load_travel_matrix(generation.catalogue)
+    return ServedCatalogue(generation.name, generation.catalogue, generation.columns, travel_matrix)
+
+
+class LiveCatalogue:
+    """Serves the generation CURRENT points at, reattaching in the background when it moves on.
+
+    Requests look their generation up by name, so one that started before a
+    swap finishes on the generation it started with; the last few are kept
+    attached for that.
+    """
+
+    def __init__(self, directory: str, json_path: str, reload_seconds: float = 10.0, keep: int = 2,
+                 on_swap: Optional[Callable[[ServedCatalogue], None]] = None):
+        self.directory = directory
+        self.reload_seconds = reload_seconds
+        self.keep = keep
+        self.on_swap = on_swap
+        self.reloads = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self.current = serve(open_catalogue(directory, json_path))
+        self._recent: "OrderedDict[str, ServedCatalogue]" = OrderedDict([(self.current.name, self.current)])
+
+    def get(self, name: Optional[str] = None) -> ServedCatalogue:
+        """A generation by name (attaching it if this process has not yet), or the current one."""
+        current = self.current
+        if name is None or name == current.name:
+            return current
+        with self._lock:
+            served = self._recent.get(name)
+            if served is None:
+                try:
+                    served = self._remember(serve(attach(self.directory, name)))
+                except FileNotFoundError:
+                    logger.warning("Catalogue generation %s is gone, using %s", name, current.name)
+                    return current
+        return served
+
+    def _remember(self, served: ServedCatalogue) -> ServedCatalogue:
+        self._recent[served.name] = served
+        self._recent.move_to_end(served.name)
+        while len(self._recent) > self.keep:
+            self._recent.popitem(last=False)
+        return served
+
+    def reload_if_changed(self) -> bool:
+        """Attach and swap in a newly published generation; returns whether it did."""
+        name = current_generation(self.directory)
+        if name is None or name == self.current.name:
+            return False
+        served = serve(attach(self.directory, name), warm=True)
+        with self._lock:
+            self._remember(served)
+            # A single reference swap: requests read either the old generation or the new one
+            self.current = served
+        self.reloads += 1
+        logger.info("Now serving catalogue generation %s (%d venues)", name, len(served.catalogue))
+        if self.on_swap is not None:
+            self.on_swap(served)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Catalogue reload failed: %s", e)
+
+    def start(self) -> None:
+        """Start watching CURRENT; call from the running event loop."""
+        if self._task is None and self.reload_seconds > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.current.name,
+            "venues": len(self.current.catalogue),
+            "attached": len(self._recent),
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
+
+
+def create_live_catalogue(on_swap: Optional[Callable[[ServedCatalogue], None]] = None) -> LiveCatalogue:
+    """Build the live catalogue from CATALOGUE_* environment variables."""
+    return LiveCatalogue(
+        directory=os.getenv("CATALOGUE_DIR") or DEFAULT_CATALOGUE_DIR,
+        json_path=os.getenv("VENUE_CATALOGUE_PATH", DEFAULT_CATALOGUE_PATH),
+        reload_seconds=float(os.getenv("CATALOGUE_RELOAD_SECONDS", "10")),
+        on_swap=on_swap,
+    )
+
+
+if __name__ == "__main__":
+    directory = os.getenv("CATALOGUE_DIR") or DEFAULT_CATALOGUE_DIR
+    if len(sys.argv) >= 2 and sys.argv[1] == "publish":
+        source = sys.argv[2] if len(sys.argv) > 2 else os.getenv("VENUE_CATALOGUE_PATH", DEFAULT_CATALOGUE_PATH)
+        with publish_lock(directory):
+            name = publish_json(source, directory)
+        print(f"✅ Published catalogue generation {name} from {source} into {directory}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "status":
+        live = current_generation(directory)
+        if live is None:
+            print(f"No catalogue generation published in {directory}")
+        else:
+            manifest = read_manifest(directory, live)
+            print(f"Live generation {live}: {manifest['count']} venues from {manifest['source']}")
+    else:
+        print("Usage: python catalogue_store.py publish [venues.json] | status")
+        sys.exit(1)
@@ -0,0 +1,244 @@
+"""
+LLM-written stop descriptions for weekend plans.
+
+Plans are built with canned notes, tips, pros and cons per plan type. When
+ENRICHMENT_BACKEND is set, the enrichment stage replaces them with text
+written for each venue, the children's age and the kind of plan.
+
+Enriching one stop at a time would add seconds per plan, so the stage
+collects every stop that needs text across all plans in the request,
+answers what it can from a TTL cache keyed by (venue, age bucket, plan
+type), and sends the rest in batches of ENRICHMENT_BATCH_SIZE stops per
+prompt, with at most ENRICHMENT_CONCURRENCY prompts in flight. A stop whose
+batch fails or times out keeps its canned text.
+
+Backends: "openai" (the shared ChatOpenAI client from llm.py) and "fake",
+which writes deterministic text after an optional simulated latency, for
+offline tests and benchmarks.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from stores import Store, create_store
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_BACKENDS = ("off", "fake", "openai")
+
+# Children's ages are grouped so nearby ages share cached text
+AGE_BUCKETS = ((6, "0-6 months"), (12, "6-12 months"), (24, "12-24 months"), (36, "2-3 years"))
+OLDEST_AGE_BUCKET = "3 years and over"
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class StopRequest(NamedTuple):
+    venue: str
+    category: str
+    location: Optional[str]
+    age_bucket: str
+    plan_type: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.venue}|{self.location or ''}|{self.age_bucket}|{self.plan_type}"
+
+
+class StopText(NamedTuple):
+    note: str
+    top_tips: List[str]
+    pros: List[str]
+    cons: List[str]
+
+
+def age_bucket(avg_age_months: float) -> str:
+    for limit, label in AGE_BUCKETS:
+        if avg_age_months < limit:
+            return label
+    return OLDEST_AGE_BUCKET
+
+
+class FakeBackend:
+    """Deterministic offline backend; ENRICHMENT_FAKE_LATENCY_MS simulates a model round-trip per prompt."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+
+    async def complete(self, stops: Sequence[StopRequest]) -> List[StopText]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return [
+            StopText(
+                note=f"{stop.venue} is a lovely {stop.category.lower()} stop for children aged {stop.age_bucket}.",
+                top_tips=[f"Check {stop.venue}'s baby change facilities on arrival", "Pack a spare outfit"],
+                pros=[f"Good {stop.category.lower()} for {stop.age_bucket}"],
+                cons=["Can get busy at weekends"],
+            )
+            for stop in stops
+        ]
+
+
+class OpenAIBackend:
+    """Asks the shared chat model for every stop in a batch in one JSON-answer prompt."""
+
+    SYSTEM_PROMPT = (
+        "You are a warm, practical UK midwife helping parents plan a weekend outing with babies and toddlers. "
+        "For each numbered stop, reply with a JSON array holding one object per stop, in order, with keys "
+        '"note" (one sentence), "top_tips" (2 short tips), "pros" (1-2 items) and "cons" (1-2 items). '
+        "Reply with the JSON array only."
+    )
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+
+    async def complete(self, stops: Sequence[StopRequest]) -> List[StopText]:
+        from llm import get_chat_model
+
+        lines = [
+            f"{number}. {stop.venue} ({stop.category}{', ' + stop.location if stop.location else ''}) "
+            f"on a {stop.plan_type.replace('_', ' ')} day with children aged {stop.age_bucket}"
+            for number, stop in enumerate(stops, start=1)
+        ]
+        response = await get_chat_model(self.model, temperature=0.4).ainvoke(
+            [("system", self.SYSTEM_PROMPT), ("human", "\n".join(lines))]
+        )
+        content = response.content.strip()
+        if content.startswith("```"):
+            content = content.strip("`").removeprefix("json").strip()
+        answers = json.loads(content)
+        if not isinstance(answers, list) or len(answers) != len(stops):
+            raise ValueError(f"Expected {len(stops)} answers, got {len(answers) if isinstance(answers, list) else type(answers).__name__}")
+        return [
+            StopText(
+                note=str(answer["note"]),
+                top_tips=[str(item) for item in answer["top_tips"]],
+                pros=[str(item) for item in answer["pros"]],
+                cons=[str(item) for item in answer["cons"]],
+            )
+            for answer in answers
+        ]
+
+
+class Enricher:
+    """Fills in stop text for whole plans at once: cache first, then concurrent batched prompts."""
+
+    def __init__(self, backend: Any, cache: Store, batch_size: int = 5, concurrency: int = 8, timeout_seconds: float = 8.0):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        self.timeout_seconds = timeout_seconds
+        self.prompts = 0
+        self.failures = 0
+        self.concurrency = concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Stops already being written for another request; they wait on it instead of asking again
+        self._in_flight: Dict[str, "asyncio.Future[Optional[StopText]]"] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def _limit(self) -> asyncio.Semaphore:
+        # One limit per event loop (blocking callers each run their own)
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.concurrency), loop
+        return self._slots
+
+    async def _complete(self, batch: List[StopRequest]) -> None:
+        futures = [self._in_flight[stop.key] for stop in batch]
+        try:
+            async with self._limit():
+                self.prompts += 1
+                texts = await asyncio.wait_for(self.backend.complete(batch), timeout=self.timeout_seconds)
+            for stop, text, future in zip(batch, texts, futures):
+                self.cache.put(stop.key, text)
+                future.set_result(text)
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Enriching %d stops failed: %s", len(batch), e)
+        finally:
+            # Never leave other requests waiting, even if this one was cancelled
+            for stop, future in zip(batch, futures):
+                if not future.done():
+                    future.set_result(None)
+                self._in_flight.pop(stop.key, None)
+
+    async def texts_for(self, stops: Sequence[StopRequest]) -> Dict[str, Optional[StopText]]:
+        """Text for each distinct stop, None where the backend failed."""
+        loop = asyncio.get_running_loop()
+        texts: Dict[str, Optional[StopText]] = {}
+        waiting: Dict[str, "asyncio.Future[Optional[StopText]]"] = {}
+        missing: List[StopRequest] = []
+        for stop in stops:
+            if stop.key in texts or stop.key in waiting:
+                continue
+            cached = self.cache.get(stop.key)
+            if cached is not None:
+                texts[stop.key] = cached
+            elif stop.key in self._in_flight:
+                waiting[stop.key] = self._in_flight[stop.key]
+            else:
+                waiting[stop.key] = self._in_flight[stop.key] = loop.create_future()
+                missing.append(stop)
+
+        batches = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+        await asyncio.gather(*(self._complete(batch) for batch in batches))
+        for key, future in waiting.items():
+            texts[key] = await future
+        return texts
+
+    async def enrich_plans(self, plans: List[Any], avg_age_months: float) -> List[Any]:
+        """Copies of the WeekendPlans with enriched stop text; returns them unchanged when disabled."""
+        if not self.enabled or not plans:
+            return plans
+        bucket = age_bucket(avg_age_months)
+        requests = [
+            [StopRequest(stop.name, stop.category, stop.location, bucket, plan.type) for stop in plan.stops]
+            for plan in plans
+        ]
+        texts = await self.texts_for([stop for plan_requests in requests for stop in plan_requests])
+
+        enriched = []
+        for plan, plan_requests in zip(plans, requests):
+            stops = []
+            for stop, request in zip(plan.stops, plan_requests):
+                text = texts.get(request.key)
+                if text is not None:
+                    stop = stop.model_copy(update={"note": text.note, "topTips": text.top_tips, "pros": text.pros, "cons": text.cons})
+                stops.append(stop)
+            enriched.append(plan.model_copy(update={"stops": stops}))
+        return enriched
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__ if self.backend else "off",
+            "prompts": self.prompts,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+            "cache": self.cache.stats(),
+        }
+
+
+def create_enricher() -> Enricher:
+    """Build the enrichment stage from ENRICHMENT_* environment variables."""
+    backend_name = os.getenv("ENRICHMENT_BACKEND", "off")
+    if backend_name not in ENRICHMENT_BACKENDS:
+        raise ValueError(f"Unknown enrichment backend {backend_name!r}, expected one of {ENRICHMENT_BACKENDS}")
+    backend: Any = None
+    if backend_name == "fake":
+        backend = FakeBackend(latency_ms=float(os.getenv("ENRICHMENT_FAKE_LATENCY_MS", "0")))
+    elif backend_name == "openai":
+        backend = OpenAIBackend(model=os.getenv("ENRICHMENT_MODEL") or None)
+    return Enricher(
+        backend,
+        cache=create_store("stop_enrichments", capacity=10000, ttl_seconds=float(os.getenv("ENRICHMENT_TTL_SECONDS", str(7 * DAY_SECONDS)))),
+        batch_size=int(os.getenv("ENRICHMENT_BATCH_SIZE", "5")),
+        concurrency=int(os.getenv("ENRICHMENT_CONCURRENCY", "8")),
+        timeout_seconds=float(os.getenv("ENRICHMENT_TIMEOUT_SECONDS", "8")),
+    )
@@ -0,0 +1,222 @@
+"""
+Execution backend for CPU-heavy plan generation.
+
+Requests hand their work to a PlanExecutor instead of running it on the
+event loop. The executor bounds how much work may be running or queued,
+rejects new work with 429 when saturated and gives up waiting with 504
+after a per-request timeout, so /health and other requests stay responsive
+under load.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Iterator, Optional
+
+from fastapi import HTTPException
+
+from structured_logging import capture_context, configure_logging, run_in_context
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+class AdmittedStream:
+    """Items of an admitted streaming job.
+
+    The job's slot is taken at admission but only released by the job
+    itself, which never starts if nobody iterates the stream. Closing (or
+    dropping) a stream that was never started releases the slot here.
+    """
+
+    def __init__(self, items: AsyncGenerator[Any, None], release: Callable[[], None]):
+        self._items = items
+        self._release = release
+        self._started = False
+
+    def __aiter__(self) -> "AdmittedStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        self._started = True
+        return await self._items.__anext__()
+
+    def _release_unstarted(self) -> None:
+        if not self._started:
+            self._started = True
+            self._release()
+
+    async def aclose(self) -> None:
+        self._release_unstarted()
+        await self._items.aclose()
+
+    def __del__(self) -> None:
+        self._release_unstarted()
+
+
+class PlanExecutor:
+    """Runs pipeline functions inline, on a thread pool or on a process pool."""
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_queue: int = 16, timeout_seconds: float = 10.0):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self.timeout_seconds = timeout_seconds
+        self.in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self._thread_pool: Optional[Executor] = None
+        if mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-worker")
+            self._thread_pool = self._pool
+        elif mode == "process":
+            # Forked workers inherit a log queue nobody drains, so they set up their own
+            self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=configure_logging, initargs=(False,))
+            # Streams and jobs that use objects in this process's memory need threads
+            self._thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-stream")
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def _release(self, *_: Any) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the configured backend, applying backpressure and the timeout."""
+        return await self._run(self._pool, fn, *args)
+
+    async def run_threaded(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Like run, but never in another process, so fn may use objects held in this one."""
+        return await self._run(self._thread_pool, fn, *args)
+
+    async def _run(self, pool: Optional[Executor], fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._acquire():
+            raise HTTPException(
+                status_code=429,
+                detail="Planner is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        if pool is None:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+
+        future = asyncio.get_running_loop().run_in_executor(pool, self._in_request_context(pool, fn), *args)
+        # The slot is only freed once the work really finishes, even if the
+        # caller has already given up on it
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise HTTPException(status_code=504, detail="Plan generation timed out")
+
+    def _in_request_context(self, pool: Executor, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap fn so its log records carry the calling request's ID."""
+        if isinstance(pool, ProcessPoolExecutor):
+            return functools.partial(run_in_context, capture_context(), fn)
+        return functools.partial(contextvars.copy_context().run, fn)
+
+    def open_stream(self, fn: Callable[..., Iterator[Any]], *args: Any) -> AdmittedStream:
+        """Admit a streaming job now (raising 429 if saturated) and return its items as they are produced.
+
+        fn(*args) must return an iterator; it runs on a worker thread and each
+        item is handed to the event loop as soon as it is yielded.
+        """
+        if not self._acquire():
+            raise HTTPException(
+                status_code=429,
+                detail="Planner is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        return AdmittedStream(self._stream(fn, *args), self._release)
+
+    async def _stream(self, fn: Callable[..., Iterator[Any]], *args: Any) -> AsyncIterator[Any]:
+        if self._thread_pool is None:
+            try:
+                for item in fn(*args):
+                    yield item
+            finally:
+                self._release()
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue" = asyncio.Queue()
+        finished = object()
+        cancelled = threading.Event()
+
+        def publish(item: Any, error: Optional[BaseException] = None) -> None:
+            if not cancelled.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+
+        def produce() -> None:
+            try:
+                for item in fn(*args):
+                    if cancelled.is_set():
+                        return
+                    publish(item)
+            except BaseException as error:  # re-raised on the event loop
+                publish(None, error)
+            finally:
+                publish(finished)
+
+        future = loop.run_in_executor(self._thread_pool, contextvars.copy_context().run, produce)
+        future.add_done_callback(self._release)
+        deadline = loop.time() + self.timeout_seconds
+        try:
+            while True:
+                try:
+                    item, error = await asyncio.wait_for(queue.get(), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        self.timed_out += 1
+                    raise HTTPException(status_code=504, detail="Plan generation timed out")
+                if error is not None:
+                    raise error
+                if item is finished:
+                    return
+                yield item
+        finally:
+            # Stop the producer early if the client went away
+            cancelled.set()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        if self._thread_pool is not None and self._thread_pool is not self._pool:
+            self._thread_pool.shutdown(wait=False)
+
+
+def create_executor() -> PlanExecutor:
+    """Build the executor from PLAN_EXECUTOR_* environment variables."""
+    return PlanExecutor(
+        mode=os.getenv("PLAN_EXECUTOR", "thread"),
+        max_workers=int(os.getenv("PLAN_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        max_queue=int(os.getenv("PLAN_EXECUTOR_QUEUE", "16")),
+        timeout_seconds=float(os.getenv("PLAN_EXECUTOR_TIMEOUT_SECONDS", "10")),
+    )
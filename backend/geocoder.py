@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Offline UK postcode geocoder.
+
+An ONS/Code-Point style CSV is compiled into a sorted fixed-width binary
+file which is memory-mapped and binary-searched at lookup time, so the
+full 1.7M postcode table costs almost no resident memory per worker and
+never needs a network call.
+
+File layout (little endian):
+    header   8s magic, uint32 postcode count, uint32 outward code count
+    records  8s postcode (no space, space padded), float32 lat, float32 lon
+    outward  4s outward code (space padded), float32 lat, float32 lon
+"""
+
+import csv
+import logging
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PCGEO\x00\x01\x00"
+HEADER = struct.Struct("<8sII")
+POSTCODE_RECORD = struct.Struct("<8sff")
+OUTWARD_RECORD = struct.Struct("<4sff")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_CSV_PATH = os.path.join(DATA_DIR, "postcodes.csv")
+DEFAULT_BIN_PATH = os.path.join(DATA_DIR, "postcodes.bin")
+
+POSTCODE_COLUMNS = ("pcds", "pcd", "postcode")
+LAT_COLUMNS = ("lat", "latitude")
+LON_COLUMNS = ("long", "lon", "longitude")
+
+
+def normalise_postcode(postcode: str) -> str:
+    """Upper-case a postcode and strip all whitespace."""
+    return "".join(postcode.split()).upper()
+
+
+def outward_code(postcode: str) -> str:
+    """Outward code (e.g. 'KT1') of a full or partial postcode."""
+    parts = postcode.strip().upper().split()
+    if len(parts) > 1:
+        return parts[0]
+    compact = normalise_postcode(postcode)
+    # A full postcode always ends in a three character inward code
+    return compact[:-3] if len(compact) >= 5 else compact
+
+
+def _pick_column(fieldnames: List[str], candidates: Tuple[str, ...]) -> str:
+    lowered = {name.lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    raise ValueError(f"CSV is missing one of the columns {candidates}")
+
+
+def _read_csv(csv_path: str) -> Iterator[Tuple[str, float, float]]:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        postcode_col = _pick_column(reader.fieldnames or [], POSTCODE_COLUMNS)
+        lat_col = _pick_column(reader.fieldnames or [], LAT_COLUMNS)
+        lon_col = _pick_column(reader.fieldnames or [], LON_COLUMNS)
+        for row in reader:
+            try:
+                lat = float(row[lat_col])
+                lon = float(row[lon_col])
+            except (TypeError, ValueError):
+                continue
+            # ONS marks postcodes without a grid reference with 99.999999
+            if abs(lat) > 90 or abs(lon) > 180:
+                continue
+            yield row[postcode_col], lat, lon
+
+
+def compile_postcodes(csv_path: str = DEFAULT_CSV_PATH, bin_path: str = DEFAULT_BIN_PATH) -> int:
+    """Compile a postcode CSV into the sorted binary lookup file."""
+    records: Dict[bytes, Tuple[float, float]] = {}
+    outward_sums: Dict[bytes, List[float]] = {}
+
+    for postcode, lat, lon in _read_csv(csv_path):
+        key = normalise_postcode(postcode)
+        if not 5 <= len(key) <= 8:
+            continue
+        records[key.encode("ascii").ljust(8)] = (lat, lon)
+        sums = outward_sums.setdefault(outward_code(postcode).encode("ascii").ljust(4), [0.0, 0.0, 0])
+        sums[0] += lat
+        sums[1] += lon
+        sums[2] += 1
+
+    tmp_path = f"{bin_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), len(outward_sums)))
+        for key in sorted(records):
+            f.write(POSTCODE_RECORD.pack(key, *records[key]))
+        for key in sorted(outward_sums):
+            lat_sum, lon_sum, count = outward_sums[key]
+            f.write(OUTWARD_RECORD.pack(key, lat_sum / count, lon_sum / count))
+    # Atomic swap so running workers never map a half-written file
+    os.replace(tmp_path, bin_path)
+    return len(records)
+
+
+class PostcodeGeocoder:
+    """Read-only, memory-mapped postcode to (lat, lon) resolver."""
+
+    def __init__(self, bin_path: str):
+        self._file = open(bin_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.postcode_count, self.outward_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{bin_path} is not a compiled postcode file")
+        self._outward_offset = HEADER.size + self.postcode_count * POSTCODE_RECORD.size
+
+    def __len__(self) -> int:
+        return self.postcode_count
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def _search(self, key: bytes, base: int, count: int, record: struct.Struct) -> Optional[Tuple[float, float]]:
+        key_len = len(key)
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = base + mid * record.size
+            probe = self._map[offset:offset + key_len]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                _, lat, lon = record.unpack_from(self._map, offset)
+                return float(lat), float(lon)
+        return None
+
+    def lookup(self, postcode: str) -> Optional[Tuple[float, float]]:
+        """Exact postcode lookup."""
+        key = normalise_postcode(postcode)
+        if not 5 <= len(key) <= 8:
+            return None
+        return self._search(key.encode("ascii", "ignore").ljust(8), HEADER.size, self.postcode_count, POSTCODE_RECORD)
+
+    def lookup_outward(self, postcode: str) -> Optional[Tuple[float, float]]:
+        """Centroid of the outward code of a full or partial postcode."""
+        key = outward_code(postcode)
+        if not 2 <= len(key) <= 4:
+            return None
+        return self._search(key.encode("ascii", "ignore").ljust(4), self._outward_offset, self.outward_count, OUTWARD_RECORD)
+
+    def resolve(self, postcode: str) -> Optional[Tuple[float, float]]:
+        """Resolve a postcode, falling back to its outward code centroid."""
+        return self.lookup(postcode) or self.lookup_outward(postcode)
+
+
+def open_geocoder(csv_path: Optional[str] = None, bin_path: Optional[str] = None) -> PostcodeGeocoder:
+    """Open the compiled postcode table, compiling it first if it is missing or stale."""
+    csv_path = csv_path or os.getenv("POSTCODE_CSV_PATH", DEFAULT_CSV_PATH)
+    bin_path = bin_path or os.getenv("POSTCODE_BIN_PATH", DEFAULT_BIN_PATH)
+
+    stale = not os.path.exists(bin_path)
+    if not stale and os.path.exists(csv_path):
+        stale = os.path.getmtime(csv_path) > os.path.getmtime(bin_path)
+    if stale:
+        count = compile_postcodes(csv_path, bin_path)
+        logger.info("Compiled %d postcodes into %s", count, bin_path)
+
+    return PostcodeGeocoder(bin_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python geocoder.py build [postcodes.csv] [postcodes.bin]")
+        sys.exit(1)
+    source = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CSV_PATH
+    target = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_BIN_PATH
+    print(f"✅ Compiled {compile_postcodes(source, target)} postcodes into {target}")
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for serving the API with several worker processes.
+
+Each worker is a uvicorn process with its own module state in main.py
+(stores, caches, executor, background tasks). The venue catalogue, travel
+matrix and postcode table are memory-mapped files, so every worker shares
+one copy of them in the page cache. The master prepares them before any
+worker starts, so workers only attach.
+
+Usage: gunicorn main:app -c gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 8))))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+
+# main.py starts pools and background tasks at import, which must belong to
+# the worker that uses them, so the app is imported after forking
+preload_app = False
+
+# Workers send generation events here; only the master writes the file
+generation_log_writer = None
+
+
+def on_starting(server):
+    global generation_log_writer
+    from catalogue_store import open_catalogue
+    from geocoder import open_geocoder
+    from structured_logging import GenerationLogWriter
+
+    generation = open_catalogue()
+    open_geocoder().close()
+    server.log.info("Catalogue generation %s ready for %d workers", generation.name, workers)
+
+    generation_log_writer = GenerationLogWriter()
+    generation_log_writer.start()
+
+
+def on_exit(server):
+    if generation_log_writer is not None:
+        generation_log_writer.stop()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Streaming venue ingestion.
+
+Reads venue feeds (CSV, GeoJSON FeatureCollections, or JSON Lines /
+GeoJSON sequences) through a chain of generators and publishes the result as
+a new catalogue generation (see catalogue_store.py). The running API picks
+that generation up without a restart. The stages are:
+
+    read       one raw record at a time, whatever the feed format
+    normalise  field aliases, types, and categories mapped onto the planner's
+    geocode    postcode lookup for records without coordinates
+    dedupe     first record wins per normalised name + location
+    index      GenerationWriter appends columns, then builds the grid and travel matrix
+
+No stage holds more than one record, so memory does not grow with the size
+of the feed. The exception is the dedupe key set, which costs about 8 bytes
+per distinct venue.
+
+With --delta the feeds are applied on top of the live generation. A delta
+record replaces the venue with the same name and location, and a record with
+"deleted" set removes it. Every other venue is carried over unchanged.
+
+Usage: python ingest.py FEED [FEED ...] [--format auto|csv|geojson|jsonl] [--delta]
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+import numpy as np
+
+from catalogue_store import DEFAULT_CATALOGUE_DIR, GenerationWriter, attach, current_generation, publish, publish_lock
+from geocoder import open_geocoder
+from opening_hours import parse_opening_hours
+from venue_catalogue import Venue
+from weather import OUTDOOR_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+FEED_FORMATS = ("auto", "csv", "geojson", "jsonl")
+
+# The categories build_itineraries and the planner form work with
+PLANNER_CATEGORIES = (
+    "Parks & Playgrounds",
+    "Nature Walks",
+    "Farm Visits",
+    "Museums & Galleries",
+    "Soft Play Centers",
+    "Educational Centers",
+    "Cafes & Restaurants",
+    "Aquariums & Zoos",
+    "Swimming Pools",
+    "Libraries & Story Time",
+    "Sports Activities",
+)
+
+# Feed categories and OpenStreetMap tag values (lower case) -> planner category
+CATEGORY_ALIASES = {
+    **{category.lower(): category for category in PLANNER_CATEGORIES},
+    "park": "Parks & Playgrounds",
+    "parks": "Parks & Playgrounds",
+    "playground": "Parks & Playgrounds",
+    "garden": "Parks & Playgrounds",
+    "nature reserve": "Nature Walks",
+    "nature walk": "Nature Walks",
+    "woodland": "Nature Walks",
+    "wood": "Nature Walks",
+    "farm": "Farm Visits",
+    "city farm": "Farm Visits",
+    "petting zoo": "Farm Visits",
+    "museum": "Museums & Galleries",
+    "gallery": "Museums & Galleries",
+    "arts centre": "Museums & Galleries",
+    "soft play": "Soft Play Centers",
+    "soft play centre": "Soft Play Centers",
+    "indoor play": "Soft Play Centers",
+    "indoor play area": "Soft Play Centers",
+    "science centre": "Educational Centers",
+    "discovery centre": "Educational Centers",
+    "children's centre": "Educational Centers",
+    "cafe": "Cafes & Restaurants",
+    "café": "Cafes & Restaurants",
+    "restaurant": "Cafes & Restaurants",
+    "zoo": "Aquariums & Zoos",
+    "aquarium": "Aquariums & Zoos",
+    "swimming pool": "Swimming Pools",
+    "leisure centre": "Swimming Pools",
+    "library": "Libraries & Story Time",
+    "libraries": "Libraries & Story Time",
+    "sports centre": "Sports Activities",
+    "sports": "Sports Activities",
+    "gym": "Sports Activities",
+}
+
+# Feed column / property names (lower case) for each venue field, in order of preference
+FIELD_ALIASES = {
+    "name": ("name", "title", "venue", "venue_name"),
+    "category": ("category", "type", "leisure", "amenity", "tourism"),
+    "location": ("location", "address", "addr:full", "addr:street", "street"),
+    "postcode": ("postcode", "addr:postcode", "post_code", "postal_code"),
+    "lat": ("lat", "latitude"),
+    "lon": ("lon", "lng", "long", "longitude"),
+    "cost_estimate": ("cost_estimate", "cost", "price"),
+    "baby_friendly_score": ("baby_friendly_score", "baby_friendly"),
+    "weather_suitable": ("weather_suitable", "covered", "indoor"),
+    "stroller_accessible": ("stroller_accessible", "pram_accessible", "wheelchair"),
+    "booking_url": ("booking_url", "website", "url", "contact:website"),
+    "opening_hours": ("opening_hours", "hours"),
+    "deleted": ("deleted", "_deleted"),
+}
+
+DEFAULT_BABY_FRIENDLY_SCORE = 0.5
+TRUE_VALUES = frozenset({"true", "yes", "y", "1", "limited"})
+FALSE_VALUES = frozenset({"false", "no", "n", "0"})
+
+# Feeds are read in chunks of this many characters when streaming GeoJSON
+READ_CHUNK = 1 << 16
+
+
+class KeySet:
+    """Set of 64-bit key hashes: recent keys in a set, older ones in a sorted array (8 bytes each)."""
+
+    def __init__(self, spill_at: int = 100000):
+        self.spill_at = spill_at
+        self._recent: Set[int] = set()
+        self._sorted = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._sorted)
+
+    def __contains__(self, key: int) -> bool:
+        if key in self._recent:
+            return True
+        slot = int(np.searchsorted(self._sorted, np.uint64(key)))
+        return slot < len(self._sorted) and int(self._sorted[slot]) == key
+
+    def add(self, key: int) -> None:
+        self._recent.add(key)
+        if len(self._recent) >= self.spill_at:
+            self._sorted = np.union1d(self._sorted, np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent)))
+            self._recent.clear()
+
+
+def venue_key(name: str, location: str) -> int:
+    """Dedupe key: a 64-bit hash of the case- and whitespace-folded name and location."""
+    folded = "|".join(" ".join(part.casefold().split()) for part in (name, location or ""))
+    return int.from_bytes(hashlib.blake2b(folded.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# Stage 1: read
+
+def _json_array_items(f: TextIO, key: str) -> Iterator[Any]:
+    """Items of the top-level array under `key`, decoded one at a time from a streamed file."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_CHUNK)
+    opening = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+    while True:
+        match = opening.search(buffer)
+        if match:
+            buffer, position = buffer[match.end():], 0
+            break
+        more = f.read(READ_CHUNK)
+        if not more:
+            return
+        # Keep a tail in case the key straddles two chunks
+        buffer = buffer[-len(key) - 8:] + more
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            more = f.read(READ_CHUNK)
+            if not more:
+                raise ValueError(f"Unterminated {key!r} array")
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield item
+        position = end
+        if position > READ_CHUNK:
+            buffer, position = buffer[position:], 0
+
+
+def _detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".geojson", ".json"):
+        return "geojson"
+    if extension in (".jsonl", ".ndjson", ".geojsonl", ".geojsons"):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format")
+
+
+def read_feed(path: str, feed_format: str = "auto") -> Iterator[Dict[str, Any]]:
+    """Raw records from a feed, one at a time."""
+    feed_format = _detect_format(path) if feed_format == "auto" else feed_format
+    with open(path, newline="" if feed_format == "csv" else None, encoding="utf-8-sig") as f:
+        if feed_format == "csv":
+            yield from csv.DictReader(f)
+        elif feed_format == "geojson":
+            yield from _json_array_items(f, "features")
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Stage 2: normalise
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Lower-cased fields of a record, with a GeoJSON Feature's point geometry as lat/lon."""
+    if record.get("type") == "Feature":
+        fields = {key.lower(): value for key, value in (record.get("properties") or {}).items()}
+        geometry = record.get("geometry") or {}
+        if geometry.get("type") == "Point":
+            fields.setdefault("lon", geometry["coordinates"][0])
+            fields.setdefault("lat", geometry["coordinates"][1])
+        return fields
+    return {key.lower(): value for key, value in record.items() if key is not None}
+
+
+def _field(fields: Dict[str, Any], name: str) -> Any:
+    for alias in FIELD_ALIASES[name]:
+        value = fields.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _flag(value: Any, default: bool) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower() if value is not None else ""
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    return default
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text in ("free", "no"):
+        return 0.0
+    match = re.search(r"-?\d+(\.\d+)?", text)
+    return float(match.group()) if match else None
+
+
+def normalise_category(value: Any) -> Optional[str]:
+    """The planner category for a feed category or OSM tag value, or None."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    # "leisure=playground" style tags
+    text = text.split("=", 1)[-1].replace("_", " ")
+    return CATEGORY_ALIASES.get(text)
+
+
+def normalise(records: Iterable[Dict[str, Any]], stats: Counter) -> Iterator[Dict[str, Any]]:
+    """Map raw records onto venue fields; drops records without a name or a planner category."""
+    for record in records:
+        stats["read"] += 1
+        fields = _flatten(record)
+        name = _field(fields, "name")
+        category = normalise_category(_field(fields, "category"))
+        if not name:
+            stats["missing_name"] += 1
+            continue
+        deleted = _flag(_field(fields, "deleted"), False)
+        if category is None and not deleted:
+            stats["unknown_category"] += 1
+            continue
+
+        opening_hours = _field(fields, "opening_hours")
+        if opening_hours is not None:
+            try:
+                parse_opening_hours(str(opening_hours))
+            except ValueError:
+                stats["bad_opening_hours"] += 1
+                opening_hours = None
+
+        # Coordinates are taken as given (never pattern-matched, which would lose a minus sign)
+        try:
+            lat, lon = (float(value) if value is not None else None for value in (_field(fields, "lat"), _field(fields, "lon")))
+        except (TypeError, ValueError):
+            stats["bad_coordinates"] += 1
+            continue
+
+        postcode = _field(fields, "postcode")
+        # Unless the feed says otherwise, only indoor categories suit any weather
+        covered = _field(fields, "weather_suitable")
+        cost = _number(_field(fields, "cost_estimate"))
+        score = _number(_field(fields, "baby_friendly_score"))
+        yield {
+            "name": " ".join(str(name).split()),
+            "category": category,
+            "location": " ".join(str(_field(fields, "location") or postcode or "").split()),
+            "postcode": postcode,
+            "lat": lat,
+            "lon": lon,
+            "cost_estimate": int(round(cost)) if cost is not None else 0,
+            "baby_friendly_score": min(max(score, 0.0), 1.0) if score is not None else DEFAULT_BABY_FRIENDLY_SCORE,
+            "weather_suitable": _flag(covered, category not in OUTDOOR_CATEGORIES),
+            "stroller_accessible": _flag(_field(fields, "stroller_accessible"), True),
+            "booking_url": _field(fields, "booking_url"),
+            "opening_hours": str(opening_hours) if opening_hours is not None else None,
+            "deleted": deleted,
+        }
+
+
+# Stage 3: geocode
+
+def geocode(records: Iterable[Dict[str, Any]], stats: Counter) -> Iterator[Dict[str, Any]]:
+    """Fill in coordinates from the postcode table; drops venues that cannot be placed."""
+    geocoder = None
+    for record in records:
+        if record["deleted"]:
+            yield record
+            continue
+        lat, lon = record["lat"], record["lon"]
+        if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            if geocoder is None:
+                geocoder = open_geocoder()
+            point = geocoder.resolve(record["postcode"]) if record["postcode"] else None
+            if point is None:
+                stats["not_geocoded"] += 1
+                continue
+            stats["geocoded"] += 1
+            record["lat"], record["lon"] = point
+        yield record
+
+
+# Stage 4: dedupe
+
+def dedupe(records: Iterable[Dict[str, Any]], stats: Counter, seen: Optional[KeySet] = None) -> Iterator[Venue]:
+    """Venues in order, skipping any whose name and location were already seen (or deleted)."""
+    seen = seen if seen is not None else KeySet()
+    for record in records:
+        key = venue_key(record["name"], record["location"])
+        if key in seen:
+            stats["duplicate"] += 1
+            continue
+        seen.add(key)
+        if record["deleted"]:
+            stats["deleted"] += 1
+            continue
+        yield Venue(
+            name=record["name"],
+            category=record["category"],
+            location=record["location"],
+            lat=float(record["lat"]),
+            lon=float(record["lon"]),
+            cost_estimate=record["cost_estimate"],
+            baby_friendly_score=record["baby_friendly_score"],
+            weather_suitable=record["weather_suitable"],
+            stroller_accessible=record["stroller_accessible"],
+            booking_url=record["booking_url"],
+            opening_hours=record["opening_hours"],
+        )
+
+
+def _carried_over(venues: Iterable[Venue]) -> Iterator[Dict[str, Any]]:
+    """Venues of the base generation as normalised records, for a delta to be applied over."""
+    for venue in venues:
+        yield dict(venue._asdict(), postcode=None, deleted=False)
+
+
+# Stage 5: index
+
+def ingest(feeds: Iterable[str], directory: str = DEFAULT_CATALOGUE_DIR, feed_format: str = "auto",
+           delta: bool = False) -> Tuple[str, Counter]:
+    """Run the feeds through the pipeline and publish the result; returns the generation and stage counts."""
+    feeds = list(feeds)
+    stats: Counter = Counter()
+    with publish_lock(directory):
+        base = current_generation(directory) if delta else None
+        if delta and base is None:
+            raise ValueError(f"No live catalogue generation in {directory} to apply a delta to")
+
+        records = geocode(normalise(itertools.chain.from_iterable(read_feed(path, feed_format) for path in feeds), stats), stats)
+        if base is not None:
+            # Delta records come first, so they win over the venues they replace
+            carried = _carried_over(attach(directory, base).catalogue.venues.scan())
+            records = itertools.chain(records, carried)
+
+        source = {"kind": "ingest", "feeds": [os.path.abspath(path) for path in feeds], "base": base}
+        with GenerationWriter(directory, source) as writer:
+            generation = writer.add_all(dedupe(records, stats)).finish()
+        stats["venues"] = writer.count
+        if generation == current_generation(directory):
+            logger.info("Catalogue unchanged (generation %s)", generation)
+        else:
+            publish(directory, generation)
+    return generation, stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Stream venue feeds into a new catalogue generation")
+    parser.add_argument("feeds", nargs="+", help="CSV, GeoJSON or JSON Lines venue feeds")
+    parser.add_argument("--format", choices=FEED_FORMATS, default="auto", help="feed format (default: from the file extension)")
+    parser.add_argument("--delta", action="store_true", help="apply the feeds on top of the live generation")
+    parser.add_argument("--catalogue-dir", default=os.getenv("CATALOGUE_DIR") or DEFAULT_CATALOGUE_DIR)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generation, stats = ingest(args.feeds, args.catalogue_dir, args.format, args.delta)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"✅ Published generation {generation} with {stats['venues']} venues in {elapsed_ms:.0f}ms")
+    print("   " + ", ".join(f"{name}: {count}" for name, count in sorted(stats.items()) if name != "venues"))
@@ -0,0 +1,233 @@
+"""
+Itinerary optimiser for the weekend planner.
+
+Each plan is a small orienteering problem: starting from home at the
+family's start time, choose and order up to N venues that maximise total
+score, stay within budget, avoid nap windows and get everyone home before
+the end time. A time-limited beam search keeps latency bounded even when
+hundreds of candidates are in reach.
+"""
+
+import heapq
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from opening_hours import earliest_visit
+from venue_catalogue import CandidateSet
+
+# Candidate positions into a CandidateSet; None means the family's home
+Location = Optional[int]
+TravelFn = Callable[[Location, Location], int]
+
+BEAM_WIDTH = int(os.getenv("ITINERARY_BEAM_WIDTH", "32"))
+POOL_SIZE = int(os.getenv("ITINERARY_POOL_SIZE", "40"))
+TIME_LIMIT_MS = float(os.getenv("ITINERARY_TIME_LIMIT_MS", "50"))
+
+# Score points lost per minute spent travelling, so equal-score routes
+# prefer less time in the car
+TRAVEL_PENALTY_PER_MINUTE = 0.05
+
+
+@dataclass
+class PlanSpec:
+    type: str
+    title: str
+    categories: Optional[List[str]]  # None accepts every category
+    max_stops: int
+    visit_minutes: int
+    food_cost: int
+    note: str  # formatted with avg_age_months
+    top_tips: List[str]
+    pros: List[str]
+    cons: List[str]
+
+    def accepts(self, category: str) -> bool:
+        return self.categories is None or category in self.categories
+
+
+PLAN_SPECS = [
+    PlanSpec(
+        type="outdoor_adventure",
+        title="Outdoor Family Adventure",
+        categories=["Parks & Playgrounds", "Nature Walks", "Farm Visits"],
+        max_stops=3,
+        visit_minutes=90,
+        food_cost=20,
+        note="Perfect for {avg_age_months:.0f}-month-old children. Bring snacks and water!",
+        top_tips=["Bring sunscreen and hats", "Pack plenty of snacks", "Check for changing facilities"],
+        pros=["Free entry", "Great for exercise", "Beautiful scenery"],
+        cons=["Weather dependent", "Can be busy on weekends"],
+    ),
+    PlanSpec(
+        type="indoor_discovery",
+        title="Indoor Learning Adventure",
+        categories=["Museums & Galleries", "Soft Play Centers", "Educational Centers"],
+        max_stops=3,
+        visit_minutes=90,
+        food_cost=25,
+        note="Educational and fun for children aged {avg_age_months:.0f} months",
+        top_tips=["Book in advance if required", "Bring extra clothes", "Check for baby facilities"],
+        pros=["Weather proof", "Educational value", "Controlled environment"],
+        cons=["Can be expensive", "May be crowded", "Limited outdoor time"],
+    ),
+    PlanSpec(
+        type="mixed_experience",
+        title="Mixed Family Experience",
+        categories=None,
+        max_stops=4,
+        visit_minutes=60,
+        food_cost=30,
+        note="Varied activities perfect for family bonding",
+        top_tips=["Plan for shorter activities", "Bring snacks between stops", "Check opening times"],
+        pros=["Great variety", "Something for everyone", "Flexible timing"],
+        cons=["More travel time", "Can be tiring", "Need good planning"],
+    ),
+]
+
+
+@dataclass
+class RouteStop:
+    position: int
+    arrival: int  # minutes since midnight
+    departure: int
+    travel_in: int  # minutes from the previous stop (or home)
+    wait: int  # minutes held back for a nap window or opening time
+
+
+@dataclass
+class Route:
+    stops: List[RouteStop] = field(default_factory=list)
+    score: float = 0.0
+    cost: int = 0
+    travel_minutes: int = 0
+    home_at: int = 0
+
+
+def parse_clock(value: str) -> int:
+    """Minutes since midnight of an ISO datetime or HH:MM string."""
+    if "T" in value:
+        moment = datetime.fromisoformat(value)
+        return moment.hour * 60 + moment.minute
+    hours, minutes = value.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_windows(windows: Sequence[str]) -> List[Tuple[int, int]]:
+    """Parse "HH:MM-HH:MM" strings into sorted (start, end) minute pairs."""
+    parsed = []
+    for window in windows:
+        start, end = window.split("-")
+        parsed.append((parse_clock(start), parse_clock(end)))
+    return sorted(parsed)
+
+
+def format_clock(minutes: int) -> str:
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def _earliest_start(arrival: int, duration: int, blocked: List[Tuple[int, int]]) -> int:
+    """Push a visit later until it no longer overlaps a blocked window."""
+    for start, end in blocked:
+        if arrival < end and arrival + duration > start:
+            arrival = end
+    return arrival
+
+
+def optimise_route(
+    candidates: CandidateSet,
+    pool: Sequence[int],
+    travel: TravelFn,
+    start: int,
+    end: int,
+    budget: int,
+    blocked: List[Tuple[int, int]],
+    max_stops: int,
+    visit_minutes: int,
+    beam_width: int = BEAM_WIDTH,
+    time_limit_ms: float = TIME_LIMIT_MS,
+    open_slots: Optional[Dict[int, int]] = None,
+) -> Route:
+    """Beam search for the highest scoring feasible route over the pool.
+
+    open_slots, when given, maps each pool position to the opening-hours
+    slots (see opening_hours.py) a visit there must fit inside.
+
+    Once time_limit_ms is spent the search degrades to greedy extension of
+    the best partial route, so latency stays bounded for large pools.
+    """
+    deadline = time.perf_counter() + time_limit_ms / 1000
+    prizes = {position: float(candidates.scores[position]) for position in pool}
+    costs = {position: int(candidates.venue(position).cost_estimate) for position in pool}
+
+    # State: (objective, stops, now, cost, travel, visited)
+    beam = [(0.0, (), start, 0, 0, frozenset())]
+    best_value, best = float("-inf"), Route(home_at=start)
+
+    for _ in range(max_stops):
+        # Keep only the best state for each (visited set, current location)
+        frontier: Dict[Tuple[frozenset, Location], tuple] = {}
+        for objective, stops, now, cost, travelled, visited in beam:
+            location = stops[-1].position if stops else None
+            for position in pool:
+                if position in visited or cost + costs[position] > budget:
+                    continue
+                leg = travel(location, position)
+                ready = now + leg
+                arrival = _earliest_start(ready, visit_minutes, blocked)
+                if open_slots is not None:
+                    arrival = earliest_visit(open_slots[position], arrival, visit_minutes)
+                    if arrival is None:
+                        continue
+                departure = arrival + visit_minutes
+                home_leg = travel(position, None)
+                if departure + home_leg > end:
+                    continue
+
+                stop = RouteStop(position, arrival, departure, leg, arrival - ready)
+                value = objective + prizes[position] - TRAVEL_PENALTY_PER_MINUTE * leg
+                state = (value, stops + (stop,), departure, cost + costs[position], travelled + leg, visited | {position})
+
+                key = (state[5], position)
+                if key not in frontier or frontier[key][0] < value:
+                    frontier[key] = state
+
+                final_value = value - TRAVEL_PENALTY_PER_MINUTE * home_leg
+                if final_value > best_value:
+                    best_value = final_value
+                    best = Route(list(state[1]), value, state[3], state[4] + home_leg, departure + home_leg)
+
+            # Out of time: finish the remaining levels greedily from the best state
+            if time.perf_counter() > deadline:
+                beam_width = 1
+                break
+
+        if not frontier:
+            break
+        beam = heapq.nlargest(beam_width, frontier.values(), key=lambda state: state[0])
+
+    return best
+
+
+def plan_pool(candidates: CandidateSet, spec: PlanSpec, pool_size: int = POOL_SIZE) -> List[int]:
+    """Top scoring positive candidates a plan may choose from, best first."""
+    pool = []
+    for position in range(len(candidates)):
+        if candidates.scores[position] > 0 and spec.accepts(candidates.venue(position).category):
+            pool.append(position)
+            if len(pool) == pool_size:
+                break
+    return pool
+
+
+def estimated_cost(candidates: CandidateSet, spec: PlanSpec, pool_size: int = POOL_SIZE) -> int:
+    """Cheap upper estimate of a plan's spend: its best max_stops candidates plus food."""
+    pool = plan_pool(candidates, spec, pool_size)[:spec.max_stops]
+    return sum(candidates.venue(position).cost_estimate for position in pool) + spec.food_cost
+
+
+def specs_cheapest_first(candidates: CandidateSet, specs: Sequence[PlanSpec] = PLAN_SPECS) -> List[PlanSpec]:
+    """Plan specs ordered by estimated cost, so streaming sends the cheapest plan first."""
+    return sorted(specs, key=lambda spec: estimated_cost(candidates, spec))
@@ -0,0 +1,86 @@
+"""
+Lazily created, shared LLM and HTTP clients.
+
+langchain_openai and its dependencies take over a second to import, which
+every cold start and --reload restart used to pay even though the weekend
+pipeline never touched them. They are now imported on first use, and every
+caller shares one pooled HTTP client per process instead of opening its own
+connections.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+
+_lock = threading.RLock()
+_http_client = None
+_async_http_client = None
+_chat_models: Dict[Tuple, Any] = {}
+
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+
+
+def get_http_client():
+    """Process-wide pooled httpx.Client."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                import httpx
+
+                _http_client = httpx.Client(limits=_limits(), timeout=HTTP_TIMEOUT_SECONDS)
+    return _http_client
+
+
+def get_async_http_client():
+    """Process-wide pooled httpx.AsyncClient."""
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                import httpx
+
+                _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=HTTP_TIMEOUT_SECONDS)
+    return _async_http_client
+
+
+def get_chat_model(model: Optional[str] = None, temperature: float = 0.7, **kwargs: Any):
+    """Shared ChatOpenAI instance for this configuration, created on first use."""
+    key = (model or DEFAULT_MODEL, temperature, tuple(sorted(kwargs.items())))
+    chat_model = _chat_models.get(key)
+    if chat_model is None:
+        with _lock:
+            chat_model = _chat_models.get(key)
+            if chat_model is None:
+                from langchain_openai import ChatOpenAI
+
+                chat_model = ChatOpenAI(
+                    model=key[0],
+                    temperature=temperature,
+                    http_client=get_http_client(),
+                    http_async_client=get_async_http_client(),
+                    **kwargs,
+                )
+                _chat_models[key] = chat_model
+    return chat_model
+
+
+async def close_clients() -> None:
+    """Close the pooled HTTP clients (called on application shutdown)."""
+    global _http_client, _async_http_client
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+    _chat_models.clear()
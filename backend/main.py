@@ -1,29 +1,140 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator, AsyncIterator, Union
 import os
-import uvicorn
-from datetime import datetime, date, timedelta
-import math
+from datetime import datetime, date
+import hashlib
 import json
+import logging
 import uuid
-import requests
-from dataclasses import dataclass
+import asyncio
+import numpy as np
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
 load_dotenv()
 
-# LangChain imports
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-from langchain_core.utils import get_from_dict_or_env
+# LLM clients are created lazily on first use (see llm.py) to keep cold starts fast
+from catalogue_store import ServedCatalogue, create_live_catalogue
+from enrichment import create_enricher
+from executor import create_executor
+from geocoder import open_geocoder, outward_code
+from itinerary import PLAN_SPECS, POOL_SIZE, PlanSpec, TravelFn, format_clock, optimise_route, parse_clock, parse_windows, plan_pool, specs_cheapest_first
+from llm import close_clients
+from maps import create_map_renderer
+from metrics import StageTimer, observe_generation, registry, requests_total
+from milestones import ALL_DOMAINS, create_milestone_repository
+from opening_hours import slot_range, touched_slots
+from plan_cache import create_plan_cache
+from plan_sessions import PlanSession, create_session_store
+from scoring import VenueColumns, plan_top_k_order, score_matrix, score_terms, stale_terms, total_score
+from single_flight import Broadcast, SingleFlight
+from stores import create_store
+from structured_logging import GENERATION_LOGGER, RequestIdMiddleware, configure_logging, shutdown_logging
+from travel_matrix import transport_verb
+from venue_catalogue import DEFAULT_ORIGIN, CandidateSet, travel_radius_km
+from weather import OUTDOOR_CATEGORIES, create_weather_service, summarise
 
-# In-memory storage for simple app
-user_profiles = {}
-weekend_plans = {}
-generation_logs = {}
+# Records are queued and written by a background thread (see structured_logging.py)
+configure_logging()
+logger = logging.getLogger(__name__)
+generation_logger = logging.getLogger(GENERATION_LOGGER)
+
+# Bounded storage for simple app (backend chosen with STORE_BACKEND)
+DAY_SECONDS = 24 * 60 * 60
+user_profiles = create_store("user_profiles", capacity=10000, ttl_seconds=30 * DAY_SECONDS)
+weekend_plans = create_store("weekend_plans", capacity=1000, ttl_seconds=DAY_SECONDS)
+
+# Profiles created implicitly by collect_inputs expire sooner than real ones
+TEMPORARY_PROFILE_TTL_SECONDS = DAY_SECONDS
+
+# Venue catalogue, scoring columns and travel matrix are memory-mapped from the
+# live catalogue generation, so every worker process shares the same pages.
+# A newly published generation is attached in the background and swapped in;
+# each request pins the generation it started on (see collect_inputs).
+live_catalogue = create_live_catalogue(on_swap=lambda served: setattr(map_renderer, "catalogue", served.catalogue))
+
+# Route maps are drawn from the catalogue and cached on disk by content
+map_renderer = create_map_renderer(live_catalogue.current.catalogue)
+
+# Postcode table is memory-mapped, so every worker shares the same pages
+postcode_geocoder = open_geocoder()
+
+# Scoring backend: "python" scores one candidate at a time, "numpy" scores
+# columnar catalogue arrays and keeps only the top SCORING_TOP_K candidates
+# of each plan's categories. Batch generation always scores with the columns.
+# Plans choose from at most POOL_SIZE candidates, so a cut at least that
+# deep gives the same plans as ranking every candidate.
+SCORING_MODE = os.getenv("SCORING_MODE", "python")
+SCORING_TOP_K = max(int(os.getenv("SCORING_TOP_K", "200")), POOL_SIZE)
+PLAN_CATEGORIES = [spec.categories for spec in PLAN_SPECS]
+
+# Candidates must be open at least this long inside the family's free time
+MIN_VISIT_MINUTES = min(spec.visit_minutes for spec in PLAN_SPECS)
+
+# Batch generation: families per request, and per executor job (large
+# regions are split so their itineraries build on several workers)
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "500"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "8"))
+# Executor workers a batch never occupies, so interactive requests are still admitted
+BATCH_RESERVED_WORKERS = int(os.getenv("BATCH_RESERVED_WORKERS", "1"))
+
+# Forecasts are refreshed per region in the background; requests only read the cache
+weather_service = create_weather_service()
+
+# CPU-heavy pipeline stages run here rather than on the event loop
+plan_executor = create_executor()
+
+# Results are shared between requests with the same normalised inputs
+plan_cache = create_plan_cache()
+
+# Recent requests keep their candidates and score terms for quick re-planning
+plan_sessions = create_session_store()
+
+# Duplicate requests from one user share a response; identical cache misses share a computation
+plan_requests_in_flight = SingleFlight("requests")
+plan_computations_in_flight = SingleFlight("computations")
+
+# Responses kept for retries that repeat an Idempotency-Key
+idempotent_responses = create_store("idempotent_responses", capacity=10000, ttl_seconds=DAY_SECONDS)
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# Optional LLM-written stop text, cached per venue, age bucket and plan type
+enricher = create_enricher()
+
+# Milestones are indexed in memory by week and domain, reloaded on a version bump
+milestone_repository = create_milestone_repository()
+
+registry.gauge(
+    "weekend_plan_executor", "Plan executor occupancy and rejections", ("stat",),
+    lambda: {(key,): value for key, value in plan_executor.stats().items() if key != "mode"}
+)
+registry.gauge(
+    "weekend_plan_cache", "Plan result cache entries and hit/miss counts", ("stat",),
+    lambda: {(key,): value for key, value in plan_cache.stats().items()}
+)
+registry.gauge(
+    "weekend_plan_enrichment", "Stop enrichment prompts sent and failed", ("stat",),
+    lambda: {(key,): value for key, value in enricher.stats().items() if key in ("prompts", "failures", "in_flight")}
+)
+registry.gauge(
+    "weekend_plan_in_flight", "Coalesced plan requests and computations", ("flight", "stat"),
+    lambda: {
+        (flight.name, key): value
+        for flight in (plan_requests_in_flight, plan_computations_in_flight)
+        for key, value in flight.stats().items()
+    }
+)
+registry.gauge(
+    "weekend_planner_store", "Bounded store sizes and eviction counts", ("store", "stat"),
+    lambda: {
+        (store.name, key): value
+        for store in (user_profiles, weekend_plans, idempotent_responses)
+        for key, value in store.stats().items() if key != "backend"
+    }
+)
 
 app = FastAPI(title="Weekend Baby Explorer API")
 
@@ -36,6 +147,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Every log record from a request carries its X-Request-ID
+app.add_middleware(RequestIdMiddleware)
+
 # Pydantic models for weekend planning
 class ChildInfo(BaseModel):
     ageYears: int
@@ -88,7 +202,7 @@ class ActivityStop(BaseModel):
     note: str
     location: Optional[str] = None
     bookingUrl: Optional[str] = None
-    travelTime: int  # in minutes
+    travelTime: int  # Minutes travelling here, from home or the previous stop
     timeBreakdown: str  # detailed breakdown of activities
     topTips: List[str]
     pros: List[str]
@@ -97,6 +211,9 @@ class ActivityStop(BaseModel):
     departureTime: Optional[str] = None
     duration: Optional[int] = None
     transportDetails: Optional[Dict[str, Any]] = None
+    returnTravelTime: Optional[int] = None  # Last stop only: minutes from here back home
+    lat: Optional[float] = None
+    lon: Optional[float] = None
 
 class WeekendPlan(BaseModel):
     type: str  # "with_baby" or "parent_recharge"
@@ -112,27 +229,43 @@ class WeekendResponse(BaseModel):
     plans: List[WeekendPlan]
     generationMs: int
     weatherSummary: str
+    sessionId: Optional[str] = None  # Pass to /simple/weekend-plan/session/{id} to tweak preferences
+    travelTimesFrom: str = "home"  # "district" when the plans were cached for another home in the postcode district
 
-@dataclass
-class VenueCandidate:
-    name: str
-    category: str
-    location: str
-    cost_estimate: int
-    baby_friendly_score: float
-    distance_km: float
-    weather_suitable: bool
-    stroller_accessible: bool
-    travel_time_minutes: int
-    booking_url: Optional[str] = None
-    score: float = 0.0
+class PlanDelta(BaseModel):
+    """Changes to a session's request; omitted fields keep their current value."""
+    budget: Optional[int] = None
+    maxTravelTime: Optional[int] = None
+    likedActivities: Optional[List[str]] = None
+    dislikedActivities: Optional[List[str]] = None
+
+class WeekendBatchRequest(BaseModel):
+    requests: List[WeekendRequest]
+
+class WeekendBatchResult(BaseModel):
+    status: int  # HTTP status this request would have had on its own
+    result: Optional[WeekendResponse] = None
+    detail: Optional[str] = None
+
+class WeekendBatchResponse(BaseModel):
+    results: List[WeekendBatchResult]  # Same order as the request
+    generationMs: int
+
+def validate_limits(budget: int, max_travel_time: int) -> None:
+    """Reject budgets and travel times outside what the planner supports."""
+    if budget < 10 or budget > 200:
+        raise HTTPException(status_code=400, detail="Budget must be between £10-200")
+    
+    if max_travel_time < 10 or max_travel_time > 120:
+        raise HTTPException(status_code=400, detail="Travel time must be between 10-120 minutes")
 
 def collect_inputs(request: WeekendRequest) -> Dict[str, Any]:
     """Validate form data and perform geo lookup."""
-    print(f"Collecting inputs for user {request.userId}")
+    logger.debug("Collecting inputs for user %s", request.userId, extra={"stage": "collect_inputs"})
     
     # Create user profile if it doesn't exist (for the new flow)
-    if request.userId not in user_profiles:
+    user_profile = user_profiles.get(request.userId)
+    if user_profile is None:
         # Create a temporary user profile from the request data
         user_profile = UserProfile(
             id=request.userId,
@@ -145,17 +278,11 @@ def collect_inputs(request: WeekendRequest) -> Dict[str, Any]:
             endTime=request.endTime,
             createdAt=datetime.now()
         )
-        user_profiles[request.userId] = user_profile
-        print(f"Created temporary user profile for {request.userId}")
-    
-    user_profile = user_profiles[request.userId]
+        user_profiles.put(request.userId, user_profile, ttl_seconds=TEMPORARY_PROFILE_TTL_SECONDS)
+        logger.info("Created temporary user profile for %s", request.userId)
     
     # Basic validation
-    if request.budget < 10 or request.budget > 200:
-        raise HTTPException(status_code=400, detail="Budget must be between £10-200")
-    
-    if request.maxTravelTime < 10 or request.maxTravelTime > 120:
-        raise HTTPException(status_code=400, detail="Travel time must be between 10-120 minutes")
+    validate_limits(request.budget, request.maxTravelTime)
     
     # Calculate total child age for activity recommendations
     total_age_months = sum(child.ageYears * 12 + child.ageMonths for child in request.children)
@@ -169,10 +296,20 @@ def collect_inputs(request: WeekendRequest) -> Dict[str, Any]:
     else:
         nap_windows = ["10:00-11:30", "14:00-15:30"]
     
+    # Resolve the postcode locally, falling back to the outward code centroid
+    origin = postcode_geocoder.resolve(request.postcode)
+    if origin is None:
+        logger.warning("Could not resolve postcode %s, using default origin", request.postcode)
+        origin = DEFAULT_ORIGIN
+    
+    # Cached forecast for the family's area on the plan date (never waits on the weather service)
+    forecast = weather_service.forecast_for(outward_code(request.postcode), origin[0], origin[1], request.startTime[:10])
+    
     return {
         "user_id": request.userId,
         "children": request.children,
         "postcode": request.postcode,
+        "origin": origin,
         "budget": request.budget,
         "start_time": request.startTime,
         "end_time": request.endTime,
@@ -181,138 +318,73 @@ def collect_inputs(request: WeekendRequest) -> Dict[str, Any]:
         "activity_preferences": request.activityPreferences,
         "avg_age_months": avg_age_months,
         "nap_windows": nap_windows,
+        "outdoor_weather_ok": forecast.outdoor_ok,
+        "weather_summary": summarise(forecast),
+        "catalogue_generation": live_catalogue.current.name,
         "duration_hours": 6  # Simplified for MVP
     }
 
-def fetch_candidates(inputs: Dict[str, Any]) -> List[VenueCandidate]:
-    """Fetch venue candidates from various APIs."""
-    print(f"Fetching candidates for {inputs['postcode']}")
-    
-    # Mock data for MVP - in production, this would call real APIs
-    candidates = []
-    
-    # Parks and outdoor activities
-    candidates.extend([
-        VenueCandidate(
-            name="Bushy Park",
-            category="Parks & Playgrounds",
-            location="Hampton Court Road, Hampton",
-            cost_estimate=0,
-            baby_friendly_score=0.9,
-            distance_km=2.5,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=15
-        ),
-        VenueCandidate(
-            name="Richmond Park",
-            category="Parks & Playgrounds",
-            location="Richmond, London",
-            cost_estimate=0,
-            baby_friendly_score=0.8,
-            distance_km=4.2,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=25
-        ),
-        VenueCandidate(
-            name="Kew Gardens",
-            category="Parks & Playgrounds",
-            location="Kew, Richmond",
-            cost_estimate=18,
-            baby_friendly_score=0.7,
-            distance_km=3.8,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=22
-        )
-    ])
-    
-    # Cafes and restaurants
-    candidates.extend([
-        VenueCandidate(
-            name="Happicino Café",
-            category="Cafes & Restaurants",
-            location="Kingston High Street",
-            cost_estimate=12,
-            baby_friendly_score=0.8,
-            distance_km=1.2,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=8
-        ),
-        VenueCandidate(
-            name="The Ivy Café",
-            category="Cafes & Restaurants",
-            location="Richmond Hill",
-            cost_estimate=35,
-            baby_friendly_score=0.6,
-            distance_km=3.1,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=18
-        )
-    ])
-    
-    # Museums and indoor activities
-    candidates.extend([
-        VenueCandidate(
-            name="Horniman Museum",
-            category="Museums & Galleries",
-            location="Forest Hill, London",
-            cost_estimate=0,
-            baby_friendly_score=0.8,
-            distance_km=8.5,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=35
-        ),
-        VenueCandidate(
-            name="Science Museum",
-            category="Museums & Galleries",
-            location="South Kensington, London",
-            cost_estimate=0,
-            baby_friendly_score=0.7,
-            distance_km=12.3,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=45
-        )
-    ])
-    
-    # Soft play and indoor activities
-    candidates.extend([
-        VenueCandidate(
-            name="Tumble Tots",
-            category="Soft Play Centers",
-            location="Kingston upon Thames",
-            cost_estimate=8,
-            baby_friendly_score=0.9,
-            distance_km=1.8,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=12
-        ),
-        VenueCandidate(
-            name="Little Gym",
-            category="Sports Activities",
-            location="Richmond",
-            cost_estimate=15,
-            baby_friendly_score=0.8,
-            distance_km=3.5,
-            weather_suitable=True,
-            stroller_accessible=True,
-            travel_time_minutes=20
-        )
-    ])
+def catalogue_for(inputs: Dict[str, Any]) -> ServedCatalogue:
+    """The catalogue generation a request was pinned to when its inputs were collected."""
+    return live_catalogue.get(inputs.get('catalogue_generation'))
+
+def visit_window(inputs: Dict[str, Any]) -> Tuple[int, int]:
+    """Weekday of the plan and the 15-minute slots free for visits: the family's time window minus nap windows."""
+    start_time = inputs['start_time']
+    weekday = datetime.fromisoformat(start_time).weekday() if "T" in start_time else date.today().weekday()
+    available = slot_range(parse_clock(start_time), parse_clock(inputs['end_time']))
+    for start, end in parse_windows(inputs['nap_windows']):
+        available &= ~touched_slots(start, end)
+    return weekday, available
+
+def visitable(candidates: CandidateSet, inputs: Dict[str, Any]) -> np.ndarray:
+    """Mask of the candidates open long enough for the shortest visit within the family's free slots."""
+    weekday, available = visit_window(inputs)
+    return catalogue_for(inputs).catalogue.can_visit(candidates.venue_ids, weekday, available, MIN_VISIT_MINUTES)
+
+def reachable_candidates(inputs: Dict[str, Any]) -> CandidateSet:
+    """Venues within reach of the family's home, open or not."""
+    origin_lat, origin_lon = inputs["origin"]
+    transport_mode = inputs["transport_mode"]
+    served = catalogue_for(inputs)
+    return served.catalogue.candidates_near(
+        origin_lat,
+        origin_lon,
+        inputs["max_travel_time"],
+        transport_mode,
+        origin_minutes=served.travel_matrix.origin_row(origin_lat, origin_lon, transport_mode)
+    )
+
+def fetch_candidates(inputs: Dict[str, Any]) -> CandidateSet:
+    """Fetch venue candidates within reach of the family's home that are open when they can visit."""
+    logger.debug("Fetching candidates for %s", inputs["postcode"], extra={"stage": "fetch_candidates"})
     
-    return candidates
+    candidates = reachable_candidates(inputs)
+    return candidates.take(np.flatnonzero(visitable(candidates, inputs)))
+
+def top_candidates(columns: VenueColumns, venue_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Positions of the top SCORING_TOP_K candidates of each plan's categories, best first."""
+    return plan_top_k_order(columns, venue_ids, scores, PLAN_CATEGORIES, SCORING_TOP_K)
+
+def score_and_rank_vectorised(candidates: CandidateSet, inputs: Dict[str, Any]) -> CandidateSet:
+    """Score candidates with array operations over the catalogue columns."""
+    columns = catalogue_for(inputs).columns
+    # Ranked on the float32 scores plans read, so ties break by position exactly as in python mode
+    scores = total_score(score_terms(columns, candidates.venue_ids, candidates.travel_times, inputs)).astype(np.float32)
+    return candidates.take(top_candidates(columns, candidates.venue_ids, scores), scores=scores)
 
-def score_and_rank(candidates: List[VenueCandidate], inputs: Dict[str, Any]) -> List[VenueCandidate]:
+def score_and_rank(candidates: CandidateSet, inputs: Dict[str, Any]) -> CandidateSet:
     """Score and rank candidates based on preferences and constraints."""
-    print(f"Scoring {len(candidates)} candidates")
+    logger.debug("Scoring %d candidates", len(candidates), extra={"stage": "score_and_rank"})
     
-    for candidate in candidates:
+    if SCORING_MODE == "numpy":
+        return score_and_rank_vectorised(candidates, inputs)
+    
+    # Scores live in a per-request array; shared venue records are never mutated
+    scores = np.zeros(len(candidates), dtype=np.float32)
+    for position in range(len(candidates)):
+        candidate = candidates.venue(position)
+        
         # Base score from baby friendliness
         score = candidate.baby_friendly_score * 10
         
@@ -325,247 +397,694 @@ def score_and_rank(candidates: List[VenueCandidate], inputs: Dict[str, Any]) ->
             score -= 10
         
         # Travel time penalty
-        if candidate.travel_time_minutes > inputs['max_travel_time']:
+        if candidates.travel_times[position] > inputs['max_travel_time']:
             score -= 20
         
         # Cost penalty if over budget
         if candidate.cost_estimate > inputs['budget'] * 0.4:  # Max 40% of budget per activity
             score -= 5
         
-        # Weather consideration
-        if not candidate.weather_suitable:
+        # Weather consideration: outdoor venues also depend on the forecast
+        if not candidate.weather_suitable or (candidate.category in OUTDOOR_CATEGORIES and not inputs['outdoor_weather_ok']):
             score -= 3
         
-        candidate.score = score
+        scores[position] = score
     
     # Sort by score descending
-    return sorted(candidates, key=lambda x: x.score, reverse=True)
+    order = sorted(range(len(candidates)), key=lambda position: scores[position], reverse=True)
+    return candidates.take(np.array(order, dtype=np.int64), scores=scores)
 
-def build_itineraries(ranked_candidates: List[VenueCandidate], inputs: Dict[str, Any]) -> Dict[str, Any]:
-    """Build weekend itineraries from ranked candidates."""
-    print("Building itineraries")
-    
-    plans = []
-    
-    # Plan 1: Outdoor Adventure
-    outdoor_candidates = [c for c in ranked_candidates if c.category in ["Parks & Playgrounds", "Nature Walks", "Farm Visits"]]
-    if outdoor_candidates:
-        plan1_stops = []
-        current_time = datetime.strptime(inputs['start_time'], "%Y-%m-%dT%H:%M:%S")
-        
-        for i, candidate in enumerate(outdoor_candidates[:3]):
-            arrival_time = current_time + timedelta(hours=i*2)
-            duration = 90  # 90 minutes per activity
-            departure_time = arrival_time + timedelta(minutes=duration)
-            
-            # Calculate travel time to next stop
-            next_candidate = outdoor_candidates[i + 1] if i + 1 < len(outdoor_candidates[:3]) else None
-            travel_time = next_candidate.travel_time_minutes if next_candidate else 0
-            
-            plan1_stops.append(ActivityStop(
-                name=candidate.name,
-                category=candidate.category,
-                time=f"{arrival_time.strftime('%H:%M')}-{departure_time.strftime('%H:%M')}",
-                cost=candidate.cost_estimate,
-                note=f"Perfect for {inputs['avg_age_months']:.0f}-month-old children. Bring snacks and water!",
-                location=candidate.location,
-                bookingUrl=candidate.booking_url,
-                travelTime=travel_time,
-                timeBreakdown=f"30min travel, 1hr activity, 30min rest",
-                topTips=["Bring sunscreen and hats", "Pack plenty of snacks", "Check for changing facilities"],
-                pros=["Free entry", "Great for exercise", "Beautiful scenery"],
-                cons=["Weather dependent", "Can be busy on weekends"],
-                arrivalTime=arrival_time.strftime('%H:%M'),
-                departureTime=departure_time.strftime('%H:%M'),
-                duration=duration,
-                transportDetails={
-                    "mode": "car",
-                    "duration": travel_time,
-                    "instructions": f"Drive {travel_time} minutes to {next_candidate.name if next_candidate else 'home'}"
-                } if next_candidate else None
-            ))
-            
-            # Update current time for next iteration
-            current_time = departure_time + timedelta(minutes=travel_time)
-        
-        plans.append(WeekendPlan(
-            type="outdoor_adventure",
-            title="Outdoor Family Adventure",
-            stops=plan1_stops,
-            totalCost=sum(stop.cost for stop in plan1_stops),
-            totalDuration="6 hours",
-            totalTravelTime=sum(stop.travelTime for stop in plan1_stops),
-            estimatedSpend=sum(stop.cost for stop in plan1_stops) + 20  # Add food costs
-        ))
-    
-    # Plan 2: Indoor Discovery
-    indoor_candidates = [c for c in ranked_candidates if c.category in ["Museums & Galleries", "Soft Play Centers", "Educational Centers"]]
-    if indoor_candidates:
-        plan2_stops = []
-        current_time = datetime.strptime(inputs['start_time'], "%Y-%m-%dT%H:%M:%S")
-        
-        for i, candidate in enumerate(indoor_candidates[:3]):
-            arrival_time = current_time + timedelta(hours=i*2)
-            duration = 90  # 90 minutes per activity
-            departure_time = arrival_time + timedelta(minutes=duration)
-            
-            # Calculate travel time to next stop
-            next_candidate = indoor_candidates[i + 1] if i + 1 < len(indoor_candidates[:3]) else None
-            travel_time = next_candidate.travel_time_minutes if next_candidate else 0
-            
-            plan2_stops.append(ActivityStop(
-                name=candidate.name,
-                category=candidate.category,
-                time=f"{arrival_time.strftime('%H:%M')}-{departure_time.strftime('%H:%M')}",
-                cost=candidate.cost_estimate,
-                note=f"Educational and fun for children aged {inputs['avg_age_months']:.0f} months",
-                location=candidate.location,
-                bookingUrl=candidate.booking_url,
-                travelTime=travel_time,
-                timeBreakdown=f"30min travel, 1hr activity, 30min rest",
-                topTips=["Book in advance if required", "Bring extra clothes", "Check for baby facilities"],
-                pros=["Weather proof", "Educational value", "Controlled environment"],
-                cons=["Can be expensive", "May be crowded", "Limited outdoor time"],
-                arrivalTime=arrival_time.strftime('%H:%M'),
-                departureTime=departure_time.strftime('%H:%M'),
-                duration=duration,
-                transportDetails={
-                    "mode": "car",
-                    "duration": travel_time,
-                    "instructions": f"Drive {travel_time} minutes to {next_candidate.name if next_candidate else 'home'}"
-                } if next_candidate else None
-            ))
-            
-            # Update current time for next iteration
-            current_time = departure_time + timedelta(minutes=travel_time)
-        
-        plans.append(WeekendPlan(
-            type="indoor_discovery",
-            title="Indoor Learning Adventure",
-            stops=plan2_stops,
-            totalCost=sum(stop.cost for stop in plan2_stops),
-            totalDuration="6 hours",
-            totalTravelTime=sum(stop.travelTime for stop in plan2_stops),
-            estimatedSpend=sum(stop.cost for stop in plan2_stops) + 25  # Add food costs
-        ))
+def build_plan(ranked_candidates: CandidateSet, spec: PlanSpec, inputs: Dict[str, Any], travel: TravelFn) -> Optional[WeekendPlan]:
+    """Optimise one plan type and turn the chosen route into a WeekendPlan."""
+    start = parse_clock(inputs['start_time'])
+    pool = plan_pool(ranked_candidates, spec)
+    weekday, available = visit_window(inputs)
+    catalogue = catalogue_for(inputs).catalogue
+    route = optimise_route(
+        ranked_candidates,
+        pool,
+        travel,
+        start=start,
+        end=parse_clock(inputs['end_time']),
+        budget=inputs['budget'],
+        blocked=parse_windows(inputs['nap_windows']),
+        max_stops=spec.max_stops,
+        visit_minutes=spec.visit_minutes,
+        open_slots={
+            position: catalogue.free_slots(ranked_candidates.venue_ids[position], weekday, available)
+            for position in pool
+        }
+    )
+    if not route.stops:
+        return None
     
-    # Plan 3: Mixed Experience
-    mixed_candidates = ranked_candidates[:4]  # Take top 4 from any category
-    if mixed_candidates:
-        plan3_stops = []
-        current_time = datetime.strptime(inputs['start_time'], "%Y-%m-%dT%H:%M:%S")
+    stops = []
+    verb = transport_verb(inputs['transport_mode'])
+    for i, route_stop in enumerate(route.stops):
+        venue = ranked_candidates.venue(route_stop.position)
+        # Every travel field describes the leg into this stop, from home or the previous stop
+        travel_time = route_stop.travel_in
+        home_leg = route.home_at - route_stop.departure if i == len(route.stops) - 1 else None
         
-        for i, candidate in enumerate(mixed_candidates):
-            arrival_time = current_time + timedelta(hours=i*1.5)
-            duration = 60  # 60 minutes per activity for mixed plan
-            departure_time = arrival_time + timedelta(minutes=duration)
-            
-            # Calculate travel time to next stop
-            next_candidate = mixed_candidates[i + 1] if i + 1 < len(mixed_candidates) else None
-            travel_time = next_candidate.travel_time_minutes if next_candidate else 0
-            
-            plan3_stops.append(ActivityStop(
-                name=candidate.name,
-                category=candidate.category,
-                time=f"{arrival_time.strftime('%H:%M')}-{departure_time.strftime('%H:%M')}",
-                cost=candidate.cost_estimate,
-                note=f"Varied activities perfect for family bonding",
-                location=candidate.location,
-                bookingUrl=candidate.booking_url,
-                travelTime=travel_time,
-                timeBreakdown=f"20min travel, 40min activity, 20min rest",
-                topTips=["Plan for shorter activities", "Bring snacks between stops", "Check opening times"],
-                pros=["Great variety", "Something for everyone", "Flexible timing"],
-                cons=["More travel time", "Can be tiring", "Need good planning"],
-                arrivalTime=arrival_time.strftime('%H:%M'),
-                departureTime=departure_time.strftime('%H:%M'),
-                duration=duration,
-                transportDetails={
-                    "mode": "car",
-                    "duration": travel_time,
-                    "instructions": f"Drive {travel_time} minutes to {next_candidate.name if next_candidate else 'home'}"
-                } if next_candidate else None
-            ))
-            
-            # Update current time for next iteration
-            current_time = departure_time + timedelta(minutes=travel_time)
+        time_breakdown = f"{travel_time}min travel, {spec.visit_minutes}min activity"
+        if route_stop.wait:
+            time_breakdown += f", {route_stop.wait}min wait for nap or opening time"
+        if home_leg is not None:
+            time_breakdown += f", then {home_leg}min travel home"
         
-        plans.append(WeekendPlan(
-            type="mixed_experience",
-            title="Mixed Family Experience",
-            stops=plan3_stops,
-            totalCost=sum(stop.cost for stop in plan3_stops),
-            totalDuration="6 hours",
-            totalTravelTime=sum(stop.travelTime for stop in plan3_stops),
-            estimatedSpend=sum(stop.cost for stop in plan3_stops) + 30  # Add food costs
+        stops.append(ActivityStop(
+            name=venue.name,
+            category=venue.category,
+            time=f"{format_clock(route_stop.arrival)}-{format_clock(route_stop.departure)}",
+            cost=venue.cost_estimate,
+            note=spec.note.format(avg_age_months=inputs['avg_age_months']),
+            location=venue.location,
+            bookingUrl=venue.booking_url,
+            travelTime=travel_time,
+            timeBreakdown=time_breakdown,
+            topTips=spec.top_tips,
+            pros=spec.pros,
+            cons=spec.cons,
+            arrivalTime=format_clock(route_stop.arrival),
+            departureTime=format_clock(route_stop.departure),
+            duration=spec.visit_minutes,
+            transportDetails={
+                "mode": inputs['transport_mode'],
+                "duration": travel_time,
+                "instructions": f"{verb} {travel_time} minutes to {venue.name}"
+            },
+            returnTravelTime=home_leg,
+            lat=venue.lat,
+            lon=venue.lon
         ))
     
+    total_hours = (route.home_at - start) / 60
+    return WeekendPlan(
+        type=spec.type,
+        title=spec.title,
+        stops=stops,
+        totalCost=route.cost,
+        totalDuration=f"{round(total_hours * 2) / 2:g} hours",
+        totalTravelTime=route.travel_minutes,
+        estimatedSpend=route.cost + spec.food_cost  # Add food costs
+    )
+
+def iter_plans(ranked_candidates: CandidateSet, inputs: Dict[str, Any], specs: List[PlanSpec]) -> Iterator[WeekendPlan]:
+    """Yield each plan as soon as its route is optimised."""
+    travel = catalogue_for(inputs).travel_matrix.travel_fn(ranked_candidates, inputs['transport_mode'])
+    for spec in specs:
+        plan = build_plan(ranked_candidates, spec, inputs, travel)
+        if plan:
+            yield plan
+
+def itineraries_for(plans: List[WeekendPlan], inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap finished plans in the response body."""
     return {
         "plans": plans,
-        "generationMs": 1500,  # Mock generation time
-        "weatherSummary": "Partly cloudy with light showers expected. Perfect for indoor activities or bring rain gear for outdoor fun!"
+        "generationMs": 0,  # Filled in by store_and_log
+        "weatherSummary": inputs['weather_summary'],
+        "travelTimesFrom": "home"
     }
 
-def render_maps(itineraries: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
-    """Render maps for itineraries (placeholder for MVP)."""
-    print("Rendering maps")
-    return itineraries
+def build_itineraries(ranked_candidates: CandidateSet, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Build weekend itineraries from ranked candidates, in the same cheapest-first order plans are streamed in."""
+    logger.debug("Building itineraries", extra={"stage": "build_itineraries"})
+    return itineraries_for(list(iter_plans(ranked_candidates, inputs, specs_cheapest_first(ranked_candidates))), inputs)
+
+async def render_maps(itineraries: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Render each plan's route map in parallel and link it from mapImg."""
+    logger.debug("Rendering maps", extra={"stage": "render_maps"})
+    plans = itineraries["plans"]
+    digests = await map_renderer.render_all([
+        (inputs['origin'], [(stop.name, (stop.lat, stop.lon)) for stop in plan.stops], plan.type)
+        for plan in plans
+    ])
+    return dict(itineraries, plans=[
+        plan.model_copy(update={"mapImg": f"/maps/{digest}.svg"}) for plan, digest in zip(plans, digests)
+    ])
 
-def store_and_log(itineraries: Dict[str, Any], inputs: Dict[str, Any], start_time: datetime) -> Dict[str, Any]:
+def store_and_log(itineraries: Dict[str, Any], inputs: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
     """Store results and log generation."""
-    print("Storing and logging results")
+    logger.debug("Storing and logging results", extra={"stage": "store_and_log"})
     
     generation_id = str(uuid.uuid4())
-    generation_time = (datetime.now() - start_time).total_seconds() * 1000
+    generation_time = timer.elapsed_ms()
+    itineraries = dict(itineraries, generationMs=generation_time)
     
-    # Store in memory
+    # Store in the bounded plan store
     weekend_plans[generation_id] = {
         "itineraries": itineraries,
         "inputs": inputs,
         "generation_time": generation_time,
+        "stage_timings_ms": {stage: duration / 1e6 for stage, duration in timer.durations_ns.items()},
         "created_at": datetime.now()
     }
     
-    # Log generation
-    generation_logs[generation_id] = {
+    # Log generation (written to the rotating generation log off the request path)
+    generation_logger.info("generation", extra={
+        "generation_id": generation_id,
         "user_id": inputs["user_id"],
         "postcode": inputs["postcode"],
         "budget": inputs["budget"],
         "generation_time": generation_time,
-        "plans_count": len(itineraries["plans"]),
-        "created_at": datetime.now()
-    }
+        "stage_timings_ms": {stage: round(duration / 1e6, 3) for stage, duration in timer.durations_ns.items()},
+        "plans_count": len(itineraries["plans"])
+    })
     
     return itineraries
 
-def generate_weekend_plans(request: WeekendRequest) -> Dict[str, Any]:
-    """Main function to generate weekend plans."""
-    start_time = datetime.now()
+def compute_weekend_plans(inputs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """CPU-bound pipeline stages; runs on the plan executor's workers.
+    
+    Returns the itineraries and per-stage durations in nanoseconds, so stage
+    timings survive the trip back from a process pool worker.
+    """
+    timer = StageTimer()
+    
+    # Step 2: Fetch venue candidates
+    with timer.stage("fetch_candidates"):
+        candidates = fetch_candidates(inputs)
+    
+    # Step 3: Score and rank candidates
+    with timer.stage("score_and_rank"):
+        ranked_candidates = score_and_rank(candidates, inputs)
+    
+    # Step 4: Build itineraries
+    with timer.stage("build_itineraries"):
+        itineraries = build_itineraries(ranked_candidates, inputs)
+    
+    return itineraries, timer.durations_ns
+
+async def finish_itineraries(itineraries: Dict[str, Any], inputs: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+    """Stages after the CPU-bound pipeline; runs on the event loop."""
+    # Step 5: Enrich stop notes and tips (concurrent, cached LLM calls)
+    with timer.stage("enrich_stops"):
+        plans = await enricher.enrich_plans(itineraries["plans"], inputs['avg_age_months'])
+    
+    # Step 6: Render route maps (cached on disk by route)
+    with timer.stage("render_maps"):
+        return await render_maps(dict(itineraries, plans=plans), inputs)
+
+def open_session(inputs: Dict[str, Any], compute_inputs: Dict[str, Any]) -> str:
+    """Remember a request so later preference tweaks can reuse its work."""
+    session_id = str(uuid.uuid4())
+    plan_sessions.put(session_id, PlanSession(inputs=inputs, compute_inputs=compute_inputs))
+    return session_id
+
+def update_session_inputs(session: PlanSession, inputs: Dict[str, Any]) -> None:
+    with session.lock:
+        session.inputs = inputs
+
+def rerank_session(session: PlanSession, inputs: Dict[str, Any], request_inputs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Re-plan a session for changed inputs, recomputing only the stale score terms.
+    
+    Candidates are fetched on the session's first delta and again only when
+    the travel time grows beyond what was fetched or a new catalogue
+    generation has been published; a smaller travel time just drops
+    candidates outside the new radius. request_inputs become the session's
+    inputs together with the compute inputs, so concurrent deltas cannot
+    leave the two out of step.
+    """
+    timer = StageTimer()
+    
+    with session.lock:
+        with timer.stage("fetch_candidates"):
+            if (session.candidates is None
+                    or inputs['max_travel_time'] > session.fetched_travel_time
+                    or inputs['catalogue_generation'] != session.compute_inputs.get('catalogue_generation')):
+                session.candidates = fetch_candidates(inputs)
+                session.fetched_travel_time = inputs['max_travel_time']
+                session.terms = {}
+        
+        with timer.stage("score_and_rank"):
+            candidates = session.candidates
+            stale = stale_terms(session.compute_inputs, inputs) if session.terms else None
+            columns = catalogue_for(inputs).columns
+            session.terms.update(score_terms(columns, candidates.venue_ids, candidates.travel_times, inputs, only=stale))
+            session.compute_inputs = inputs
+            session.inputs = request_inputs
+            scores = total_score(session.terms).astype(np.float32)
+            reachable = np.flatnonzero(candidates.distances_km <= travel_radius_km(inputs['max_travel_time'], inputs['transport_mode']))
+            ranked_candidates = candidates.take(reachable[top_candidates(columns, candidates.venue_ids[reachable], scores[reachable])], scores=scores)
+    
+    with timer.stage("build_itineraries"):
+        itineraries = build_itineraries(ranked_candidates, inputs)
+    
+    return itineraries, timer.durations_ns
+
+async def apply_plan_delta(session_id: str, delta: PlanDelta) -> Dict[str, Any]:
+    """Re-plan an existing session after a budget, travel time or preference change."""
+    timer = StageTimer()
+    outcome = "ok"
     
     try:
-        # Step 1: Collect and validate inputs
-        inputs = collect_inputs(request)
+        session = plan_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Plan session not found or expired")
         
-        # Step 2: Fetch venue candidates
-        candidates = fetch_candidates(inputs)
+        with timer.stage("collect_inputs"):
+            preferences = session.inputs['activity_preferences']
+            updates = {
+                name: value
+                for name, value in (("likedActivities", delta.likedActivities), ("dislikedActivities", delta.dislikedActivities))
+                if value is not None
+            }
+            inputs = dict(
+                session.inputs,
+                budget=session.inputs['budget'] if delta.budget is None else delta.budget,
+                max_travel_time=session.inputs['max_travel_time'] if delta.maxTravelTime is None else delta.maxTravelTime,
+                activity_preferences=preferences.model_copy(update=updates),
+                catalogue_generation=live_catalogue.current.name
+            )
+            validate_limits(inputs['budget'], inputs['max_travel_time'])
+        
+        cache_key, cache_inputs = plan_cache.prepare(inputs)
+        itineraries = plan_cache.get(cache_key)
+        if itineraries is None:
+            # Sessions live in this process's memory, so this never goes to a process pool
+            itineraries, stage_durations = await plan_executor.run_threaded(rerank_session, session, cache_inputs, inputs)
+            timer.merge(stage_durations)
+            itineraries = await finish_itineraries(itineraries, cache_inputs, timer)
+            plan_cache.put(cache_key, itineraries)
+        else:
+            outcome = "cache_hit"
+            # The lock may be held by a re-rank for a while, so wait for it off the event loop
+            await asyncio.to_thread(update_session_inputs, session, inputs)
+        
+        with timer.stage("store_and_log"):
+            result = store_and_log(itineraries, inputs, timer)
+        
+        result["sessionId"] = session_id
+        return result
         
-        # Step 3: Score and rank candidates
+    except HTTPException:
+        outcome = "error"
+        raise
+    except Exception as e:
+        outcome = "error"
+        logger.exception("Error re-planning session %s", session_id)
+        raise HTTPException(status_code=500, detail=f"Failed to update weekend plans: {str(e)}")
+    finally:
+        observe_generation(timer, outcome)
+
+def stream_weekend_plans(inputs: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """Streaming variant of compute_weekend_plans, cheapest plan first.
+    
+    Yields ("plan", WeekendPlan) as each plan is finished, then
+    ("result", (itineraries, stage durations)) once all are done.
+    """
+    timer = StageTimer()
+    
+    with timer.stage("fetch_candidates"):
+        candidates = fetch_candidates(inputs)
+    
+    with timer.stage("score_and_rank"):
         ranked_candidates = score_and_rank(candidates, inputs)
+    
+    with timer.stage("build_itineraries"):
+        plans_iter = iter_plans(ranked_candidates, inputs, specs_cheapest_first(ranked_candidates))
+    
+    plans = []
+    while True:
+        with timer.stage("build_itineraries"):
+            plan = next(plans_iter, None)
+        if plan is None:
+            break
+        plans.append(plan)
+        yield "plan", plan
+    
+    yield "result", (itineraries_for(plans, inputs), timer.durations_ns)
+
+def compute_region_plans(families: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Batch pipeline for families sharing an origin and transport mode.
+    
+    Candidates are fetched once for the widest travel time in the group and
+    every family is scored against them in one matrix; each family then only
+    keeps the candidates inside its own travel radius.
+    """
+    timer = StageTimer()
+    transport_mode = families[0]['transport_mode']
+    
+    with timer.stage("fetch_candidates"):
+        widest = max(families, key=lambda family: family['max_travel_time'])
+        region = reachable_candidates(widest)
+    
+    with timer.stage("score_and_rank"):
+        columns = catalogue_for(widest).columns
+        scores = score_matrix(columns, region.venue_ids, region.travel_times, families).astype(np.float32)
+        ranked = []
+        for family, row in zip(families, scores):
+            # Families in a region can differ in travel time, day and time window
+            reachable = np.flatnonzero(
+                (region.distances_km <= travel_radius_km(family['max_travel_time'], transport_mode)) & visitable(region, family)
+            )
+            order = reachable[top_candidates(columns, region.venue_ids[reachable], row[reachable])]
+            ranked.append(region.take(order, scores=row))
+    
+    results = []
+    with timer.stage("build_itineraries"):
+        for family, ranked_candidates in zip(families, ranked):
+            results.append(build_itineraries(ranked_candidates, family))
+    
+    return results, timer.durations_ns
+
+async def generate_weekend_plans_batch_async(requests: List[WeekendRequest]) -> List[Dict[str, Any]]:
+    """Generate plans for many families, sharing candidate fetching and scoring per region.
+    
+    Returns one {"status", "result", "detail"} entry per request, in input
+    order; a failing request does not fail the rest of the batch.
+    """
+    timer = StageTimer()
+    outcomes: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+    pending: Dict[str, List[int]] = {}  # request key -> indexes of identical requests
+    regions: Dict[Tuple, List[Tuple[str, Optional[str], Dict[str, Any]]]] = {}
+    
+    # Step 1: Collect inputs and group cache misses by region
+    with timer.stage("collect_inputs"):
+        inputs_list: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        for index, request in enumerate(requests):
+            try:
+                inputs = collect_inputs(request)
+            except HTTPException as e:
+                outcomes[index] = {"status": e.status_code, "result": None, "detail": e.detail}
+                continue
+            inputs_list[index] = inputs
+            cache_key, cache_inputs = plan_cache.prepare(inputs)
+            request_key = cache_key or f"request-{index}"
+            cached = plan_cache.get(cache_key) if request_key not in pending else None
+            if cached is not None:
+                outcomes[index] = {"status": 200, "result": cached, "detail": None}
+                continue
+            if request_key not in pending:
+                region = (tuple(cache_inputs['origin']), cache_inputs['transport_mode'], cache_inputs['catalogue_generation'])
+                regions.setdefault(region, []).append((request_key, cache_key, cache_inputs))
+            pending.setdefault(request_key, []).append(index)
+    
+    # Steps 2-6 per region, split into chunks that run in parallel on the executor
+    chunks = [
+        families[start:start + BATCH_CHUNK_SIZE]
+        for families in regions.values()
+        for start in range(0, len(families), BATCH_CHUNK_SIZE)
+    ]
+    # Leave executor capacity for interactive requests
+    slots = asyncio.Semaphore(max(1, plan_executor.max_workers - BATCH_RESERVED_WORKERS))
+    
+    async def run_chunk(chunk: List[Tuple[str, Optional[str], Dict[str, Any]]]) -> None:
+        async with slots:
+            try:
+                results, stage_durations = await plan_executor.run(compute_region_plans, [family for _, _, family in chunk])
+                timer.merge(stage_durations)
+                results = await asyncio.gather(*(
+                    finish_itineraries(itineraries, family, timer) for (_, _, family), itineraries in zip(chunk, results)
+                ))
+                chunk_outcomes = [{"status": 200, "result": itineraries, "detail": None} for itineraries in results]
+                for (_, cache_key, _), itineraries in zip(chunk, results):
+                    plan_cache.put(cache_key, itineraries)
+            except HTTPException as e:
+                chunk_outcomes = [{"status": e.status_code, "result": None, "detail": e.detail}] * len(chunk)
+            except Exception as e:
+                logger.exception("Error generating batch weekend plans")
+                failure = {"status": 500, "result": None, "detail": f"Failed to generate weekend plans: {str(e)}"}
+                chunk_outcomes = [failure] * len(chunk)
+        for (request_key, _, _), outcome in zip(chunk, chunk_outcomes):
+            for index in pending[request_key]:
+                outcomes[index] = outcome
+    
+    try:
+        await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
         
-        # Step 4: Build itineraries
-        itineraries = build_itineraries(ranked_candidates, inputs)
+        # Step 7: Store and log each successful request
+        with timer.stage("store_and_log"):
+            for index, outcome in enumerate(outcomes):
+                if outcome["status"] == 200:
+                    outcomes[index] = dict(outcome, result=store_and_log(outcome["result"], inputs_list[index], timer))
+        return outcomes
+    finally:
+        observe_generation(timer, "batch")
+
+def generate_weekend_plans_batch(requests: List[WeekendRequest]) -> List[Dict[str, Any]]:
+    """Blocking wrapper for scheduled jobs that pre-generate plans outside the server."""
+    return asyncio.run(generate_weekend_plans_batch_async(requests))
+
+async def compute_and_cache(cache_key: Optional[str], cache_inputs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Run steps 2-6 for a cache miss and cache the finished itineraries."""
+    timer = StageTimer()
+    itineraries, stage_durations = await plan_executor.run(compute_weekend_plans, cache_inputs)
+    timer.merge(stage_durations)
+    itineraries = await finish_itineraries(itineraries, cache_inputs, timer)
+    plan_cache.put(cache_key, itineraries)
+    return itineraries, timer.durations_ns
+
+async def finished_plan_events(cache_key: Optional[str], cache_inputs: Dict[str, Any], events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[Tuple[str, Any]]:
+    """stream_weekend_plans events with each plan's stop text and map done, caching the result."""
+    timer = StageTimer()
+    finished = []
+    try:
+        async for kind, payload in events:
+            if kind == "plan":
+                plan = (await finish_itineraries(itineraries_for([payload], cache_inputs), cache_inputs, timer))["plans"][0]
+                finished.append(plan)
+                yield "plan", plan
+            else:
+                itineraries, stage_durations = payload
+                timer.merge(stage_durations)
+                itineraries = dict(itineraries, plans=finished)
+                plan_cache.put(cache_key, itineraries)
+                yield "result", (itineraries, timer.durations_ns)
+    finally:
+        # Stops the producer and frees its executor slot if nobody is listening any more
+        await events.aclose()
+
+async def open_plan_events(cache_key: Optional[str], cache_inputs: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+    return finished_plan_events(cache_key, cache_inputs, plan_executor.open_stream(stream_weekend_plans, cache_inputs))
+
+async def computation_events(flight: Union[asyncio.Task, Broadcast]) -> AsyncIterator[Tuple[str, Any]]:
+    """Plan events of a computation in flight, whether it streams or not."""
+    if isinstance(flight, Broadcast):
+        async for event in flight.subscribe():
+            yield event
+        return
+    itineraries, stage_durations = await asyncio.shield(flight)
+    for plan in itineraries["plans"]:
+        yield "plan", plan
+    yield "result", (itineraries, stage_durations)
+
+async def computation_result(flight: Union[asyncio.Task, Broadcast]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    async for kind, payload in computation_events(flight):
+        if kind == "result":
+            return payload
+    raise RuntimeError("Plan computation ended without a result")
+
+async def plan_events(cache_key: Optional[str], cache_inputs: Dict[str, Any]) -> Tuple[AsyncIterator[Tuple[str, Any]], bool]:
+    """Plan events for a cache miss, shared with any computation of the same inputs in flight.
+    
+    Admission happens here, so a full executor still fails before the
+    response starts. The flag is True when an earlier request's computation
+    was joined.
+    """
+    if cache_key is None:
+        return await open_plan_events(cache_key, cache_inputs), False
+    flight = plan_computations_in_flight.join(cache_key)
+    joined = flight is not None
+    if not joined:
+        flight, _ = plan_computations_in_flight.stream(cache_key, lambda: open_plan_events(cache_key, cache_inputs))
+    if isinstance(flight, Broadcast):
+        await asyncio.shield(flight.opened)
+    return computation_events(flight), joined
+
+async def generate_weekend_plans_async(request: WeekendRequest) -> Dict[str, Any]:
+    """Generate weekend plans with the CPU-bound stages off the event loop.
+    
+    Concurrent cache misses for the same normalised inputs wait for one
+    computation rather than each running the pipeline.
+    """
+    timer = StageTimer()
+    outcome = "ok"
+    
+    try:
+        with timer.stage("collect_inputs"):
+            inputs = collect_inputs(request)
         
-        # Step 5: Render maps (placeholder)
-        itineraries = render_maps(itineraries, inputs)
+        cache_key, cache_inputs = plan_cache.prepare(inputs)
+        itineraries = plan_cache.get(cache_key)
+        if itineraries is None:
+            if cache_key is None:
+                itineraries, stage_durations = await compute_and_cache(cache_key, cache_inputs)
+            else:
+                # A streamed request may already be computing the same plans
+                flight = plan_computations_in_flight.join(cache_key)
+                if flight is None:
+                    (itineraries, stage_durations), _ = await plan_computations_in_flight.run(
+                        cache_key, lambda: compute_and_cache(cache_key, cache_inputs)
+                    )
+                else:
+                    itineraries, stage_durations = await computation_result(flight)
+                    # Computed for whichever home in the district asked first
+                    itineraries = dict(itineraries, travelTimesFrom="district")
+                    outcome = "coalesced"
+            timer.merge(stage_durations)
+        else:
+            outcome = "cache_hit"
         
-        # Step 6: Store and log
-        result = store_and_log(itineraries, inputs, start_time)
+        with timer.stage("store_and_log"):
+            result = store_and_log(itineraries, inputs, timer)
         
+        result["sessionId"] = open_session(inputs, cache_inputs)
         return result
         
+    except HTTPException:
+        outcome = "error"
+        raise
     except Exception as e:
-        print(f"Error generating weekend plans: {str(e)}")
+        outcome = "error"
+        logger.exception("Error generating weekend plans")
         raise HTTPException(status_code=500, detail=f"Failed to generate weekend plans: {str(e)}")
+    finally:
+        observe_generation(timer, outcome)
+
+def request_fingerprint(request: WeekendRequest) -> str:
+    return hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+
+def idempotent_replay(kind: str, request: WeekendRequest, idempotency_key: Optional[str], fingerprint: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Store key for an Idempotency-Key and the reply kept under it, if any."""
+    if idempotency_key is None:
+        return None, None
+    if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+    replay_key = f"{kind}:{request.userId}:{idempotency_key}"
+    replay = idempotent_responses.get(replay_key)
+    if replay is not None:
+        if replay["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        requests_total.inc("replayed")
+    return replay_key, replay
+
+async def generate_weekend_plans_once(request: WeekendRequest, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """generate_weekend_plans_async with duplicate requests collapsed.
+    
+    Identical requests from the same user that arrive while one is running
+    share its response (and its session) instead of each storing their own.
+    A retry that repeats the Idempotency-Key of an earlier request gets that
+    request's response back for as long as the key is kept.
+    """
+    fingerprint = request_fingerprint(request)
+    replay_key, replay = idempotent_replay("plan", request, idempotency_key, fingerprint)
+    if replay is not None:
+        return dict(replay["response"])
+    
+    response, joined = await plan_requests_in_flight.run(fingerprint, lambda: generate_weekend_plans_async(request))
+    if joined:
+        requests_total.inc("coalesced")
+    if replay_key is not None:
+        idempotent_responses.put(replay_key, {"fingerprint": fingerprint, "response": response})
+    return dict(response)
+
+def ndjson_frame(frame: Dict[str, Any]) -> bytes:
+    return (json.dumps(frame, default=str) + "\n").encode()
+
+def plan_frame(plan: WeekendPlan) -> bytes:
+    return ndjson_frame({"type": "plan", "plan": plan.model_dump()})
+
+async def generate_weekend_plan_frames(request: WeekendRequest) -> AsyncIterator[bytes]:
+    """Validate and admit a request, then return its NDJSON frames.
+    
+    Validation and admission happen before the response starts, so they still
+    fail with a proper 4xx; later errors become an "error" frame. A cache miss
+    joins any computation of the same plans already in flight.
+    """
+    timer = StageTimer()
+    
+    try:
+        with timer.stage("collect_inputs"):
+            inputs = collect_inputs(request)
+        cache_key, cache_inputs = plan_cache.prepare(inputs)
+        cached = plan_cache.get(cache_key)
+        events, joined = (None, False) if cached is not None else await plan_events(cache_key, cache_inputs)
+    except HTTPException:
+        observe_generation(timer, "error")
+        raise
+    
+    async def frames_from_cache() -> AsyncIterator[bytes]:
+        try:
+            # Cached plans are kept in the order they were first streamed in
+            for plan in cached["plans"]:
+                yield plan_frame(plan)
+            yield summary_frame(cached)
+        finally:
+            observe_generation(timer, "cache_hit")
+    
+    async def frames_from_pipeline() -> AsyncIterator[bytes]:
+        outcome = "cancelled"  # Until the summary frame is sent
+        try:
+            async for kind, payload in events:
+                if kind == "plan":
+                    yield plan_frame(payload)
+                else:
+                    itineraries, stage_durations = payload
+                    timer.merge(stage_durations)
+                    if joined:
+                        # Computed for whichever home in the district asked first
+                        itineraries = dict(itineraries, travelTimesFrom="district")
+                    yield summary_frame(itineraries)
+                    outcome = "coalesced" if joined else "ok"
+        except Exception as e:
+            outcome = "error"
+            detail = e.detail if isinstance(e, HTTPException) else f"Failed to generate weekend plans: {str(e)}"
+            logger.error("Error streaming weekend plans: %s", detail, exc_info=not isinstance(e, HTTPException))
+            yield ndjson_frame({"type": "error", "detail": detail})
+        finally:
+            # Lets go of the computation so it stops if no other request is listening
+            await events.aclose()
+            observe_generation(timer, outcome)
+    
+    def summary_frame(itineraries: Dict[str, Any]) -> bytes:
+        with timer.stage("store_and_log"):
+            result = store_and_log(itineraries, inputs, timer)
+        return ndjson_frame({
+            "type": "summary",
+            "planCount": len(result["plans"]),
+            "generationMs": result["generationMs"],
+            "weatherSummary": result["weatherSummary"],
+            "travelTimesFrom": result["travelTimesFrom"],
+            "sessionId": open_session(inputs, cache_inputs)
+        })
+    
+    return frames_from_cache() if cached is not None else frames_from_pipeline()
+
+async def generate_weekend_plan_frames_once(request: WeekendRequest, idempotency_key: Optional[str] = None) -> AsyncIterator[bytes]:
+    """generate_weekend_plan_frames with duplicate requests collapsed.
+    
+    Identical requests from the same user that arrive while one is streaming
+    get the same frames, replayed from the start, instead of each running
+    the pipeline and opening its own session. A retry that repeats the
+    Idempotency-Key of a request that streamed to completion gets its frames
+    back for as long as the key is kept.
+    """
+    fingerprint = request_fingerprint(request)
+    replay_key, replay = idempotent_replay("stream", request, idempotency_key, fingerprint)
+    if replay is not None:
+        return replay_frames(replay["frames"])
+    
+    broadcast, joined = plan_requests_in_flight.stream(fingerprint, lambda: generate_weekend_plan_frames(request))
+    # Validation and admission errors reach every caller before its response starts
+    await asyncio.shield(broadcast.opened)
+    if joined:
+        requests_total.inc("coalesced")
+    frames = broadcast.subscribe()
+    return frames if replay_key is None else remember_frames(frames, replay_key, fingerprint)
+
+async def replay_frames(frames: List[bytes]) -> AsyncIterator[bytes]:
+    for frame in frames:
+        yield frame
+
+async def remember_frames(frames: AsyncIterator[bytes], replay_key: str, fingerprint: str) -> AsyncIterator[bytes]:
+    """Pass frames through, keeping them for retries once the summary frame has gone out."""
+    sent = []
+    async for frame in frames:
+        sent.append(frame)
+        yield frame
+    if sent and json.loads(sent[-1])["type"] == "summary":
+        idempotent_responses.put(replay_key, {"fingerprint": fingerprint, "frames": sent})
 
 @app.get("/")
 async def root():
@@ -598,11 +1117,97 @@ async def create_simple_user_profile(profile: UserProfileCreate):
     return user_profile
 
 @app.post("/simple/weekend-plan", response_model=WeekendResponse)
-async def create_weekend_plan(request: WeekendRequest):
-    """Generate weekend plans for a user."""
-    return generate_weekend_plans(request)
+async def create_weekend_plan(request: WeekendRequest, idempotency_key: Optional[str] = Header(None)):
+    """Generate weekend plans for a user; retries with the same Idempotency-Key get the first response."""
+    return await generate_weekend_plans_once(request, idempotency_key)
+
+@app.post("/simple/weekend-plan/stream")
+async def stream_weekend_plan(request: WeekendRequest, idempotency_key: Optional[str] = Header(None)):
+    """Stream weekend plans as NDJSON: one "plan" frame per plan, cheapest first, then a "summary" frame."""
+    frames = await generate_weekend_plan_frames_once(request, idempotency_key)
+    return StreamingResponse(frames, media_type="application/x-ndjson")
+
+@app.post("/simple/weekend-plan/session/{session_id}", response_model=WeekendResponse)
+async def update_weekend_plan(session_id: str, delta: PlanDelta):
+    """Re-plan after a preference tweak, reusing the session's candidates and scores."""
+    return await apply_plan_delta(session_id, delta)
+
+@app.post("/simple/weekend-plan/batch", response_model=WeekendBatchResponse)
+async def create_weekend_plan_batch(batch: WeekendBatchRequest):
+    """Generate weekend plans for many families in one call, results in input order."""
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_REQUESTS} requests")
+    started = StageTimer()
+    results = await generate_weekend_plans_batch_async(batch.requests)
+    return {"results": results, "generationMs": started.elapsed_ms()}
+
+@app.get("/simple/milestones")
+async def get_milestones(weeks: int, domain: str = ALL_DOMAINS):
+    """Current, previous and upcoming milestones for a baby's age in weeks."""
+    if weeks < 0:
+        raise HTTPException(status_code=400, detail="Age in weeks cannot be negative")
+    try:
+        window = milestone_repository.lookup(weeks, domain)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown milestone domain {domain!r}")
+    return {
+        "weeks": weeks,
+        "domain": domain,
+        "current": [milestone._asdict() for milestone in window.current],
+        "previous": [milestone._asdict() for milestone in window.previous],
+        "upcoming": [milestone._asdict() for milestone in window.upcoming]
+    }
+
+@app.get("/maps/{digest}.svg")
+async def get_map(digest: str, if_none_match: Optional[str] = Header(None)):
+    """Serve a rendered route map; its name is its content hash, so it never changes."""
+    path = map_renderer.path_for(digest)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Map not found")
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and digest in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/svg+xml", headers=headers)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(),
+        "executor": plan_executor.stats(),
+        "plan_cache": plan_cache.stats(),
+        "plan_sessions": plan_sessions.stats(),
+        "weather": weather_service.stats(),
+        "enrichment": enricher.stats(),
+        "maps": map_renderer.stats(),
+        "in_flight": {flight.name: flight.stats() for flight in (plan_requests_in_flight, plan_computations_in_flight)},
+        "catalogue": live_catalogue.stats(),
+        "milestones": milestone_repository.stats(),
+        "stores": {store.name: store.stats() for store in (user_profiles, weekend_plans, idempotent_responses)}
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of pipeline metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def start_background_tasks():
+    weather_service.start()
+    milestone_repository.start()
+    live_catalogue.start()
+
+@app.on_event("shutdown")
+async def shutdown_background_resources():
+    await weather_service.stop()
+    await milestone_repository.stop()
+    await live_catalogue.stop()
+    plan_executor.shutdown()
+    map_renderer.shutdown()
+    await close_clients()
+    shutdown_logging()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
     
@@ -0,0 +1,181 @@
+"""
+Offline route maps for weekend plans.
+
+Each plan's route (home -> stops -> home) is drawn as a small SVG over the
+catalogue venues around it, with no tile server involved. Maps are
+content-addressed: the file name is a hash of the route, so a plan that
+has been drawn before costs a stat, and clients can cache a map forever.
+Plans are rendered in parallel on a small thread pool and the response
+carries a /maps/<hash>.svg URL instead of image bytes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from venue_catalogue import VenueCatalogue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "maps")
+
+# Bump when the drawing changes so old cached maps are not reused
+MAP_STYLE_VERSION = 1
+
+WIDTH, HEIGHT, PADDING = 320, 240, 24
+CONTEXT_VENUE_LIMIT = 400
+ROUTE_COLOURS = {"outdoor_adventure": "#2e7d32", "indoor_discovery": "#1565c0", "mixed_experience": "#ef6c00"}
+DEFAULT_ROUTE_COLOUR = "#6a1b9a"
+
+Point = Tuple[float, float]
+
+
+def route_digest(home: Point, stops: Sequence[Tuple[str, Point]], plan_type: str) -> str:
+    """Content address of a route: same home, stops and plan type give the same map."""
+    route = {
+        "style": MAP_STYLE_VERSION,
+        "type": plan_type,
+        "home": [round(home[0], 5), round(home[1], 5)],
+        "stops": [[name, round(lat, 5), round(lon, 5)] for name, (lat, lon) in stops],
+    }
+    return hashlib.sha256(json.dumps(route, separators=(",", ":")).encode()).hexdigest()[:32]
+
+
+class MapRenderer:
+    """Draws route SVGs into a content-addressed directory."""
+
+    def __init__(self, catalogue: VenueCatalogue, directory: str = DEFAULT_MAP_DIR, workers: int = 4, max_files: int = 50000):
+        self.catalogue = catalogue
+        self.directory = directory
+        self.max_files = max_files
+        self.rendered = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="map-render")
+        os.makedirs(directory, exist_ok=True)
+        self._files = sum(1 for name in os.listdir(directory) if name.endswith(".svg"))
+
+    def path_for(self, digest: str) -> Optional[str]:
+        """Cached map file for a digest, or None; rejects anything that is not a digest."""
+        if len(digest) != 32 or any(c not in "0123456789abcdef" for c in digest):
+            return None
+        path = os.path.join(self.directory, f"{digest}.svg")
+        return path if os.path.exists(path) else None
+
+    def render(self, home: Point, stops: Sequence[Tuple[str, Point]], plan_type: str) -> str:
+        """Digest of the route's map, drawing it first if it is not cached yet."""
+        digest = route_digest(home, stops, plan_type)
+        path = os.path.join(self.directory, f"{digest}.svg")
+        if os.path.exists(path):
+            # Keeps recently used maps at the back of the pruning queue
+            os.utime(path)
+            with self._lock:
+                self.reused += 1
+            return digest
+
+        svg = self._draw(home, stops, plan_type)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(svg)
+        # Readers only ever see a complete file
+        os.replace(temporary, path)
+        with self._lock:
+            self.rendered += 1
+            self._files += 1
+            prune = self._files > self.max_files
+        if prune:
+            self._prune()
+        return digest
+
+    async def render_all(self, routes: Sequence[Tuple[Point, Sequence[Tuple[str, Point]], str]]) -> List[str]:
+        """Render several routes in parallel; returns their digests in order."""
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(loop.run_in_executor(self._pool, self.render, *route) for route in routes)))
+
+    def _prune(self) -> None:
+        """Drop the oldest tenth of the cache once it outgrows max_files."""
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".svg")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:max(1, len(entries) // 10)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        with self._lock:
+            self._files = sum(1 for name in os.listdir(self.directory) if name.endswith(".svg"))
+        logger.info("Pruned map cache to %d files", self._files)
+
+    def _draw(self, home: Point, stops: Sequence[Tuple[str, Point]], plan_type: str) -> str:
+        points = [home, *(point for _, point in stops)]
+        min_lat, max_lat = min(p[0] for p in points), max(p[0] for p in points)
+        min_lon, max_lon = min(p[1] for p in points), max(p[1] for p in points)
+        # Equirectangular projection, longitude scaled to keep distances true at this latitude
+        lon_scale = math.cos(math.radians((min_lat + max_lat) / 2))
+        span_x = max((max_lon - min_lon) * lon_scale, 0.005)
+        span_y = max(max_lat - min_lat, 0.005)
+        scale = min((WIDTH - 2 * PADDING) / span_x, (HEIGHT - 2 * PADDING) / span_y)
+        centre_lat, centre_lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+        def project(lat: float, lon: float) -> Tuple[float, float]:
+            return (WIDTH / 2 + (lon - centre_lon) * lon_scale * scale, HEIGHT / 2 - (lat - centre_lat) * scale)
+
+        colour = ROUTE_COLOURS.get(plan_type, DEFAULT_ROUTE_COLOUR)
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}">',
+            f'<rect width="{WIDTH}" height="{HEIGHT}" fill="#f4f1ea"/>',
+        ]
+
+        # Other venues in view give the route some context
+        half_width_km = WIDTH / 2 / scale * 111.32
+        half_height_km = HEIGHT / 2 / scale * 111.32
+        nearby = self.catalogue.nearby(centre_lat, centre_lon, math.hypot(half_width_km, half_height_km))
+        for venue_id, _ in nearby[:CONTEXT_VENUE_LIMIT]:
+            x, y = project(float(self.catalogue.lat[venue_id]), float(self.catalogue.lon[venue_id]))
+            if 0 <= x <= WIDTH and 0 <= y <= HEIGHT:
+                parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="1.5" fill="#c9c2b4"/>')
+
+        route = " ".join(f"{x:.1f},{y:.1f}" for x, y in (project(*p) for p in [*points, home]))
+        parts.append(f'<polyline points="{route}" fill="none" stroke="{colour}" stroke-width="2.5" stroke-linejoin="round" stroke-dasharray="6 3"/>')
+
+        hx, hy = project(*home)
+        parts.append(f'<rect x="{hx - 6:.1f}" y="{hy - 6:.1f}" width="12" height="12" rx="2" fill="#37474f"><title>Home</title></rect>')
+        for number, (name, (lat, lon)) in enumerate(stops, start=1):
+            x, y = project(lat, lon)
+            parts.append(
+                f'<g><title>{escape(name)}</title><circle cx="{x:.1f}" cy="{y:.1f}" r="9" fill="{colour}" stroke="#fff" stroke-width="2"/>'
+                f'<text x="{x:.1f}" y="{y + 4:.1f}" font-family="sans-serif" font-size="11" font-weight="bold" fill="#fff" text-anchor="middle">{number}</text></g>'
+            )
+
+        # Scale bar: the largest round distance that fits in a quarter of the width
+        km_per_px = 111.32 / scale
+        bar_km = max((d for d in (0.1, 0.2, 0.5, 1, 2, 5, 10, 20) if d / km_per_px <= WIDTH / 4), default=0.1)
+        bar_px = bar_km / km_per_px
+        parts.append(
+            f'<line x1="8" y1="{HEIGHT - 10}" x2="{8 + bar_px:.1f}" y2="{HEIGHT - 10}" stroke="#37474f" stroke-width="2"/>'
+            f'<text x="8" y="{HEIGHT - 14}" font-family="sans-serif" font-size="9" fill="#37474f">{bar_km:g} km</text>'
+        )
+        parts.append("</svg>")
+        return "".join(parts)
+
+    def stats(self) -> dict:
+        return {"files": self._files, "rendered": self.rendered, "reused": self.reused}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+def create_map_renderer(catalogue: VenueCatalogue) -> MapRenderer:
+    """Build the renderer from MAP_* environment variables."""
+    return MapRenderer(
+        catalogue,
+        directory=os.getenv("MAP_CACHE_DIR") or DEFAULT_MAP_DIR,
+        workers=int(os.getenv("MAP_RENDER_WORKERS", "4")),
+        max_files=int(os.getenv("MAP_CACHE_MAX_FILES", "50000")),
+    )
@@ -0,0 +1,166 @@
+"""
+Lightweight metrics for the weekend planner.
+
+Pipeline stages are timed with perf_counter_ns and recorded in labelled
+histograms and counters, which /metrics exposes in the Prometheus text
+exposition format. Gauges read their value from a callback at scrape time,
+so existing stats (executor, caches, stores) need no extra bookkeeping.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Seconds; tuned for stages that take between 50µs and a few seconds
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            counts, totals = self._series.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, (total, count)) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _format_labels(self.label_names, labels, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total!r}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {int(count)}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose labelled values are read from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], read: Callable[[], Dict[LabelValues, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str], read: Callable[[], Dict[LabelValues, float]]) -> Gauge:
+        return self.register(Gauge(name, help_text, label_names, read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Collects per-stage wall time in nanoseconds for one request."""
+
+    def __init__(self):
+        self.started_ns = time.perf_counter_ns()
+        self.durations_ns: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.durations_ns[name] = self.durations_ns.get(name, 0) + time.perf_counter_ns() - start
+
+    def merge(self, durations_ns: Dict[str, int]) -> None:
+        for name, duration in durations_ns.items():
+            self.durations_ns[name] = self.durations_ns.get(name, 0) + duration
+
+    def elapsed_ms(self) -> int:
+        return int(round((time.perf_counter_ns() - self.started_ns) / 1_000_000))
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "weekend_plan_stage_seconds", "Time spent in each plan generation stage", ("stage",)
+)
+generation_seconds = registry.histogram(
+    "weekend_plan_generation_seconds", "End-to-end plan generation time", ("outcome",)
+)
+requests_total = registry.counter(
+    "weekend_plan_requests_total", "Plan generation requests by outcome", ("outcome",)
+)
+
+
+def observe_generation(timer: StageTimer, outcome: str) -> None:
+    """Record a finished generation's stage timings and total time."""
+    for stage, duration_ns in timer.durations_ns.items():
+        stage_seconds.observe(duration_ns / 1e9, stage)
+    generation_seconds.observe((time.perf_counter_ns() - timer.started_ns) / 1e9, outcome)
+    requests_total.inc(outcome)
@@ -0,0 +1,199 @@
+"""
+Milestone lookups for weekly check-ins and development summaries.
+
+The milestone table is small and static (NHS/WHO milestones for weeks
+1-52), so it is loaded once into an index that precomputes, for every week
+and domain, which milestones are current, which came just before and which
+are coming up next. Requests read the index without touching the database.
+
+Milestones come from the versioned seed file (data/milestones.json) or
+from the milestone_data table (MILESTONE_SOURCE). A background task checks
+the source's version every MILESTONE_RELOAD_SECONDS and swaps in a freshly
+built index when it changes.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from seed_milestones import DEFAULT_MILESTONES_PATH, MAX_WEEK, MILESTONE_COLUMNS, MILESTONE_DOMAINS, get_db_connection, read_milestones
+
+logger = logging.getLogger(__name__)
+
+MILESTONE_SOURCES = ("file", "sqlite", "postgres")
+
+# Index key for lookups across every domain
+ALL_DOMAINS = "all"
+
+
+class Milestone(NamedTuple):
+    week_start: int
+    week_end: int
+    domain: str
+    milestone: str
+    tip: Optional[str]
+    red_flag: Optional[str]
+    source: Optional[str]
+    citation_url: Optional[str]
+
+
+class MilestoneWindow(NamedTuple):
+    current: Tuple[Milestone, ...]
+    previous: Tuple[Milestone, ...]
+    upcoming: Tuple[Milestone, ...]
+
+
+class MilestoneIndex:
+    """Immutable week -> MilestoneWindow table per domain, built once per data version."""
+
+    def __init__(self, milestones: Sequence[Milestone], version: Any):
+        self.version = version
+        self.count = len(milestones)
+        self._windows: Dict[str, List[MilestoneWindow]] = {}
+        for domain in (ALL_DOMAINS, *MILESTONE_DOMAINS):
+            selected = [m for m in milestones if domain == ALL_DOMAINS or m.domain == domain]
+            self._windows[domain] = [self._window(selected, week) for week in range(MAX_WEEK + 1)]
+
+    @staticmethod
+    def _window(milestones: Sequence[Milestone], week: int) -> MilestoneWindow:
+        ended = [m.week_end for m in milestones if m.week_end < week]
+        starting = [m.week_start for m in milestones if m.week_start > week]
+        last_end = max(ended, default=None)
+        next_start = min(starting, default=None)
+        return MilestoneWindow(
+            current=tuple(m for m in milestones if m.week_start <= week <= m.week_end),
+            previous=tuple(m for m in milestones if m.week_end == last_end),
+            upcoming=tuple(m for m in milestones if m.week_start == next_start),
+        )
+
+    def lookup(self, week: int, domain: str = ALL_DOMAINS) -> MilestoneWindow:
+        """Milestones around a baby's age in weeks; older babies get the final weeks' milestones."""
+        windows = self._windows.get(domain)
+        if windows is None:
+            raise KeyError(domain)
+        return windows[min(max(week, 1), MAX_WEEK)]
+
+
+class MilestoneRepository:
+    """Serves lookups from the current MilestoneIndex and reloads it when the source's version changes."""
+
+    def __init__(self, source: str = "file", path: str = DEFAULT_MILESTONES_PATH, sqlite_path: Optional[str] = None,
+                 reload_seconds: float = 60.0):
+        if source not in MILESTONE_SOURCES:
+            raise ValueError(f"Unknown milestone source {source!r}, expected one of {MILESTONE_SOURCES}")
+        self.source = source
+        self.path = path
+        self.sqlite_path = sqlite_path
+        self.reload_seconds = reload_seconds
+        self.reloads = 0
+        self.failures = 0
+        self._file_mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.index = self._build(*self._read())
+
+    def lookup(self, week: int, domain: str = ALL_DOMAINS) -> MilestoneWindow:
+        return self.index.lookup(week, domain)
+
+    def _read(self) -> Tuple[Any, List[Milestone]]:
+        if self.source == "file":
+            self._file_mtime = os.path.getmtime(self.path)
+            version, checksum, rows = read_milestones(self.path)
+            return (version, checksum), [Milestone(*row) for row in rows]
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(MILESTONE_COLUMNS)} FROM milestone_data")
+            rows = cursor.fetchall()
+            return self._db_version(cursor), [Milestone(*row) for row in rows]
+        finally:
+            conn.close()
+
+    def _connect(self) -> Any:
+        if self.source == "sqlite":
+            return sqlite3.connect(self.sqlite_path)
+        conn = get_db_connection()
+        if conn is None:
+            raise ConnectionError("Could not connect to the milestone database")
+        return conn
+
+    @staticmethod
+    def _db_version(cursor: Any) -> Any:
+        try:
+            cursor.execute("SELECT version, checksum FROM milestone_data_version WHERE id = 1")
+        except Exception:
+            return None  # Table loaded by an older seed script
+        row = cursor.fetchone()
+        return tuple(row) if row else None
+
+    def _build(self, version: Any, milestones: List[Milestone]) -> MilestoneIndex:
+        index = MilestoneIndex(milestones, version)
+        logger.info("Indexed %d milestones (version %s) from %s", index.count, version, self.source)
+        return index
+
+    def _source_version(self) -> Any:
+        if self.source == "file":
+            # Only re-read the file once it has been rewritten
+            if os.path.getmtime(self.path) == self._file_mtime:
+                return self.index.version
+            return None
+        conn = self._connect()
+        try:
+            return self._db_version(conn.cursor())
+        finally:
+            conn.close()
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the index if the source's version moved on; returns whether it did."""
+        if self._source_version() == self.index.version:
+            return False
+        version, milestones = self._read()
+        if version == self.index.version:
+            return False  # Rewritten with the same content
+        # Readers keep whichever index they already hold; new lookups see the new one
+        self.index = self._build(version, milestones)
+        self.reloads += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Milestone reload failed: %s", e)
+
+    def start(self) -> None:
+        """Start checking for new versions; call from the running event loop."""
+        if self._task is None and self.reload_seconds > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "version": self.index.version[0] if isinstance(self.index.version, tuple) else self.index.version,
+            "milestones": self.index.count,
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
+
+
+def create_milestone_repository() -> MilestoneRepository:
+    """Build the repository from MILESTONE_* environment variables."""
+    return MilestoneRepository(
+        source=os.getenv("MILESTONE_SOURCE", "file"),
+        path=os.getenv("MILESTONES_PATH") or DEFAULT_MILESTONES_PATH,
+        sqlite_path=os.getenv("MILESTONES_SQLITE_PATH"),
+        reload_seconds=float(os.getenv("MILESTONE_RELOAD_SECONDS", "60")),
+    )
@@ -0,0 +1,118 @@
+"""
+Opening hours as per-weekday slot bitsets.
+
+A day is 96 fifteen-minute slots; bit s of a day's bitset is set when the
+venue is open for the whole of slot s. The family's time window and nap
+windows become masks over the same slots, so "can this venue host a visit
+today" is a couple of ANDs and shifts rather than datetime parsing.
+
+Hours are written in a small subset of the OpenStreetMap opening_hours
+syntax: "Mo-Fr 09:30-17:00; Sa,Su 10:00-12:00,13:00-16:00". Days that are
+not listed are closed; a venue without hours is always open. A period that
+ends at or before it starts ("Fr 22:00-02:00") runs past midnight into the
+next day.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+DAYS = ("Mo", "Tu", "We", "Th", "Fr", "Sa", "Su")
+
+# Bitsets for Monday..Sunday
+WeekHours = Tuple[int, ...]
+ALWAYS_OPEN: WeekHours = (FULL_DAY,) * 7
+
+
+def slot_range(start_minute: int, end_minute: int) -> int:
+    """Slots lying entirely within [start_minute, end_minute)."""
+    first = -(-max(start_minute, 0) // SLOT_MINUTES)  # ceiling
+    last = min(end_minute, 24 * 60) // SLOT_MINUTES
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def touched_slots(start_minute: int, end_minute: int) -> int:
+    """Slots overlapping [start_minute, end_minute) at all."""
+    first = max(start_minute, 0) // SLOT_MINUTES
+    last = -(-min(end_minute, 24 * 60) // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def _minutes(clock: str) -> int:
+    hours, minutes = clock.strip().split(":")
+    total = int(hours) * 60 + int(minutes)
+    if len(minutes) != 2 or int(minutes) >= 60 or not 0 <= total <= 24 * 60:
+        raise ValueError(clock)
+    return total
+
+
+def _days(spec: str) -> Sequence[int]:
+    days = []
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = (DAYS.index(day) for day in part.split("-"))
+            days.extend(range(first, last + 1) if first <= last else [*range(first, 7), *range(0, last + 1)])
+        else:
+            days.append(DAYS.index(part))
+    return days
+
+
+def parse_opening_hours(spec: Optional[str]) -> WeekHours:
+    """Compile an opening hours string into per-weekday bitsets."""
+    if not spec or spec.strip() in ("", "24/7"):
+        return ALWAYS_OPEN
+    week = [0] * 7
+    for rule in filter(None, (rule.strip() for rule in spec.split(";"))):
+        try:
+            day_spec, times = rule.split(None, 1)
+            slots = spill = 0
+            closed = times.strip() == "off"
+            if not closed:
+                for period in times.split(","):
+                    start, end = period.strip().split("-")
+                    start_minute, end_minute = _minutes(start), _minutes(end)
+                    if end_minute > start_minute:
+                        slots |= slot_range(start_minute, end_minute)
+                    else:
+                        # Overnight, or "18:00-00:00": open until midnight, then on into the next day
+                        slots |= slot_range(start_minute, 24 * 60)
+                        spill |= slot_range(0, end_minute)
+            for day in _days(day_spec):
+                # A later "off" rule closes a day an earlier rule opened
+                week[day] = 0 if closed else week[day] | slots
+                week[(day + 1) % 7] |= spill
+        except ValueError:
+            raise ValueError(f"Cannot parse opening hours rule {rule!r}")
+    return tuple(week)
+
+
+def runs_of(free: int, slots: int) -> int:
+    """Bits s where slots s..s+slots-1 are all set (the starts of long enough free runs)."""
+    span = 1
+    while span < slots and free:
+        step = min(span, slots - span)
+        free &= free >> step
+        span += step
+    return free
+
+
+def can_fit(free: int, minutes: int) -> bool:
+    """Whether a visit of this length fits anywhere in the free slots."""
+    return runs_of(free, -(-minutes // SLOT_MINUTES)) != 0
+
+
+def earliest_visit(free: int, ready: int, minutes: int) -> Optional[int]:
+    """Earliest start at or after `ready` (minutes since midnight) for a visit inside the free slots."""
+    needed = touched_slots(ready, ready + minutes)
+    if needed and free & needed == needed:
+        return ready
+    starts = runs_of(free, -(-minutes // SLOT_MINUTES)) >> (ready // SLOT_MINUTES + 1)
+    if not starts:
+        return None
+    return (ready // SLOT_MINUTES + 1 + (starts & -starts).bit_length() - 1) * SLOT_MINUTES
@@ -0,0 +1,138 @@
+"""
+Result cache for generated weekend plans.
+
+Families in the same postcode district with similar children, budgets and
+preferences get the same plans, so results are cached under a canonical
+hash of the normalised request: outward postcode, age in whole months,
+budget band, preferences and time window. The userId is never part of the
+key. A local in-memory store (see stores.py) sits in front of an optional
+SQLite store that every worker on the host can share.
+
+Plans are always computed from the family's own home, but a cached plan may
+have been computed for another home in the same postcode district, so its
+travel times to and from home are only district-level. Cached results say so
+with travelTimesFrom="district".
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from geocoder import outward_code
+from stores import MemoryStore, SQLiteStore, Store
+
+# Requests are computed with their budget rounded down to this band, so a
+# cached plan never exceeds the budget of anyone who shares it
+BUDGET_BAND = 10
+MIN_BUDGET = 10
+
+
+class PlanCache:
+    """Pipeline results keyed on the normalised request, in a local store with an optional shared one."""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        shared: Optional[Store] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.local = MemoryStore("plan_cache", max_entries, ttl_seconds)
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def prepare(self, inputs: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Return the cache key and the normalised inputs to compute with.
+
+        Only the key is coarsened to the outward code; the inputs keep the
+        family's own origin.
+        """
+        if not self.enabled:
+            return None, inputs
+
+        outward = outward_code(inputs["postcode"])
+        budget = max(MIN_BUDGET, inputs["budget"] // BUDGET_BAND * BUDGET_BAND)
+        age_months = int(inputs["avg_age_months"])
+        preferences = inputs["activity_preferences"]
+
+        normalised = dict(inputs)
+        normalised["budget"] = budget
+        normalised["avg_age_months"] = age_months
+
+        canonical = {
+            "outward": outward,
+            "age_months": age_months,
+            "nap_windows": inputs["nap_windows"],
+            "budget": budget,
+            "start_time": inputs["start_time"],
+            "end_time": inputs["end_time"],
+            "max_travel_time": inputs["max_travel_time"],
+            "transport_mode": inputs["transport_mode"],
+            "liked": sorted(preferences.likedActivities),
+            "disliked": sorted(preferences.dislikedActivities),
+            "eat_out": preferences.eatOut,
+            "food_style": preferences.foodStyle,
+            "restaurant_requirements": preferences.restaurantRequirements,
+            "outdoor_weather_ok": inputs["outdoor_weather_ok"],
+            "weather_summary": inputs["weather_summary"],
+            "catalogue": inputs.get("catalogue_generation"),
+        }
+        key = hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+        return key, normalised
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return dict(value, travelTimesFrom="district")
+
+        value = self.shared.get(key) if self.shared is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self.local.put(key, value)
+        return dict(value, travelTimesFrom="district")
+
+    def put(self, key: Optional[str], value: Dict[str, Any]) -> None:
+        if key is None:
+            return
+        self.local.put(key, value)
+        if self.shared is not None:
+            self.shared.put(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+        }
+
+
+def create_plan_cache() -> PlanCache:
+    """Build the plan cache from PLAN_CACHE_* environment variables."""
+    ttl_seconds = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "900"))
+    max_entries = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1024"))
+    shared_path = os.getenv("PLAN_CACHE_SQLITE_PATH")
+    return PlanCache(
+        ttl_seconds=ttl_seconds,
+        max_entries=max_entries,
+        shared=SQLiteStore("plan_cache", max_entries * 10, ttl_seconds, shared_path) if shared_path else None,
+    )
@@ -0,0 +1,42 @@
+"""
+Plan sessions for quick re-planning after small preference tweaks.
+
+A session remembers the inputs behind a family's last plans and, once the
+family asks for a change, the fetched candidates and each of their score
+terms. A delta such as "budget 60 -> 40" then only recomputes the terms that
+read the changed inputs and rebuilds the itineraries, skipping input
+collection, candidate fetching and full scoring.
+
+Sessions hold NumPy arrays and live in the serving process's memory for a
+short TTL. A request that lands on another worker, or after expiry, gets a
+404 and falls back to a full generation.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from stores import MemoryStore
+from venue_catalogue import CandidateSet
+
+
+@dataclass
+class PlanSession:
+    inputs: Dict[str, Any]  # Request inputs, as passed to store_and_log
+    compute_inputs: Dict[str, Any]  # Normalised inputs the plans were computed with
+    candidates: Optional[CandidateSet] = None  # Filled in by the first delta
+    fetched_travel_time: int = 0  # max_travel_time the candidates were fetched for
+    terms: Dict[str, np.ndarray] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def create_session_store() -> MemoryStore:
+    """In-process session store sized by PLAN_SESSION_CAPACITY and PLAN_SESSION_TTL_SECONDS."""
+    return MemoryStore(
+        "plan_sessions",
+        capacity=int(os.getenv("PLAN_SESSION_CAPACITY", "1000")),
+        ttl_seconds=float(os.getenv("PLAN_SESSION_TTL_SECONDS", "600")),
+    )
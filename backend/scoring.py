@@ -0,0 +1,168 @@
+"""
+Vectorised candidate scoring.
+
+The catalogue's static venue attributes are stored once as columnar NumPy
+arrays. Each request gathers the columns for its candidates, applies every
+bonus and penalty as an array operation and selects the top results with
+argpartition instead of sorting the whole candidate set.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from weather import OUTDOOR_CATEGORIES
+
+# Category preferences are matched with a bitmask, so a catalogue may hold
+# at most 63 distinct categories
+MAX_CATEGORIES = 63
+
+
+@dataclass
+class VenueColumns:
+    baby_friendly_score: np.ndarray
+    cost_estimate: np.ndarray
+    category_code: np.ndarray
+    weather_suitable: np.ndarray
+    outdoor: np.ndarray
+    category_codes: Dict[str, int]
+
+    def category_mask(self, categories: Iterable[str]) -> int:
+        """Bitmask of the given category names (unknown names are ignored)."""
+        mask = 0
+        for category in categories:
+            code = self.category_codes.get(category)
+            if code is not None:
+                mask |= 1 << code
+        return mask
+
+
+def build_columns(venues: List[Any]) -> VenueColumns:
+    """Build columnar arrays for a list of venue records."""
+    category_codes: Dict[str, int] = {}
+    for venue in venues:
+        category_codes.setdefault(venue.category, len(category_codes))
+    if len(category_codes) > MAX_CATEGORIES:
+        raise ValueError(f"Catalogue has {len(category_codes)} categories, the maximum is {MAX_CATEGORIES}")
+
+    count = len(venues)
+    return VenueColumns(
+        baby_friendly_score=np.fromiter((v.baby_friendly_score for v in venues), dtype=np.float64, count=count),
+        cost_estimate=np.fromiter((v.cost_estimate for v in venues), dtype=np.int32, count=count),
+        category_code=np.fromiter((category_codes[v.category] for v in venues), dtype=np.int8, count=count),
+        weather_suitable=np.fromiter((v.weather_suitable for v in venues), dtype=np.bool_, count=count),
+        outdoor=np.fromiter((v.category in OUTDOOR_CATEGORIES for v in venues), dtype=np.bool_, count=count),
+        category_codes=category_codes,
+    )
+
+
+# The request inputs each scoring term reads, so a plan session only
+# recomputes the terms a preference change actually affects
+TERM_INPUTS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "base": lambda inputs: None,
+    "liked": lambda inputs: sorted(inputs["activity_preferences"].likedActivities),
+    "disliked": lambda inputs: sorted(inputs["activity_preferences"].dislikedActivities),
+    "travel": lambda inputs: inputs["max_travel_time"],
+    "cost": lambda inputs: inputs["budget"],
+    "weather": lambda inputs: inputs["outdoor_weather_ok"],
+}
+
+
+def stale_terms(previous: Dict[str, Any], inputs: Dict[str, Any]) -> List[str]:
+    """Names of the terms whose inputs differ between two requests."""
+    return [name for name, read in TERM_INPUTS.items() if read(previous) != read(inputs)]
+
+
+def score_terms(columns: VenueColumns, venue_ids: np.ndarray, travel_times: np.ndarray, inputs: Dict[str, Any],
+                only: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """Compute each scoring term (or just those named in only) for the given catalogue rows."""
+    wanted = set(TERM_INPUTS if only is None else only)
+    preferences = inputs["activity_preferences"]
+    terms: Dict[str, np.ndarray] = {}
+    if wanted & {"liked", "disliked"}:
+        category_bits = np.left_shift(np.int64(1), columns.category_code[venue_ids].astype(np.int64))
+
+    # Base score from baby friendliness
+    if "base" in wanted:
+        terms["base"] = columns.baby_friendly_score[venue_ids] * 10
+    # Bonus for preferred activities
+    if "liked" in wanted:
+        liked_mask = np.int64(columns.category_mask(preferences.likedActivities))
+        terms["liked"] = np.where((category_bits & liked_mask) != 0, 5.0, 0.0)
+    # Penalty for disliked activities
+    if "disliked" in wanted:
+        disliked_mask = np.int64(columns.category_mask(preferences.dislikedActivities))
+        terms["disliked"] = np.where((category_bits & disliked_mask) != 0, -10.0, 0.0)
+    # Travel time penalty
+    if "travel" in wanted:
+        terms["travel"] = np.where(travel_times > inputs["max_travel_time"], -20.0, 0.0)
+    # Cost penalty if over 40% of budget
+    if "cost" in wanted:
+        terms["cost"] = np.where(columns.cost_estimate[venue_ids] > inputs["budget"] * 0.4, -5.0, 0.0)
+    # Weather consideration: outdoor venues also depend on the forecast
+    if "weather" in wanted:
+        terms["weather"] = np.where(
+            columns.weather_suitable[venue_ids] & (inputs["outdoor_weather_ok"] | ~columns.outdoor[venue_ids]), 0.0, -3.0
+        )
+    return terms
+
+
+def total_score(terms: Dict[str, np.ndarray]) -> np.ndarray:
+    """Sum the terms in a fixed order, so partial recomputation gives identical totals."""
+    return sum(terms[name] for name in TERM_INPUTS)
+
+
+def score_matrix(columns: VenueColumns, venue_ids: np.ndarray, travel_times: np.ndarray, families: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Score one candidate set for many families at once.
+
+    Row f equals total_score(score_terms(...)) for families[f]; venue
+    columns are gathered once and per-family parameters broadcast across them.
+    """
+    category_bits = np.left_shift(np.int64(1), columns.category_code[venue_ids].astype(np.int64))[None, :]
+    liked_masks = np.array([columns.category_mask(f["activity_preferences"].likedActivities) for f in families], dtype=np.int64)[:, None]
+    disliked_masks = np.array([columns.category_mask(f["activity_preferences"].dislikedActivities) for f in families], dtype=np.int64)[:, None]
+    max_travel_times = np.array([f["max_travel_time"] for f in families], dtype=np.int64)[:, None]
+    budgets = np.array([f["budget"] for f in families], dtype=np.float64)[:, None]
+    outdoor_ok = np.array([f["outdoor_weather_ok"] for f in families], dtype=np.bool_)[:, None]
+
+    # Terms are added in the same order as score_terms so rows match it exactly
+    scores = columns.baby_friendly_score[venue_ids][None, :] * 10
+    scores = scores + np.where((category_bits & liked_masks) != 0, 5.0, 0.0)
+    scores = scores + np.where((category_bits & disliked_masks) != 0, -10.0, 0.0)
+    scores = scores + np.where(travel_times[None, :] > max_travel_times, -20.0, 0.0)
+    scores = scores + np.where(columns.cost_estimate[venue_ids][None, :] > budgets * 0.4, -5.0, 0.0)
+    suitable = columns.weather_suitable[venue_ids][None, :] & (outdoor_ok | ~columns.outdoor[venue_ids][None, :])
+    scores = scores + np.where(suitable, 0.0, -3.0)
+    return scores
+
+
+def top_k_order(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the top_k highest scores, best first, ties in input order."""
+    if 0 < top_k < len(scores):
+        selected = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Re-sort the selection by (score desc, position asc) to match sorted()
+        return selected[np.lexsort((selected, -scores[selected]))]
+    return np.argsort(-scores, kind="stable")
+
+
+def plan_top_k_order(columns: VenueColumns, venue_ids: np.ndarray, scores: np.ndarray,
+                     plan_categories: Sequence[Optional[Iterable[str]]], top_k: int) -> np.ndarray:
+    """Positions in the top_k of any plan's categories, best first, ties in input order.
+
+    Plans only choose from their own categories, so a single cut over all
+    categories can leave a plan with nothing to choose from. None stands
+    for a plan that accepts every category.
+    """
+    if not 0 < top_k < len(scores):
+        return top_k_order(scores, top_k)
+    category_bits = np.left_shift(np.int64(1), columns.category_code[venue_ids].astype(np.int64))
+    selected = []
+    for categories in plan_categories:
+        if categories is None:
+            selected.append(top_k_order(scores, top_k))
+        else:
+            positions = np.flatnonzero(category_bits & np.int64(columns.category_mask(categories)))
+            selected.append(positions[top_k_order(scores[positions], top_k)])
+    selected = np.unique(np.concatenate(selected))
+    return selected[np.lexsort((selected, -scores[selected]))]
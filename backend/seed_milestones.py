@@ -2,16 +2,112 @@
 """
 Seed milestone data for Weekly Baby Genie
 Based on NHS and WHO guidelines for baby development
+
+Milestones live in a versioned JSON file (data/milestones.json). The loader
+streams them into a staging table (COPY FROM STDIN on Postgres) and then, in
+the same transaction, deletes rows that are no longer in the file and
+inserts the new or changed ones. Readers see either the old set or the new
+one, never an empty table, and re-running an unchanged file changes nothing.
+
+Usage:
+    python seed_milestones.py [--file data/milestones.json] [--sqlite milestones.db] [--force]
 """
 
+import argparse
+import csv
+import hashlib
+import io
+import json
 import os
-import psycopg2
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
+DEFAULT_MILESTONES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "milestones.json")
+
+MILESTONE_COLUMNS = ("week_start", "week_end", "domain", "milestone", "tip", "red_flag", "source", "citation_url")
+MILESTONE_DOMAINS = ("physical", "social", "communication", "brain", "feeding")
+MAX_WEEK = 52
+
+# Created on SQLite stand-ins only; on Postgres the table already exists
+SQLITE_MILESTONE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS milestone_data ("
+    "week_start INTEGER NOT NULL, week_end INTEGER NOT NULL, "
+    "domain TEXT NOT NULL, milestone TEXT NOT NULL, tip TEXT, red_flag TEXT, source TEXT, citation_url TEXT)"
+)
+
+# Which file version is loaded, so an unchanged file is skipped without staging it
+VERSION_TABLE = (
+    "CREATE TABLE IF NOT EXISTS milestone_data_version ("
+    "id INTEGER PRIMARY KEY, version INTEGER NOT NULL, checksum TEXT NOT NULL, "
+    "row_count INTEGER NOT NULL, loaded_at TEXT NOT NULL)"
+)
+
+Milestone = Tuple[Any, ...]
+
+
+def read_milestones(path: str) -> Tuple[int, str, List[Milestone]]:
+    """Read and validate the milestone file; returns (version, checksum, rows in MILESTONE_COLUMNS order)."""
+    with open(path, "rb") as f:
+        content = f.read()
+    document = json.loads(content)
+    version = int(document["version"])
+
+    rows = []
+    seen = set()
+    for number, record in enumerate(document["milestones"], start=1):
+        missing = [column for column in ("week_start", "week_end", "domain", "milestone") if record.get(column) in (None, "")]
+        if missing:
+            raise ValueError(f"Milestone {number} is missing {', '.join(missing)}")
+        if not 1 <= record["week_start"] <= record["week_end"] <= MAX_WEEK:
+            raise ValueError(f"Milestone {number} has an invalid week range {record['week_start']}-{record['week_end']}")
+        if record["domain"] not in MILESTONE_DOMAINS:
+            raise ValueError(f"Milestone {number} has an unknown domain {record['domain']!r}")
+        row = tuple(record.get(column) for column in MILESTONE_COLUMNS)
+        if row in seen:
+            raise ValueError(f"Milestone {number} duplicates an earlier one")
+        seen.add(row)
+        rows.append(row)
+    return version, hashlib.sha256(content).hexdigest()[:16], rows
+
+
+class CSVStream(io.TextIOBase):
+    """File-like view of rows as CSV text, produced as COPY reads it rather than built up front."""
+
+    def __init__(self, rows: Iterator[Milestone]):
+        self._rows = rows
+        self._out = io.StringIO()
+        self._writer = csv.writer(self._out, lineterminator="\n")
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        unbounded = size is None or size < 0
+        for row in self._rows:
+            # COPY's CSV format reads an unquoted empty field as NULL
+            self._writer.writerow(["" if value is None else value for value in row])
+            if not unbounded and self._out.tell() + len(self._buffer) >= size:
+                break
+        self._buffer += self._out.getvalue()
+        self._out.seek(0)
+        self._out.truncate()
+        if unbounded:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
 def get_db_connection():
     """Get PostgreSQL connection using Render's managed database."""
+    import psycopg2
+
     try:
         connection = psycopg2.connect(
             host=os.getenv("RENDER_DB_HOST"),
@@ -25,116 +121,126 @@ def get_db_connection():
         print(f"Database connection error: {e}")
         return None
 
-def seed_milestone_data():
-    """Seed the database with milestone data."""
-    conn = get_db_connection()
-    if not conn:
-        print("❌ Failed to connect to database")
-        return
-    
+
+def merge_sql(same: str) -> Tuple[str, str]:
+    """Statements moving staging into milestone_data: delete rows not in staging, insert rows not yet present.
+
+    `same` is the dialect's null-safe equality operator.
+    """
+    matches = " AND ".join(f"t.{column} {same} s.{column}" for column in MILESTONE_COLUMNS)
+    columns = ", ".join(MILESTONE_COLUMNS)
+    delete = f"DELETE FROM milestone_data AS t WHERE NOT EXISTS (SELECT 1 FROM milestone_staging s WHERE {matches})"
+    insert = (
+        f"INSERT INTO milestone_data ({columns}) SELECT {columns} FROM milestone_staging s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM milestone_data t WHERE {matches})"
+    )
+    return delete, insert
+
+
+def load_postgres(conn: Any, version: int, checksum: str, rows: List[Milestone], force: bool) -> Optional[Dict[str, int]]:
+    """Load rows in one transaction via COPY into a temporary staging table; None if already loaded."""
+    columns = ", ".join(MILESTONE_COLUMNS)
+    delete, insert = merge_sql("IS NOT DISTINCT FROM")
     try:
-        cursor = conn.cursor()
-        
-        # Clear existing data
-        cursor.execute("DELETE FROM milestone_data")
-        
-        # Milestone data based on NHS and WHO guidelines
-        milestones = [
-            # Week 1-4: Newborn
-            (1, 4, "physical", "Can lift head briefly when on tummy", "Practice tummy time for 2-3 minutes several times a day", "If baby cannot lift head at all by 4 weeks", "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (1, 4, "social", "Makes eye contact and responds to faces", "Spend time face-to-face talking and singing", "If baby doesn't make eye contact by 4 weeks", "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (1, 4, "communication", "Makes cooing sounds", "Respond to sounds and encourage vocalization", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (1, 4, "feeding", "Shows hunger cues and feeds well", "Feed on demand and watch for hunger signs", "If baby is not feeding well or losing weight", "NHS", "https://www.nhs.uk/conditions/baby/breastfeeding/"),
-            
-            # Week 5-8: Early Development
-            (5, 8, "physical", "Moves arms and legs more purposefully", "Provide safe space for movement and exploration", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (5, 8, "social", "Smiles in response to faces and voices", "Talk, sing, and make faces with your baby", "If baby doesn't smile by 8 weeks", "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (5, 8, "communication", "Makes different sounds for different needs", "Learn to recognize your baby's different cries", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (5, 8, "brain", "Follows moving objects with eyes", "Move colorful objects slowly in front of baby's face", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 9-12: Growing Awareness
-            (9, 12, "physical", "Can hold head up when sitting with support", "Practice supported sitting for short periods", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (9, 12, "social", "Recognizes familiar faces and voices", "Spend quality time with consistent caregivers", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (9, 12, "communication", "Babbles and makes vowel sounds", "Have conversations with your baby, taking turns", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (9, 12, "brain", "Reaches for objects and brings them to mouth", "Offer safe toys for exploration", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 13-16: Active Exploration
-            (13, 16, "physical", "Rolls from tummy to back", "Encourage rolling with toys and gentle guidance", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (13, 16, "social", "Laughs and shows joy", "Play peek-a-boo and other interactive games", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (13, 16, "communication", "Responds to name being called", "Call baby's name frequently and positively", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (13, 16, "brain", "Shows interest in mirrors and reflections", "Use mirrors for play and self-discovery", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 17-20: Sitting and Reaching
-            (17, 20, "physical", "Sits with support and may sit briefly alone", "Practice sitting with cushions for support", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (17, 20, "social", "Shows stranger anxiety", "Introduce new people gradually and positively", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (17, 20, "communication", "Makes consonant sounds (b, p, m)", "Repeat sounds back and encourage babbling", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (17, 20, "brain", "Passes objects from hand to hand", "Offer toys that encourage transfer between hands", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 21-24: Crawling Preparation
-            (21, 24, "physical", "Gets into crawling position and rocks", "Encourage crawling with toys just out of reach", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (21, 24, "social", "Plays simple games like pat-a-cake", "Teach and play simple hand games", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (21, 24, "communication", "Understands simple words like 'no' and 'bye'", "Use simple, consistent words and gestures", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (21, 24, "brain", "Looks for hidden objects", "Play hide-and-seek with toys", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 25-28: Crawling and Standing
-            (25, 28, "physical", "Crawls or moves around on tummy", "Create safe spaces for crawling exploration", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (25, 28, "social", "Shows attachment to primary caregivers", "Respond consistently to baby's needs", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (25, 28, "communication", "Says 'mama' or 'dada' meaningfully", "Encourage first words with repetition", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (25, 28, "brain", "Uses pincer grasp to pick up small objects", "Offer finger foods and small toys", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 29-32: Standing and Walking
-            (29, 32, "physical", "Pulls to stand and cruises along furniture", "Provide stable furniture for cruising practice", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (29, 32, "social", "Shows preference for certain people and toys", "Respect baby's preferences while encouraging exploration", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (29, 32, "communication", "Understands simple commands", "Give simple, clear instructions", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (29, 32, "brain", "Points to objects of interest", "Name objects when baby points", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 33-36: First Steps
-            (33, 36, "physical", "Takes first steps or walks with support", "Encourage walking with hands-on support", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (33, 36, "social", "Shows empathy and comfort to others", "Model caring behavior and gentle touch", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (33, 36, "communication", "Says 2-3 words clearly", "Expand on baby's words and encourage talking", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (33, 36, "brain", "Imitates actions and sounds", "Demonstrate actions and encourage imitation", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 37-40: Walking and Talking
-            (37, 40, "physical", "Walks independently", "Provide safe spaces for walking practice", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (37, 40, "social", "Plays alongside other children", "Arrange playdates and group activities", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (37, 40, "communication", "Says 5-10 words", "Read books and talk about everything", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (37, 40, "brain", "Shows problem-solving skills", "Offer puzzles and problem-solving toys", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 41-44: Language Development
-            (41, 44, "physical", "Climbs stairs with help", "Supervise stair climbing and provide support", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (41, 44, "social", "Shows independence and wants to do things alone", "Allow safe independence while staying close", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (41, 44, "communication", "Combines words into simple phrases", "Model simple phrases and encourage repetition", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (41, 44, "brain", "Remembers and anticipates routines", "Establish consistent daily routines", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 45-48: Advanced Skills
-            (45, 48, "physical", "Runs and jumps in place", "Encourage active play and movement", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (45, 48, "social", "Shows concern for others' feelings", "Talk about feelings and model empathy", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (45, 48, "communication", "Uses 50+ words and simple sentences", "Have conversations and expand vocabulary", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (45, 48, "brain", "Shows creativity in play", "Provide open-ended toys and art materials", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            
-            # Week 49-52: Toddler Skills
-            (49, 52, "physical", "Walks up and down stairs independently", "Practice stair skills with supervision", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (49, 52, "social", "Plays cooperatively with others", "Arrange group play and model sharing", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-            (49, 52, "communication", "Uses 200+ words and complex sentences", "Read books, sing songs, and have conversations", None, "WHO", "https://www.who.int/health-topics/child-development"),
-            (49, 52, "brain", "Shows imagination in pretend play", "Encourage pretend play with props and costumes", None, "NHS", "https://www.nhs.uk/conditions/baby/babys-development/"),
-        ]
-        
-        # Insert milestone data
-        cursor.executemany("""
-            INSERT INTO milestone_data (week_start, week_end, domain, milestone, tip, red_flag, source, citation_url)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, milestones)
-        
+        with conn.cursor() as cursor:
+            cursor.execute(VERSION_TABLE)
+            cursor.execute("SELECT version, checksum FROM milestone_data_version WHERE id = 1")
+            if not force and cursor.fetchone() == (version, checksum):
+                conn.rollback()
+                return None
+
+            cursor.execute(f"CREATE TEMP TABLE milestone_staging ON COMMIT DROP AS SELECT {columns} FROM milestone_data WITH NO DATA")
+            cursor.copy_expert(f"COPY milestone_staging ({columns}) FROM STDIN WITH (FORMAT csv)", CSVStream(iter(rows)))
+            staged = cursor.rowcount
+            cursor.execute(delete)
+            deleted = cursor.rowcount
+            cursor.execute(insert)
+            inserted = cursor.rowcount
+            cursor.execute(
+                "INSERT INTO milestone_data_version (id, version, checksum, row_count, loaded_at) VALUES (1, %s, %s, %s, now()::text) "
+                "ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, checksum = EXCLUDED.checksum, "
+                "row_count = EXCLUDED.row_count, loaded_at = EXCLUDED.loaded_at",
+                (version, checksum, staged),
+            )
         conn.commit()
-        print(f"✅ Successfully seeded {len(milestones)} milestone records")
-        
-    except Exception as e:
+    except Exception:
         conn.rollback()
+        raise
+    return {"staged": staged, "inserted": inserted, "deleted": deleted}
+
+
+def load_sqlite(conn: sqlite3.Connection, version: int, checksum: str, rows: List[Milestone], force: bool) -> Optional[Dict[str, int]]:
+    """SQLite stand-in for load_postgres: same staging and merge, with executemany in place of COPY."""
+    columns = ", ".join(MILESTONE_COLUMNS)
+    delete, insert = merge_sql("IS")
+    conn.execute(SQLITE_MILESTONE_TABLE)
+    conn.execute(VERSION_TABLE)
+    if not force and conn.execute("SELECT version, checksum FROM milestone_data_version WHERE id = 1").fetchone() == (version, checksum):
+        return None
+
+    with conn:  # One transaction; rolled back on error
+        conn.execute("DROP TABLE IF EXISTS temp.milestone_staging")
+        conn.execute(f"CREATE TEMP TABLE milestone_staging AS SELECT {columns} FROM milestone_data WHERE 0")
+        staged = conn.executemany(
+            f"INSERT INTO milestone_staging ({columns}) VALUES ({', '.join('?' * len(MILESTONE_COLUMNS))})", rows
+        ).rowcount
+        deleted = conn.execute(delete).rowcount
+        inserted = conn.execute(insert).rowcount
+        conn.execute(
+            "INSERT OR REPLACE INTO milestone_data_version (id, version, checksum, row_count, loaded_at) "
+            "VALUES (1, ?, ?, ?, datetime('now'))",
+            (version, checksum, staged),
+        )
+    return {"staged": staged, "inserted": inserted, "deleted": deleted}
+
+
+def seed_milestone_data(path: str = DEFAULT_MILESTONES_PATH, sqlite_path: Optional[str] = None, force: bool = False) -> bool:
+    """Load the milestone file into Postgres (or a SQLite file) and report counts and timing."""
+    started = time.perf_counter()
+    try:
+        version, checksum, rows = read_milestones(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not read milestone data from {path}: {e}")
+        return False
+
+    if sqlite_path:
+        conn = sqlite3.connect(sqlite_path)
+        load = load_sqlite
+    else:
+        conn = get_db_connection()
+        if not conn:
+            print("❌ Failed to connect to database")
+            return False
+        load = load_postgres
+
+    try:
+        counts = load(conn, version, checksum, rows, force)
+    except Exception as e:
         print(f"❌ Error seeding milestone data: {e}")
+        return False
     finally:
         conn.close()
 
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if counts is None:
+        print(f"✅ Milestone data version {version} ({checksum}) already loaded, nothing to do ({elapsed_ms:.1f} ms)")
+        return True
+    print(
+        f"✅ Loaded milestone data version {version} ({checksum}): {counts['staged']} rows staged, "
+        f"{counts['inserted']} inserted, {counts['deleted']} deleted, "
+        f"{counts['staged'] - counts['inserted']} unchanged in {elapsed_ms:.1f} ms"
+    )
+    return True
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=os.getenv("MILESTONES_PATH") or DEFAULT_MILESTONES_PATH, help="versioned milestone JSON file")
+    parser.add_argument("--sqlite", default=os.getenv("MILESTONES_SQLITE_PATH"), help="load into this SQLite file instead of Postgres")
+    parser.add_argument("--force", action="store_true", help="reload even if this version is already loaded")
+    args = parser.parse_args()
+
     print("🌱 Seeding milestone data...")
-    seed_milestone_data()
-    print("✅ Milestone seeding complete!") 
\ No newline at end of file
+    if not seed_milestone_data(args.file, args.sqlite, args.force):
+        sys.exit(1)
+    print("✅ Milestone seeding complete!")
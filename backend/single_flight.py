@@ -0,0 +1,139 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+Double-clicks and client retries send the same plan request several times
+at once. The first caller for a key runs the work as a task; callers that
+arrive while it is running await that task instead of starting their own,
+and every caller gets the same result or exception. The task is shielded,
+so a caller that disconnects does not cancel the work the others wait on.
+
+Streamed work is shared the same way through a Broadcast: its items are
+kept as they arrive and replayed from the start to every subscriber, so a
+caller that joins late still sees the whole stream.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class Broadcast(Generic[T]):
+    """Items of one async iterator, replayed from the start to every subscriber.
+
+    The source is opened and drained by a task of its own, so one subscriber
+    going away does not end the stream for the others; it is cancelled once
+    every subscriber has gone.
+    """
+
+    def __init__(self, open_source: Callable[[], Awaitable[AsyncIterator[T]]], on_done: Callable[["Broadcast[T]"], None]):
+        loop = asyncio.get_running_loop()
+        self.items: List[T] = []
+        self.done = False
+        self.abandoned = False
+        self.error: Optional[BaseException] = None
+        # Resolves once the source is open, or fails with the error opening it raised
+        self.opened: asyncio.Future = loop.create_future()
+        self._changed: asyncio.Future = loop.create_future()
+        self._subscribers = 0
+        self._on_done = on_done
+        self._task = loop.create_task(self._pump(open_source))
+
+    async def _pump(self, open_source: Callable[[], Awaitable[AsyncIterator[T]]]) -> None:
+        source = None
+        try:
+            source = await open_source()
+            self.opened.set_result(None)
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except BaseException as error:  # re-raised to every subscriber
+            self.error = error
+            if not self.opened.done():
+                self.opened.set_exception(error)
+        finally:
+            self.done = True
+            self._notify()
+            self._on_done(self)
+            if source is not None and hasattr(source, "aclose"):
+                await source.aclose()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.get_running_loop().create_future()
+        changed.set_result(None)
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        """Every item so far, then each new one as it arrives."""
+        self._subscribers += 1
+        try:
+            position = 0
+            while True:
+                if position < len(self.items):
+                    position += 1
+                    yield self.items[position - 1]
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    # Shielded: a subscriber going away must not cancel the shared future
+                    await asyncio.shield(self._changed)
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self.done:
+                self.abandoned = True
+                self._on_done(self)
+                self._task.cancel()
+
+
+class SingleFlight:
+    """At most one running computation per key; duplicates share it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.coalesced = 0
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, Broadcast] = {}
+
+    async def run(self, key: str, work: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Result of the in-flight computation for key, starting it if there is none.
+
+        The flag is True when this caller joined a computation another caller started.
+        """
+        flight = self._tasks.get(key)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            flight = asyncio.ensure_future(work())
+            self._tasks[key] = flight
+            flight.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(flight), joined
+
+    def stream(self, key: str, open_source: Callable[[], Awaitable[AsyncIterator[T]]]) -> Tuple[Broadcast, bool]:
+        """The broadcast in flight for key, opening a new one from open_source if there is none."""
+        broadcast = self._streams.get(key)
+        joined = broadcast is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            broadcast = Broadcast(open_source, on_done=lambda done: self._forget(key, done))
+            self._streams[key] = broadcast
+        return broadcast, joined
+
+    def join(self, key: str) -> Optional[Union[asyncio.Task, Broadcast]]:
+        """Whatever is in flight for key, task or broadcast, counting the caller as coalesced."""
+        flight = self._tasks.get(key) or self._streams.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        return flight
+
+    def _forget(self, key: str, broadcast: Broadcast) -> None:
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._tasks) + len(self._streams), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,267 @@
+"""
+Bounded key-value stores for per-user and per-generation state.
+
+Every store has a capacity, a default TTL and eviction metrics, so memory
+stays flat regardless of uptime. MemoryStore is an in-process LRU;
+SQLiteStore and PostgresStore keep the data durable and out of the
+worker's heap, and trim expired and least recently used rows at most every
+PURGE_INTERVAL_SECONDS, so they can briefly hold more than their capacity.
+Pick one with STORE_BACKEND.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+STORE_BACKENDS = ("memory", "sqlite", "postgres")
+
+# Purge expired rows from durable stores at most this often
+PURGE_INTERVAL_SECONDS = 60
+
+_MISSING = object()
+
+
+class Store:
+    """Base class: a bounded mapping with TTL expiry and eviction metrics."""
+
+    def __init__(self, name: str, capacity: int, ttl_seconds: float):
+        self.name = name
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def put(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.put(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "size": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MemoryStore(Store):
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, name: str, capacity: int, ttl_seconds: float):
+        super().__init__(name, capacity, ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore(Store):
+    """Durable store in a local SQLite file, one table per store."""
+
+    def __init__(self, name: str, capacity: int, ttl_seconds: float, path: str):
+        super().__init__(name, capacity, ttl_seconds)
+        self.path = path
+        self._table = f"store_{name}"
+        self._local = threading.local()
+        self._last_purge = 0.0
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed_at ON {self._table} (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            if row is not None:
+                conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                self.expirations += 1
+            self.misses += 1
+            return default
+        conn.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        conn = self._connection()
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at, now),
+        )
+        if now - self._last_purge > PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            self.expirations += conn.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,)).rowcount
+            evicted = conn.execute(
+                f"DELETE FROM {self._table} WHERE key IN ("
+                f"SELECT key FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.capacity,),
+            ).rowcount
+            self.evictions += max(evicted, 0)
+
+    def delete(self, key: str) -> None:
+        self._connection().execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def __len__(self) -> int:
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+
+class PostgresStore(Store):
+    """Durable store in the Render Postgres database, one table per store."""
+
+    def __init__(self, name: str, capacity: int, ttl_seconds: float):
+        super().__init__(name, capacity, ttl_seconds)
+        import psycopg2
+
+        self._conn = psycopg2.connect(
+            host=os.getenv("RENDER_DB_HOST"),
+            database=os.getenv("RENDER_DB_NAME"),
+            user=os.getenv("RENDER_DB_USER"),
+            password=os.getenv("RENDER_DB_PASSWORD"),
+            port=os.getenv("RENDER_DB_PORT", "5432"),
+        )
+        self._conn.autocommit = True
+        self._table = f"store_{name}"
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "key TEXT PRIMARY KEY, value BYTEA NOT NULL, expires_at DOUBLE PRECISION NOT NULL, "
+            "accessed_at DOUBLE PRECISION NOT NULL)"
+        )
+        self._execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed_at ON {self._table} (accessed_at)")
+
+    def _execute(self, sql: str, params: Tuple = ()) -> Tuple[Optional[tuple], int]:
+        with self._lock, self._conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone() if cursor.description else None
+            return row, cursor.rowcount
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        row, _ = self._execute(
+            f"UPDATE {self._table} SET accessed_at = %s WHERE key = %s AND expires_at > %s RETURNING value",
+            (now, key, now),
+        )
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(bytes(row[0]))
+
+    def put(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._execute(
+            f"INSERT INTO {self._table} (key, value, expires_at, accessed_at) VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at, "
+            "accessed_at = EXCLUDED.accessed_at",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at, now),
+        )
+        if now - self._last_purge > PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            _, expired = self._execute(f"DELETE FROM {self._table} WHERE expires_at <= %s", (now,))
+            self.expirations += max(expired, 0)
+            _, evicted = self._execute(
+                f"DELETE FROM {self._table} WHERE key IN ("
+                f"SELECT key FROM {self._table} ORDER BY accessed_at DESC OFFSET %s)",
+                (self.capacity,),
+            )
+            self.evictions += max(evicted, 0)
+
+    def delete(self, key: str) -> None:
+        self._execute(f"DELETE FROM {self._table} WHERE key = %s", (key,))
+
+    def __len__(self) -> int:
+        row, _ = self._execute(f"SELECT COUNT(*) FROM {self._table}")
+        return row[0]
+
+
+def create_store(name: str, capacity: int, ttl_seconds: float) -> Store:
+    """Build a store using STORE_BACKEND, with STORE_<NAME>_CAPACITY/_TTL_SECONDS overrides."""
+    backend = os.getenv("STORE_BACKEND", "memory")
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown store backend {backend!r}, expected one of {STORE_BACKENDS}")
+
+    prefix = f"STORE_{name.upper()}"
+    capacity = int(os.getenv(f"{prefix}_CAPACITY", str(capacity)))
+    ttl_seconds = float(os.getenv(f"{prefix}_TTL_SECONDS", str(ttl_seconds)))
+
+    if backend == "sqlite":
+        return SQLiteStore(name, capacity, ttl_seconds, os.getenv("STORE_SQLITE_PATH", "weekend_planner.db"))
+    if backend == "postgres":
+        return PostgresStore(name, capacity, ttl_seconds)
+    return MemoryStore(name, capacity, ttl_seconds)
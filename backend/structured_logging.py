@@ -0,0 +1,261 @@
+"""
+Structured, non-blocking logging for the weekend planner.
+
+Request handlers and pipeline workers only put records on an in-memory
+queue (QueueHandler); a QueueListener thread formats them as one JSON
+object per line and does the actual I/O, so a slow stdout never stalls a
+request. Every record carries the request ID of the request that produced
+it, including records from executor threads.
+
+Per-stage DEBUG records are sampled per request: LOG_DEBUG_SAMPLE_RATE of
+requests log every stage, the rest log none. Generation events go to their
+own rotating JSON-lines file (GENERATION_LOG_PATH). Under gunicorn the
+master process is that file's only writer (GenerationLogWriter): workers send
+it their generation records over a Unix socket, so one file is rotated in
+one place however often workers are replaced.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import pickle
+import queue
+import random
+import socketserver
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Set per request by the HTTP middleware; "-" outside a request
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+debug_sampled_var: contextvars.ContextVar[bool] = contextvars.ContextVar("debug_sampled", default=False)
+
+# Events written to the generation log, one JSON object per line
+GENERATION_LOGGER = "generation"
+
+# The app's own loggers (module names). Only these are opened up to DEBUG for
+# sampling, so libraries never build DEBUG records just to have them dropped.
+APP_LOGGERS = (
+    "main", "catalogue_store", "enrichment", "geocoder", "ingest", "maps",
+    "milestones", "travel_matrix", "venue_catalogue", "weather",
+)
+
+# Attributes every LogRecord has; anything else came from `extra=` and is emitted as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+DEFAULT_GENERATION_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "generations.jsonl")
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request ID and apply per-request DEBUG sampling.
+
+    Runs in the thread that logs, before the record is queued, so the
+    request context is still available.
+    """
+
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level and not (record.levelno >= logging.DEBUG and debug_sampled_var.get()):
+            return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def start_request(request_id: Optional[str] = None, sample_rate: Optional[float] = None) -> str:
+    """Bind a request ID (and the DEBUG sampling decision) to the current context."""
+    request_id = request_id or os.urandom(8).hex()
+    rate = DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate
+    request_id_var.set(request_id)
+    debug_sampled_var.set(rate > 0 and random.random() < rate)
+    return request_id
+
+
+class RequestIdMiddleware:
+    """ASGI middleware binding each HTTP request to an ID (X-Request-ID, or a new one) and echoing it back."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        supplied = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")[:MAX_REQUEST_ID_LENGTH]
+        request_id = start_request(supplied if supplied.isprintable() else None).encode("latin-1")
+
+        async def send_with_request_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER, request_id)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
+
+
+def capture_context() -> Tuple[str, bool]:
+    """The current request ID and sampling decision, for handing to another process."""
+    return request_id_var.get(), debug_sampled_var.get()
+
+
+def run_in_context(context: Tuple[str, bool], fn: Callable[..., Any], *args: Any) -> Any:
+    """Run fn(*args) with a request context captured by capture_context."""
+    request_id_var.set(context[0])
+    debug_sampled_var.set(context[1])
+    return fn(*args)
+
+
+def generation_log_path() -> str:
+    return os.getenv("GENERATION_LOG_PATH") or DEFAULT_GENERATION_LOG_PATH
+
+
+def _generation_file_handler(path: str) -> logging.Handler:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=int(os.getenv("GENERATION_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("GENERATION_LOG_BACKUPS", "5")),
+        encoding="utf-8",
+    )
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+
+class _GenerationRecordReceiver(socketserver.StreamRequestHandler):
+    """Reads the length-prefixed pickled records a worker's SocketHandler sends."""
+
+    def handle(self) -> None:
+        while True:
+            header = self.rfile.read(4)
+            if len(header) < 4:
+                return
+            payload = self.rfile.read(struct.unpack(">L", header)[0])
+            self.server.file_handler.handle(logging.makeLogRecord(pickle.loads(payload)))
+
+
+class GenerationLogWriter:
+    """Writes the generation log on behalf of several worker processes.
+
+    Started in gunicorn's master before workers fork; it exports
+    GENERATION_LOG_SOCKET, and configure_logging in each worker then sends
+    generation records there instead of opening the file itself.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or generation_log_path()
+        self.socket_path: Optional[str] = None
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def start(self) -> None:
+        # A private directory: only this user's processes can send records
+        self.socket_path = os.path.join(tempfile.mkdtemp(prefix="generation-log-"), "writer.sock")
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, _GenerationRecordReceiver)
+        server.daemon_threads = True
+        server.file_handler = _generation_file_handler(self.path)
+        threading.Thread(target=server.serve_forever, name="generation-log-writer", daemon=True).start()
+        self._server = server
+        os.environ["GENERATION_LOG_SOCKET"] = self.socket_path
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server.file_handler.close()
+        self._server = None
+        os.environ.pop("GENERATION_LOG_SOCKET", None)
+        shutil.rmtree(os.path.dirname(self.socket_path), ignore_errors=True)
+
+
+def configure_logging(generation_log: bool = True) -> None:
+    """Route all logging through a queue to JSON (or plain text) output.
+
+    Safe to call again, e.g. in a forked worker process whose parent's
+    listener thread did not survive the fork.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+    formatter: logging.Formatter = JSONFormatter()
+    if os.getenv("LOG_FORMAT", "json") == "text":
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    handlers: List[logging.Handler] = [stream_handler]
+
+    generation_logger = logging.getLogger(GENERATION_LOGGER)
+    if generation_log:
+        socket_path = os.getenv("GENERATION_LOG_SOCKET")
+        if socket_path:
+            # Another process owns the file (see GenerationLogWriter)
+            generation_handler: logging.Handler = logging.handlers.SocketHandler(socket_path, None)
+        else:
+            generation_handler = _generation_file_handler(generation_log_path())
+        # Generation events go only to their file, everything else only to stdout
+        generation_handler.addFilter(lambda record: record.name == GENERATION_LOGGER)
+        stream_handler.addFilter(lambda record: record.name != GENERATION_LOGGER)
+        handlers.append(generation_handler)
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter(level))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    # Sampled DEBUG records from the app must reach the filter; unsampled ones stop there
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(logging.DEBUG if DEBUG_SAMPLE_RATE > 0 else logging.NOTSET)
+    generation_logger.setLevel(logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+
+atexit.register(shutdown_logging)
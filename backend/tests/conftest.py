@@ -0,0 +1,32 @@
+"""
+Shared setup: main.py is imported once, against a synthetic catalogue larger
+than SCORING_TOP_K so candidate cuts actually bite.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "benchmarks"))
+
+from synthetic import write_catalogue  # noqa: E402
+
+CATALOGUE_SIZE = 20000
+WORK_DIR = os.path.join(BACKEND_DIR, "data", "benchmarks")
+SCRATCH_DIR = tempfile.mkdtemp(prefix="planner-tests-")
+
+os.environ.update({
+    "VENUE_CATALOGUE_PATH": write_catalogue(CATALOGUE_SIZE, os.path.join(WORK_DIR, f"venues-{CATALOGUE_SIZE}-0.json")),
+    "CATALOGUE_DIR": os.path.join(WORK_DIR, f"catalogue-{CATALOGUE_SIZE}-0"),
+    "TRAVEL_MATRIX_DIR": os.path.join(WORK_DIR, "travel_matrix"),
+    "TRAVEL_MATRIX_CUTOFF_KM": "2",
+    "TRAVEL_MATRIX_NEIGHBOURS": "32",
+    "MAP_CACHE_DIR": os.path.join(SCRATCH_DIR, "maps"),
+    "GENERATION_LOG_PATH": os.path.join(SCRATCH_DIR, "generations.jsonl"),
+    "PLAN_CACHE_MAX_ENTRIES": "0",
+    # Routes must not depend on how fast the machine is
+    "ITINERARY_TIME_LIMIT_MS": "60000",
+    "STORE_BACKEND": "memory",
+})
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+import main
+from executor import PlanExecutor
+from synthetic import synthetic_requests
+
+
+def test_interactive_request_is_admitted_while_a_batch_runs(monkeypatch):
+    executor = PlanExecutor("thread", max_workers=2, max_queue=0)
+    monkeypatch.setattr(main, "plan_executor", executor)
+    monkeypatch.setattr(main, "BATCH_CHUNK_SIZE", 1)
+
+    release = threading.Event()
+    compute_region_plans = main.compute_region_plans
+
+    def held_region_plans(families):
+        release.wait(10)
+        return compute_region_plans(families)
+
+    monkeypatch.setattr(main, "compute_region_plans", held_region_plans)
+    batch = [main.WeekendRequest(**body) for body in synthetic_requests(4, seed=1)]
+    interactive = main.WeekendRequest(**synthetic_requests(1, seed=2)[0])
+
+    async def scenario():
+        batch_task = asyncio.create_task(main.generate_weekend_plans_batch_async(batch))
+        while executor.in_flight < executor.max_workers - main.BATCH_RESERVED_WORKERS:
+            await asyncio.sleep(0.01)
+        try:
+            result = await main.generate_weekend_plans_async(interactive)
+        finally:
+            release.set()
+        return result, await batch_task
+
+    try:
+        result, outcomes = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert result["plans"]
+    assert [outcome["status"] for outcome in outcomes] == [200] * len(batch)
@@ -0,0 +1,31 @@
+import main
+from itinerary import parse_clock
+from synthetic import synthetic_requests
+
+
+def plans_for(request_body):
+    inputs = main.collect_inputs(main.WeekendRequest(**request_body))
+    return inputs, main.build_itineraries(main.score_and_rank(main.fetch_candidates(inputs), inputs), inputs)["plans"]
+
+
+def test_stop_travel_fields_describe_the_leg_into_the_stop():
+    checked = 0
+    for inputs, plans in map(plans_for, synthetic_requests(10, seed=7)):
+        for plan in plans:
+            check_legs(plan, inputs)
+            checked += 1
+    assert checked
+
+
+def check_legs(plan, inputs):
+    previous_departure = parse_clock(inputs["start_time"])
+    for stop in plan.stops:
+        assert stop.timeBreakdown.startswith(f"{stop.travelTime}min travel,")
+        assert stop.transportDetails["duration"] == stop.travelTime
+        assert stop.transportDetails["instructions"].endswith(f"{stop.travelTime} minutes to {stop.name}")
+        assert parse_clock(stop.arrivalTime) >= previous_departure + stop.travelTime
+        previous_departure = parse_clock(stop.departureTime)
+    *visits, last = plan.stops
+    assert all(stop.returnTravelTime is None for stop in visits)
+    assert last.timeBreakdown.endswith(f"then {last.returnTravelTime}min travel home")
+    assert sum(stop.travelTime for stop in plan.stops) + last.returnTravelTime == plan.totalTravelTime
@@ -0,0 +1,51 @@
+import pytest
+
+from geocoder import normalise_postcode, open_geocoder, outward_code
+
+POSTCODES_CSV = (
+    "pcds,lat,long\n"
+    "KT1 1AA,51.4100,-0.3000\n"
+    "KT1 2BB,51.4200,-0.3100\n"
+    "SW1A 1AA,51.5010,-0.1416\n"
+    "E1 6AN,51.5200,-0.0700\n"
+    "ZZ9 9ZZ,99.999999,0.000000\n"
+)
+
+
+@pytest.fixture
+def geocoder(tmp_path):
+    csv_path = tmp_path / "postcodes.csv"
+    csv_path.write_text(POSTCODES_CSV)
+    geocoder = open_geocoder(str(csv_path), str(tmp_path / "postcodes.bin"))
+    yield geocoder
+    geocoder.close()
+
+
+@pytest.mark.parametrize("postcode, normalised, outward", [
+    ("kt1 1aa", "KT11AA", "KT1"),
+    (" KT11AA ", "KT11AA", "KT1"),
+    ("sw1a\t1aa", "SW1A1AA", "SW1A"),
+    ("E16AN", "E16AN", "E1"),
+    ("kt1", "KT1", "KT1"),
+])
+def test_postcode_normalisation(postcode, normalised, outward):
+    assert normalise_postcode(postcode) == normalised
+    assert outward_code(postcode) == outward
+
+
+def test_lookup_ignores_case_and_spacing(geocoder):
+    assert len(geocoder) == 4  # The row without a grid reference is dropped
+    assert geocoder.lookup("sw1a1aa") == pytest.approx((51.5010, -0.1416), abs=1e-4)
+    assert geocoder.lookup(" e1  6an ") == pytest.approx((51.52, -0.07), abs=1e-4)
+
+
+@pytest.mark.parametrize("postcode", ["KT1 9ZZ", "ZZ9 9ZZ", "NOTAPOSTCODE", "", "KT1"])
+def test_lookup_misses(geocoder, postcode):
+    assert geocoder.lookup(postcode) is None
+
+
+def test_resolve_falls_back_to_the_outward_centroid(geocoder):
+    assert geocoder.resolve("KT1 1AA") == pytest.approx((51.41, -0.30), abs=1e-4)
+    assert geocoder.resolve("KT1 9ZZ") == pytest.approx((51.415, -0.305), abs=1e-4)
+    assert geocoder.resolve("kt1") == pytest.approx((51.415, -0.305), abs=1e-4)
+    assert geocoder.resolve("W1A 0AX") is None
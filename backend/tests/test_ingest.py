@@ -0,0 +1,163 @@
+import io
+import json
+
+import pytest
+
+import ingest as ingest_module
+from catalogue_store import LiveCatalogue, attach, current_generation, read_manifest
+from ingest import ingest
+
+CSV_HEADER = "name,category,location,lat,lon,cost,opening_hours\n"
+
+
+def live_venues(directory):
+    return {venue.name: venue for venue in attach(directory, current_generation(directory)).catalogue.venues.scan()}
+
+
+def test_csv_keeps_coordinates_west_of_greenwich(tmp_path):
+    feed = tmp_path / "venues.csv"
+    feed.write_text(
+        CSV_HEADER
+        + "Canbury Gardens,park,Lower Ham Rd,51.4178,-0.3050,free,\n"
+        + "Broken Row,park,Nowhere,51.41,west,0,\n"
+    )
+    directory = str(tmp_path / "catalogue")
+
+    _, stats = ingest([str(feed)], directory)
+
+    venues = live_venues(directory)
+    assert venues["Canbury Gardens"].lon == -0.305
+    assert venues["Canbury Gardens"].lat == 51.4178
+    assert "Broken Row" not in venues
+    assert stats["bad_coordinates"] == 1
+
+
+def write_feeds(tmp_path):
+    csv_feed = tmp_path / "venues.csv"
+    csv_feed.write_text(
+        CSV_HEADER
+        + "Canbury Gardens,park,Lower Ham Rd,51.4178,-0.3050,free,\n"
+        + "  canbury   GARDENS ,playground,lower ham rd,51.4,-0.3,0,\n"
+        + "Mystery Venue,bowling alley,Somewhere,51.41,-0.30,5,\n"
+        + "Kingston Museum,museum,Wheatfield Way,51.4106,-0.2995,£4.50,Mo-Sa 10:00-17:00\n"
+    )
+    geojson_feed = tmp_path / "venues.geojson"
+    geojson_feed.write_text(json.dumps({
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [-0.2870, 51.4120]},
+             "properties": {"name": "Fairfield Playground", "leisure": "playground", "addr:street": "Fairfield Rd"}},
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [-0.3005, 51.4090]},
+             "properties": {"name": "Riverside Cafe", "amenity": "cafe", "opening_hours": "not a schedule"}},
+        ],
+    }))
+    jsonl_feed = tmp_path / "venues.jsonl"
+    jsonl_feed.write_text(
+        json.dumps({"name": "Kingfisher Pool", "category": "Swimming Pools", "location": "Fairfield Rd",
+                    "latitude": "51.4115", "longitude": "-0.2950", "price": "6"}) + "\n\n"
+        + json.dumps({"name": "Nameless", "category": "park", "lat": 51.41, "lon": -0.3}).replace('"name": "Nameless", ', "") + "\n"
+    )
+    return [str(csv_feed), str(geojson_feed), str(jsonl_feed)]
+
+
+def test_feeds_of_every_format_become_one_generation(tmp_path):
+    directory = str(tmp_path / "catalogue")
+
+    generation, stats = ingest(write_feeds(tmp_path), directory)
+
+    assert current_generation(directory) == generation
+    venues = live_venues(directory)
+    assert sorted(venues) == [
+        "Canbury Gardens", "Fairfield Playground", "Kingfisher Pool", "Kingston Museum", "Riverside Cafe",
+    ]
+    assert venues["Canbury Gardens"].category == "Parks & Playgrounds"
+    assert venues["Canbury Gardens"].cost_estimate == 0
+    assert not venues["Canbury Gardens"].weather_suitable
+    assert venues["Kingston Museum"].cost_estimate == 4
+    assert venues["Kingston Museum"].opening_hours == "Mo-Sa 10:00-17:00"
+    assert (venues["Fairfield Playground"].lat, venues["Fairfield Playground"].lon) == (51.4120, -0.2870)
+    assert venues["Riverside Cafe"].category == "Cafes & Restaurants"
+    assert venues["Riverside Cafe"].opening_hours is None
+    assert (venues["Kingfisher Pool"].lat, venues["Kingfisher Pool"].lon, venues["Kingfisher Pool"].cost_estimate) == (51.4115, -0.2950, 6)
+    assert stats["duplicate"] == 1
+    assert stats["unknown_category"] == 1
+    assert stats["missing_name"] == 1
+    assert stats["bad_opening_hours"] == 1
+    assert stats["venues"] == 5
+
+
+def test_delta_replaces_and_deletes_venues(tmp_path):
+    directory = str(tmp_path / "catalogue")
+    base, _ = ingest(write_feeds(tmp_path), directory)
+    delta_feed = tmp_path / "delta.jsonl"
+    delta_feed.write_text(
+        json.dumps({"name": "Kingston Museum", "category": "museum", "location": "Wheatfield Way",
+                    "lat": 51.4106, "lon": -0.2995, "cost": 0}) + "\n"
+        + json.dumps({"name": "Riverside Cafe", "deleted": True}) + "\n"
+        + json.dumps({"name": "Canbury Gardens", "location": "Lower Ham Rd", "deleted": "yes"}) + "\n"
+        + json.dumps({"name": "New Soft Play", "category": "soft play", "location": "Eden St", "lat": 51.41, "lon": -0.30}) + "\n"
+    )
+
+    generation, stats = ingest([str(delta_feed)], directory, delta=True)
+
+    assert generation != base
+    venues = live_venues(directory)
+    assert sorted(venues) == ["Fairfield Playground", "Kingfisher Pool", "Kingston Museum", "New Soft Play"]
+    assert venues["Kingston Museum"].cost_estimate == 0
+    assert stats["deleted"] == 2
+    assert read_manifest(directory, generation)["source"]["base"] == base
+
+
+def test_delta_needs_a_live_generation(tmp_path):
+    feed = tmp_path / "delta.jsonl"
+    feed.write_text(json.dumps({"name": "Anything", "deleted": True}) + "\n")
+    with pytest.raises(ValueError):
+        ingest([str(feed)], str(tmp_path / "catalogue"), delta=True)
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 16, 61])
+def test_json_array_items_across_chunk_boundaries(monkeypatch, chunk):
+    document = {
+        "type": "FeatureCollection",
+        "name": "features in a name",
+        "features": [{"type": "Feature", "properties": {"name": f"Venue {index}", "note": "] , [ \\" * index}} for index in range(12)],
+    }
+    monkeypatch.setattr(ingest_module, "READ_CHUNK", chunk)
+
+    items = list(ingest_module._json_array_items(io.StringIO(json.dumps(document)), "features"))
+
+    assert items == document["features"]
+
+
+def test_json_array_items_rejects_an_unterminated_array(monkeypatch):
+    monkeypatch.setattr(ingest_module, "READ_CHUNK", 4)
+    with pytest.raises(ValueError):
+        list(ingest_module._json_array_items(io.StringIO('{"features": [{"a": 1}, {"b": '), "features"))
+
+
+def test_live_catalogue_swaps_while_a_request_holds_the_older_generation(tmp_path):
+    directory = str(tmp_path / "catalogue")
+    feeds = write_feeds(tmp_path)
+    first, _ = ingest(feeds, directory)
+    swapped = []
+    live = LiveCatalogue(directory, json_path=str(tmp_path / "unused.json"), reload_seconds=0, on_swap=swapped.append)
+    assert not live.reload_if_changed()
+
+    # A request pins the generation it started on
+    pinned = live.get().name
+    delta_feed = tmp_path / "delta.jsonl"
+    delta_feed.write_text(json.dumps({"name": "New Soft Play", "category": "soft play", "location": "Eden St",
+                                      "lat": 51.41, "lon": -0.30}) + "\n")
+    second, _ = ingest([str(delta_feed)], directory, delta=True)
+
+    assert live.reload_if_changed()
+    assert [served.name for served in swapped] == [second]
+    assert live.get().name == second
+    assert len(live.get().catalogue) == 6
+    held = live.get(pinned)
+    assert held.name == first
+    assert len(held.catalogue) == 5
+    assert "New Soft Play" not in {venue.name for venue in held.catalogue.venues.scan()}
+    # A generation that has since been deleted falls back to the current one
+    assert live.get("0000000000000000").name == second
+    assert live.stats()["reloads"] == 1
@@ -0,0 +1,92 @@
+import json
+import sqlite3
+
+from milestones import Milestone, MilestoneIndex, MilestoneRepository
+from seed_milestones import DEFAULT_MILESTONES_PATH, MILESTONE_COLUMNS, seed_milestone_data
+
+
+def write_milestones(path, version, milestones):
+    path.write_text(json.dumps({"version": version, "milestones": milestones}))
+    return str(path)
+
+
+def milestone(week_start, week_end, domain, text):
+    return {"week_start": week_start, "week_end": week_end, "domain": domain, "milestone": text,
+            "tip": None, "red_flag": None, "source": "NHS", "citation_url": None}
+
+
+def loaded(sqlite_path):
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(MILESTONE_COLUMNS)} FROM milestone_data").fetchall()
+        version = conn.execute("SELECT version, row_count FROM milestone_data_version WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    return sorted(rows), version
+
+
+def test_sqlite_round_trip_stages_once_and_skips_an_unchanged_file(tmp_path, capsys):
+    sqlite_path = str(tmp_path / "milestones.db")
+    with open(DEFAULT_MILESTONES_PATH) as f:
+        count = len(json.load(f)["milestones"])
+
+    assert seed_milestone_data(DEFAULT_MILESTONES_PATH, sqlite_path)
+    assert f"{count} rows staged, {count} inserted, 0 deleted" in capsys.readouterr().out
+    rows, version = loaded(sqlite_path)
+    assert len(rows) == count and version == (1, count)
+
+    assert seed_milestone_data(DEFAULT_MILESTONES_PATH, sqlite_path)
+    assert "already loaded, nothing to do" in capsys.readouterr().out
+    assert loaded(sqlite_path) == (rows, version)
+
+
+def test_sqlite_merge_keeps_unchanged_rows_and_drops_removed_ones(tmp_path, capsys):
+    sqlite_path = str(tmp_path / "milestones.db")
+    kept, removed, added = milestone(1, 4, "physical", "Lifts head"), milestone(5, 8, "social", "Smiles"), milestone(5, 8, "social", "Smiles back")
+    assert seed_milestone_data(write_milestones(tmp_path / "v1.json", 1, [kept, removed]), sqlite_path)
+    assert seed_milestone_data(write_milestones(tmp_path / "v2.json", 2, [kept, added]), sqlite_path)
+
+    assert "2 rows staged, 1 inserted, 1 deleted, 1 unchanged" in capsys.readouterr().out.splitlines()[-1]
+    rows, version = loaded(sqlite_path)
+    assert [row[3] for row in rows] == ["Lifts head", "Smiles back"]
+    assert version == (2, 2)
+
+
+def test_invalid_file_leaves_the_loaded_set_alone(tmp_path):
+    sqlite_path = str(tmp_path / "milestones.db")
+    assert seed_milestone_data(write_milestones(tmp_path / "v1.json", 1, [milestone(1, 4, "physical", "Lifts head")]), sqlite_path)
+    before = loaded(sqlite_path)
+
+    assert not seed_milestone_data(write_milestones(tmp_path / "v2.json", 2, [milestone(6, 3, "physical", "Backwards")]), sqlite_path)
+    assert not seed_milestone_data(write_milestones(tmp_path / "v3.json", 3, [milestone(1, 4, "sleep", "Unknown domain")]), sqlite_path)
+    assert loaded(sqlite_path) == before
+
+
+def test_index_windows_around_a_week():
+    rows = [milestone(1, 4, "physical", "Lifts head"), milestone(5, 8, "social", "Smiles"),
+            milestone(9, 12, "physical", "Rolls over"), milestone(9, 16, "communication", "Coos")]
+    index = MilestoneIndex([Milestone(*(row[column] for column in MILESTONE_COLUMNS)) for row in rows], version=1)
+
+    window = index.lookup(6)
+    assert [m.milestone for m in window.current] == ["Smiles"]
+    assert [m.milestone for m in window.previous] == ["Lifts head"]
+    assert [m.milestone for m in window.upcoming] == ["Rolls over", "Coos"]
+    physical = index.lookup(6, "physical")
+    assert (physical.current, [m.milestone for m in physical.upcoming]) == ((), ["Rolls over"])
+    # Ages past the table read its final week
+    assert index.lookup(80) == index.lookup(52)
+
+
+def test_repository_reloads_from_sqlite_when_the_version_changes(tmp_path):
+    sqlite_path = str(tmp_path / "milestones.db")
+    assert seed_milestone_data(write_milestones(tmp_path / "v1.json", 1, [milestone(1, 4, "physical", "Lifts head")]), sqlite_path)
+    repository = MilestoneRepository("sqlite", sqlite_path=sqlite_path, reload_seconds=0)
+    held = repository.index
+    assert not repository.reload_if_changed()
+
+    assert seed_milestone_data(write_milestones(tmp_path / "v2.json", 2, [milestone(1, 4, "physical", "Holds head up")]), sqlite_path)
+    assert repository.reload_if_changed()
+    assert [m.milestone for m in repository.lookup(2).current] == ["Holds head up"]
+    # A reader holding the old index still sees the old set
+    assert [m.milestone for m in held.lookup(2).current] == ["Lifts head"]
+    assert repository.stats()["version"] == 2 and repository.reloads == 1
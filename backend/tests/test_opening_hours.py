@@ -0,0 +1,83 @@
+import pytest
+
+from opening_hours import ALWAYS_OPEN, FULL_DAY, SLOT_MINUTES, earliest_visit, parse_opening_hours, slot_range
+
+MORNING = slot_range(9 * 60, 12 * 60)
+
+
+def clock(text):
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def hours(start, end):
+    return slot_range(clock(start), clock(end))
+
+
+@pytest.mark.parametrize("spec", [None, "", "  ", "24/7"])
+def test_missing_hours_are_always_open(spec):
+    assert parse_opening_hours(spec) == ALWAYS_OPEN
+
+
+@pytest.mark.parametrize("spec, open_days", [
+    ("Mo-Fr 09:00-12:00", [0, 1, 2, 3, 4]),
+    ("Sa,Su 09:00-12:00", [5, 6]),
+    ("Mo,We-Fr 09:00-12:00", [0, 2, 3, 4]),
+    # A range may wrap past Sunday
+    ("Fr-Mo 09:00-12:00", [0, 4, 5, 6]),
+    ("Mo-Su 09:00-12:00; We off", [0, 1, 3, 4, 5, 6]),
+])
+def test_day_ranges(spec, open_days):
+    assert parse_opening_hours(spec) == tuple(MORNING if day in open_days else 0 for day in range(7))
+
+
+def test_several_periods_and_rules_combine():
+    week = parse_opening_hours("Mo 09:00-12:00,13:00-16:00; Mo 18:00-19:00")
+    assert week[0] == hours("09:00", "12:00") | hours("13:00", "16:00") | hours("18:00", "19:00")
+
+
+def test_partial_slots_are_not_counted_as_open():
+    assert parse_opening_hours("Mo 09:10-10:05")[0] == hours("09:15", "10:00")
+
+
+def test_closing_at_midnight():
+    assert parse_opening_hours("Sa 18:00-00:00") == (0, 0, 0, 0, 0, hours("18:00", "24:00"), 0)
+    assert parse_opening_hours("Su 00:00-24:00")[6] == FULL_DAY
+
+
+def test_overnight_spans_run_into_the_next_day():
+    week = parse_opening_hours("Fr 22:00-02:00; Su 20:00-01:30")
+    assert week[4] == hours("22:00", "24:00")
+    assert week[5] == hours("00:00", "02:00")
+    assert week[6] == hours("20:00", "24:00")
+    # Sunday night spills into Monday
+    assert week[0] == hours("00:00", "01:30")
+    assert earliest_visit(week[5], 0, 90) == 0
+    assert earliest_visit(week[5], 45, 90) is None
+
+
+def test_overnight_spill_adds_to_the_next_days_own_hours():
+    week = parse_opening_hours("Fr 20:00-03:00; Sa 10:00-12:00")
+    assert week[5] == hours("00:00", "03:00") | hours("10:00", "12:00")
+
+
+@pytest.mark.parametrize("spec", [
+    "Mo",
+    "Xx 09:00-12:00",
+    "Mo-Xx 09:00-12:00",
+    "Mo 09:00",
+    "Mo 9-17",
+    "Mo 09:00-17:00-18:00",
+    "Mo 09:00-25:00",
+    "Mo 09:60-10:00",
+    "Mo 09:5-10:00",
+    "Mo ab:cd-10:00",
+    "Mo-Fr 09:00-17:00; Sa sometimes",
+])
+def test_malformed_hours_raise(spec):
+    with pytest.raises(ValueError, match="Cannot parse opening hours rule"):
+        parse_opening_hours(spec)
+
+
+def test_slot_size_matches_the_day():
+    assert FULL_DAY.bit_length() * SLOT_MINUTES == 24 * 60
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+from plan_cache import PlanCache
+from stores import MemoryStore
+
+
+def family_inputs(**changes):
+    inputs = {
+        "postcode": "KT1 1AA",
+        "origin": (51.4123, -0.3007),
+        "budget": 57,
+        "avg_age_months": 14.6,
+        "nap_windows": ["09:30-11:00", "13:30-15:00"],
+        "start_time": "2024-01-06T09:00:00",
+        "end_time": "2024-01-06T17:00:00",
+        "max_travel_time": 30,
+        "transport_mode": "car",
+        "activity_preferences": SimpleNamespace(
+            likedActivities=["Parks & Playgrounds", "Cafes & Restaurants"],
+            dislikedActivities=[],
+            eatOut=True,
+            foodStyle=None,
+            restaurantRequirements=[],
+        ),
+        "outdoor_weather_ok": True,
+        "weather_summary": "Dry",
+        "catalogue_generation": "generation-1",
+    }
+    inputs.update(changes)
+    return inputs
+
+
+def test_families_in_one_district_share_a_key_but_keep_their_own_origin():
+    cache = PlanCache(ttl_seconds=900, max_entries=16)
+    first_key, first_inputs = cache.prepare(family_inputs())
+    second_key, second_inputs = cache.prepare(family_inputs(
+        postcode="kt1 2zz", origin=(51.4070, -0.2950), budget=51, avg_age_months=14.1,
+    ))
+
+    assert first_key == second_key
+    assert first_inputs["origin"] == (51.4123, -0.3007)
+    assert second_inputs["origin"] == (51.4070, -0.2950)
+    assert (first_inputs["budget"], first_inputs["avg_age_months"]) == (50, 14)
+
+
+def test_key_changes_with_what_the_plans_depend_on():
+    cache = PlanCache(ttl_seconds=900, max_entries=16)
+    key, _ = cache.prepare(family_inputs())
+    preferences = family_inputs()["activity_preferences"]
+    preferences.likedActivities = ["Cafes & Restaurants", "Parks & Playgrounds"]
+    assert cache.prepare(family_inputs(activity_preferences=preferences))[0] == key
+
+    for changes in (
+        {"postcode": "KT2 5AA"},
+        {"budget": 61},
+        {"transport_mode": "walking"},
+        {"outdoor_weather_ok": False},
+        {"catalogue_generation": "generation-2"},
+    ):
+        assert cache.prepare(family_inputs(**changes))[0] != key
+
+
+def test_cached_plans_are_marked_district_level():
+    cache = PlanCache(ttl_seconds=900, max_entries=16)
+    key, _ = cache.prepare(family_inputs())
+    assert cache.get(key) is None
+
+    cache.put(key, {"plans": [], "generationMs": 0, "weatherSummary": "Dry", "travelTimesFrom": "home"})
+
+    assert cache.get(key)["travelTimesFrom"] == "district"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_shared_store_fills_the_local_one():
+    shared = MemoryStore("shared_plans", 16, 900)
+    key, _ = PlanCache(ttl_seconds=900, max_entries=16).prepare(family_inputs())
+    PlanCache(ttl_seconds=900, max_entries=16, shared=shared).put(key, {"plans": [], "travelTimesFrom": "home"})
+
+    worker = PlanCache(ttl_seconds=900, max_entries=16, shared=shared)
+    assert worker.get(key)["travelTimesFrom"] == "district"
+    assert worker.get(key) is not None
+    assert (worker.stats()["shared_hits"], worker.stats()["hits"]) == (1, 1)
+
+
+def test_disabled_cache_has_no_key():
+    cache = PlanCache(ttl_seconds=0, max_entries=16)
+    inputs = family_inputs()
+    assert cache.prepare(inputs) == (None, inputs)
+    assert cache.get(None) is None
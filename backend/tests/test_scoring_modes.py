@@ -0,0 +1,36 @@
+import pytest
+
+import main
+from synthetic import synthetic_requests
+from conftest import CATALOGUE_SIZE
+
+
+def plans_for(request, mode, monkeypatch):
+    monkeypatch.setattr(main, "SCORING_MODE", mode)
+    inputs = main.collect_inputs(main.WeekendRequest(**request))
+    candidates = main.fetch_candidates(inputs)
+    itineraries = main.build_itineraries(main.score_and_rank(candidates, inputs), inputs)
+    return [(plan.type, [stop.name for stop in plan.stops]) for plan in itineraries["plans"]]
+
+
+def test_catalogue_is_larger_than_the_cut():
+    assert CATALOGUE_SIZE > main.SCORING_TOP_K
+
+
+@pytest.mark.parametrize("request_body", synthetic_requests(60), ids=lambda body: body["userId"])
+def test_numpy_mode_builds_the_same_plans_as_python_mode(request_body, monkeypatch):
+    assert plans_for(request_body, "numpy", monkeypatch) == plans_for(request_body, "python", monkeypatch)
+
+
+@pytest.mark.parametrize("request_body", synthetic_requests(20, seed=3), ids=lambda body: body["userId"])
+def test_replanned_session_builds_the_same_plans_as_python_mode(request_body, monkeypatch):
+    inputs = main.collect_inputs(main.WeekendRequest(**request_body))
+    session = main.PlanSession(inputs=inputs, compute_inputs=inputs)
+    main.rerank_session(session, inputs, inputs)
+    tweaked = dict(inputs, budget=inputs["budget"] + 20)
+    itineraries, _ = main.rerank_session(session, tweaked, tweaked)
+    assert session.inputs is session.compute_inputs is tweaked
+
+    monkeypatch.setattr(main, "SCORING_MODE", "python")
+    expected = main.build_itineraries(main.score_and_rank(main.fetch_candidates(tweaked), tweaked), tweaked)
+    assert [plan.model_dump() for plan in itineraries["plans"]] == [plan.model_dump() for plan in expected["plans"]]
@@ -0,0 +1,70 @@
+import pytest
+
+import stores
+from stores import MemoryStore, SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path, monkeypatch):
+    # Durable stores trim on every write rather than once a minute
+    monkeypatch.setattr(stores, "PURGE_INTERVAL_SECONDS", -1)
+
+    def make(capacity=10, ttl_seconds=60.0):
+        if request.param == "memory":
+            return MemoryStore("things", capacity, ttl_seconds)
+        return SQLiteStore("things", capacity, ttl_seconds, str(tmp_path / "stores.db"))
+
+    return make
+
+
+def test_round_trip(make_store):
+    store = make_store()
+    store["a"] = {"plans": [1, 2]}
+    assert store["a"] == {"plans": [1, 2]}
+    assert "a" in store and "b" not in store
+    assert store.get("b", "default") == "default"
+    del store["a"]
+    with pytest.raises(KeyError):
+        store["a"]
+
+
+def test_expired_entries_are_misses(make_store):
+    store = make_store(ttl_seconds=60)
+    store.put("stale", 1, ttl_seconds=0)
+    store.put("fresh", 2)
+    assert store.get("stale") is None
+    assert store.get("fresh") == 2
+    assert store.stats()["expirations"] == 1
+    assert len(store) == 1
+
+
+def test_sqlite_store_purges_expired_rows_on_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(stores, "PURGE_INTERVAL_SECONDS", -1)
+    store = SQLiteStore("things", 10, 60.0, str(tmp_path / "stores.db"))
+    store.put("stale", 1, ttl_seconds=0)
+    store.put("fresh", 2)
+    assert len(store) == 1
+
+
+def test_capacity_evicts_least_recently_used(make_store):
+    store = make_store(capacity=2)
+    store.put("a", 1)
+    store.put("b", 2)
+    assert store.get("a") == 1
+    store.put("c", 3)
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert (store.get("a"), store.get("c")) == (1, 3)
+    assert store.stats()["evictions"] == 1
+
+
+def test_sqlite_store_trims_only_on_the_purge_interval(tmp_path):
+    store = SQLiteStore("things", 2, 60.0, str(tmp_path / "stores.db"))
+    for key in "abcd":
+        store.put(key, key)
+    # The first write purged; the rest wait for the next interval
+    assert len(store) == 4
+    store._last_purge = 0.0
+    store.put("e", "e")
+    assert len(store) == 2
+    assert store.stats()["evictions"] == 3
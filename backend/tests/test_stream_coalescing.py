@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+
+import main
+from executor import PlanExecutor
+from plan_cache import PlanCache
+from synthetic import synthetic_requests
+
+
+def held_pipeline(monkeypatch):
+    """Run plans on a thread executor, holding each pipeline until released and counting runs."""
+    executor = PlanExecutor("thread", max_workers=2, max_queue=2)
+    monkeypatch.setattr(main, "plan_executor", executor)
+    release = threading.Event()
+    runs = []
+    stream_weekend_plans = main.stream_weekend_plans
+
+    def counted_stream(inputs):
+        runs.append(inputs)
+        release.wait(10)
+        yield from stream_weekend_plans(inputs)
+
+    monkeypatch.setattr(main, "stream_weekend_plans", counted_stream)
+    return executor, release, runs
+
+
+async def read_frames(frames):
+    return [json.loads(frame) async for frame in frames]
+
+
+async def released_once_joined(flight, release):
+    coalesced = flight.coalesced
+    try:
+        while flight.coalesced == coalesced:
+            await asyncio.sleep(0.01)
+    finally:
+        release.set()
+
+
+def test_duplicate_stream_requests_share_one_pipeline(monkeypatch):
+    executor, release, runs = held_pipeline(monkeypatch)
+    request = main.WeekendRequest(**synthetic_requests(1, seed=4)[0])
+
+    async def scenario():
+        releaser = asyncio.create_task(released_once_joined(main.plan_requests_in_flight, release))
+        first = await main.generate_weekend_plan_frames_once(request)
+        second = await main.generate_weekend_plan_frames_once(request)
+        await releaser
+        return await asyncio.gather(read_frames(first), read_frames(second))
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert len(runs) == 1
+    assert [frame["type"] for frame in first] == ["plan"] * (len(first) - 1) + ["summary"]
+    # The duplicate sees the same plans and the same session, not one of its own
+    assert second == first
+    assert executor.in_flight == 0
+
+
+def test_stream_requests_from_different_users_share_one_computation(monkeypatch):
+    executor, release, runs = held_pipeline(monkeypatch)
+    cache = PlanCache(ttl_seconds=900, max_entries=16)
+    monkeypatch.setattr(main, "plan_cache", cache)
+    body = synthetic_requests(1, seed=5)[0]
+    requests = [main.WeekendRequest(**dict(body, userId=user_id)) for user_id in ("first-user", "second-user")]
+
+    async def scenario():
+        releaser = asyncio.create_task(released_once_joined(main.plan_computations_in_flight, release))
+        first = await main.generate_weekend_plan_frames_once(requests[0])
+        second = await main.generate_weekend_plan_frames_once(requests[1])
+        await releaser
+        return await asyncio.gather(read_frames(first), read_frames(second))
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert len(runs) == 1
+    plans = [[frame["plan"] for frame in frames if frame["type"] == "plan"] for frames in (first, second)]
+    assert plans[0] and plans[1] == plans[0]
+    assert first[-1]["sessionId"] != second[-1]["sessionId"]
+    # Only the request the plans were computed for gets travel times from its own home
+    assert [first[-1]["travelTimesFrom"], second[-1]["travelTimesFrom"]] == ["home", "district"]
+    assert executor.in_flight == 0
+
+
+def test_stream_retry_with_idempotency_key_replays_frames(monkeypatch):
+    executor, release, runs = held_pipeline(monkeypatch)
+    release.set()
+    request = main.WeekendRequest(**synthetic_requests(1, seed=6)[0])
+
+    async def scenario():
+        first = await read_frames(await main.generate_weekend_plan_frames_once(request, "submission-1"))
+        retry = await read_frames(await main.generate_weekend_plan_frames_once(request, "submission-1"))
+        return first, retry
+
+    try:
+        first, retry = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert len(runs) == 1
+    assert retry == first
@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import structured_logging
+from structured_logging import GenerationLogWriter, configure_logging, shutdown_logging
+
+
+def test_only_app_loggers_are_opened_up_for_sampled_debug(monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    monkeypatch.setattr(structured_logging, "DEBUG_SAMPLE_RATE", 0.01)
+    try:
+        configure_logging(generation_log=False)
+        assert logging.getLogger().level == logging.INFO
+        assert logging.getLogger("main").isEnabledFor(logging.DEBUG)
+        assert not logging.getLogger("httpx").isEnabledFor(logging.DEBUG)
+        assert not logging.getLogger("uvicorn.error").isEnabledFor(logging.DEBUG)
+
+        monkeypatch.setattr(structured_logging, "DEBUG_SAMPLE_RATE", 0)
+        configure_logging(generation_log=False)
+        assert not logging.getLogger("main").isEnabledFor(logging.DEBUG)
+    finally:
+        shutdown_logging()
+        configure_logging()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import logging, sys
+sys.path.insert(0, {backend!r})
+from structured_logging import configure_logging, shutdown_logging
+configure_logging()
+for index in range(50):
+    logging.getLogger("generation").info("plans generated", extra={{"worker": {worker}, "index": index}})
+shutdown_logging()
+"""
+
+
+def test_workers_share_one_generation_log_through_the_writer(tmp_path, monkeypatch):
+    path = tmp_path / "generations.jsonl"
+    monkeypatch.setenv("GENERATION_LOG_PATH", str(path))
+    writer = GenerationLogWriter()
+    writer.start()
+    try:
+        workers = [
+            subprocess.Popen([sys.executable, "-c", WORKER.format(backend=BACKEND_DIR, worker=worker)], env=dict(os.environ))
+            for worker in range(3)
+        ]
+        assert [worker.wait(60) for worker in workers] == [0, 0, 0]
+        deadline = time.monotonic() + 10
+        while len(path.read_text().splitlines()) < 150 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        writer.stop()
+
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert sorted((entry["worker"], entry["index"]) for entry in entries) == [(w, i) for w in range(3) for i in range(50)]
+    assert {entry["message"] for entry in entries} == {"plans generated"}
+    assert sorted(os.listdir(tmp_path)) == ["generations.jsonl"]
+    assert "GENERATION_LOG_SOCKET" not in os.environ
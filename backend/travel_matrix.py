@@ -0,0 +1,217 @@
+"""
+Precomputed travel times for the weekend planner.
+
+Venue-to-venue times are computed once per catalogue for each venue's
+nearest neighbours and stored on disk as a compact CSR matrix with one
+uint8 minutes row per transport mode. The files are memory-mapped, so
+itinerary building is a lookup rather than a recomputation. Origin-to-venue
+rows are computed with vectorised haversine and kept in an LRU cache, as
+many families share an outward code.
+"""
+
+import hashlib
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from venue_catalogue import (
+    EARTH_RADIUS_KM,
+    GRID_CELL_DEGREES,
+    ROUTE_DETOUR_FACTOR,
+    TRANSPORT_SPEEDS_KMH,
+    CandidateSet,
+    VenueCatalogue,
+    estimate_travel_minutes,
+    haversine_km,
+    transport_speed_kmh,
+)
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_MODES = ("car", "public", "cycling", "walking")
+
+TRANSPORT_VERBS = {
+    "car": "Drive",
+    "public": "Take public transport for",
+    "cycling": "Cycle",
+    "walking": "Walk",
+}
+
+# Each venue stores times to at most this many neighbours within the cutoff;
+# anything further away falls back to an on-the-fly estimate
+MATRIX_NEIGHBOURS = int(os.getenv("TRAVEL_MATRIX_NEIGHBOURS", "128"))
+MATRIX_CUTOFF_KM = float(os.getenv("TRAVEL_MATRIX_CUTOFF_KM", "25"))
+ORIGIN_CACHE_SIZE = int(os.getenv("TRAVEL_ORIGIN_CACHE_SIZE", "256"))
+
+# Largest distance matrix (origins x block venues) computed at once during a build
+BUILD_BLOCK_ENTRIES = 4_000_000
+
+# Minutes are stored as uint8, so longer legs saturate here
+MAX_STORED_MINUTES = 255
+
+DEFAULT_MATRIX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "travel_matrix")
+
+
+def transport_verb(transport_mode: str) -> str:
+    return TRANSPORT_VERBS.get(transport_mode, TRANSPORT_VERBS["car"])
+
+
+def _minutes_per_km(transport_mode: str) -> float:
+    return ROUTE_DETOUR_FACTOR / transport_speed_kmh(transport_mode) * 60
+
+
+def _fingerprint(catalogue: VenueCatalogue) -> str:
+    """Hash of everything the matrix depends on, used as its file name."""
+    digest = hashlib.sha1()
+    digest.update(repr((sorted(TRANSPORT_SPEEDS_KMH.items()), ROUTE_DETOUR_FACTOR, MATRIX_NEIGHBOURS, MATRIX_CUTOFF_KM)).encode())
+    for lat, lon in zip(catalogue.lat.tolist(), catalogue.lon.tolist()):
+        digest.update(f"{lat:.6f},{lon:.6f};".encode())
+    return digest.hexdigest()[:16]
+
+
+class TravelMatrix:
+    """Read-only travel time lookups for one catalogue."""
+
+    def __init__(self, catalogue: VenueCatalogue, indptr: np.ndarray, indices: np.ndarray, minutes: np.ndarray):
+        self.catalogue = catalogue
+        self.indptr = indptr
+        self.indices = indices
+        self.minutes = minutes
+        self._lat = np.radians(catalogue.lat)
+        self._lon = np.radians(catalogue.lon)
+        # Bound per instance so a catalogue reload starts with a cold cache
+        self._origin_row = lru_cache(maxsize=ORIGIN_CACHE_SIZE)(self._compute_origin_row)
+
+    @classmethod
+    def build(cls, catalogue: VenueCatalogue) -> "TravelMatrix":
+        """Compute nearest-neighbour travel times for every venue.
+
+        Works one grid cell at a time: distances from the cell's venues to
+        every venue in the surrounding block of cells within the cutoff are
+        computed as one array, so large catalogues build in seconds.
+        """
+        count = len(catalogue)
+        lat = np.radians(catalogue.lat)
+        lon = np.radians(catalogue.lon)
+        cells = catalogue.cells()
+        row_span = int(math.ceil(MATRIX_CUTOFF_KM / 111.32 / GRID_CELL_DEGREES))
+
+        neighbour_ids: List[np.ndarray] = [np.empty(0, dtype=np.int32)] * count
+        neighbour_distances: List[np.ndarray] = [np.empty(0, dtype=np.float64)] * count
+        for (row, col), cell_ids in cells.items():
+            widest_lat = max(abs(row), abs(row + 1)) * GRID_CELL_DEGREES
+            col_span = int(math.ceil(MATRIX_CUTOFF_KM / (111.32 * max(math.cos(math.radians(widest_lat)), 0.01)) / GRID_CELL_DEGREES))
+            block = np.concatenate([
+                cells[(r, c)]
+                for r in range(row - row_span, row + row_span + 1)
+                for c in range(col - col_span, col + col_span + 1)
+                if (r, c) in cells
+            ]).astype(np.int32)
+            origins = np.array(cell_ids, dtype=np.int32)
+            # Bound the distance matrix to a few million entries
+            step = max(1, BUILD_BLOCK_ENTRIES // max(len(block), 1))
+            for chunk_start in range(0, len(origins), step):
+                chunk = origins[chunk_start:chunk_start + step]
+                a = (np.sin((lat[block][None, :] - lat[chunk][:, None]) / 2) ** 2
+                     + np.cos(lat[chunk])[:, None] * np.cos(lat[block])[None, :]
+                     * np.sin((lon[block][None, :] - lon[chunk][:, None]) / 2) ** 2)
+                distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+                distances[block[None, :] == chunk[:, None]] = np.inf
+                for venue_id, row_distances in zip(chunk, distances):
+                    within = np.flatnonzero(row_distances <= MATRIX_CUTOFF_KM)
+                    if len(within) > MATRIX_NEIGHBOURS:
+                        within = within[np.argpartition(row_distances[within], MATRIX_NEIGHBOURS - 1)[:MATRIX_NEIGHBOURS]]
+                    # CSR rows are sorted by neighbour id for binary search
+                    ids = block[within]
+                    order = np.argsort(ids, kind="stable")
+                    neighbour_ids[venue_id] = ids[order]
+                    neighbour_distances[venue_id] = row_distances[within][order]
+
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in neighbour_ids], out=indptr[1:])
+        indices = np.concatenate(neighbour_ids).astype(np.int32) if count else np.empty(0, dtype=np.int32)
+        distances = np.concatenate(neighbour_distances) if count else np.empty(0, dtype=np.float64)
+        minutes = np.empty((len(TRANSPORT_MODES), len(distances)), dtype=np.uint8)
+        for row, mode in enumerate(TRANSPORT_MODES):
+            minutes[row] = np.clip(np.rint(distances * _minutes_per_km(mode)), 1, MAX_STORED_MINUTES)
+
+        return cls(catalogue, indptr, indices, minutes)
+
+    def save(self, directory: str, fingerprint: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in ("indptr", "indices", "minutes"):
+            path = os.path.join(directory, f"{fingerprint}-{name}.npy")
+            # np.save appends .npy unless the name already ends with it
+            tmp_path = f"{path}.tmp.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, catalogue: VenueCatalogue, directory: str, fingerprint: str) -> Optional["TravelMatrix"]:
+        paths = [os.path.join(directory, f"{fingerprint}-{name}.npy") for name in ("indptr", "indices", "minutes")]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        indptr, indices, minutes = (np.load(path, mmap_mode="r") for path in paths)
+        return cls(catalogue, indptr, indices, minutes)
+
+    def between(self, origin_id: int, destination_id: int, transport_mode: str) -> int:
+        """Travel minutes between two catalogue venues."""
+        if origin_id == destination_id:
+            return 0
+        start, end = self.indptr[origin_id], self.indptr[origin_id + 1]
+        slot = start + int(np.searchsorted(self.indices[start:end], destination_id))
+        if slot < end and self.indices[slot] == destination_id and transport_mode in TRANSPORT_MODES:
+            return int(self.minutes[TRANSPORT_MODES.index(transport_mode), slot])
+        lat, lon = self.catalogue.lat, self.catalogue.lon
+        distance = haversine_km(float(lat[origin_id]), float(lon[origin_id]), float(lat[destination_id]), float(lon[destination_id]))
+        return estimate_travel_minutes(distance, transport_mode)
+
+    def _compute_origin_row(self, lat: float, lon: float, transport_mode: str) -> np.ndarray:
+        phi = np.radians(lat)
+        a = (np.sin((self._lat - phi) / 2) ** 2
+             + np.cos(phi) * np.cos(self._lat) * np.sin((self._lon - np.radians(lon)) / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        row = np.maximum(1, np.rint(distances * _minutes_per_km(transport_mode))).astype(np.int32)
+        row.flags.writeable = False
+        return row
+
+    def origin_row(self, lat: float, lon: float, transport_mode: str) -> np.ndarray:
+        """Travel minutes from an origin to every venue (LRU cached, read-only)."""
+        # Round to ~100m so neighbouring postcodes share a cached row
+        return self._origin_row(round(lat, 3), round(lon, 3), transport_mode)
+
+    def travel_fn(self, candidates: CandidateSet, transport_mode: str) -> Callable[[Optional[int], Optional[int]], int]:
+        """Travel function over candidate positions for the itinerary optimiser."""
+        venue_ids = candidates.venue_ids
+        home_minutes = candidates.travel_times
+        cache: Dict[Tuple[int, int], int] = {}
+
+        def travel(origin: Optional[int], destination: Optional[int]) -> int:
+            if origin == destination:
+                return 0
+            if origin is None or destination is None:
+                return int(home_minutes[destination if origin is None else origin])
+            key = (origin, destination)
+            minutes = cache.get(key)
+            if minutes is None:
+                minutes = self.between(int(venue_ids[origin]), int(venue_ids[destination]), transport_mode)
+                cache[key] = minutes
+            return minutes
+
+        return travel
+
+
+def load_travel_matrix(catalogue: VenueCatalogue, directory: Optional[str] = None) -> TravelMatrix:
+    """Load the matrix for this catalogue from disk, building it on first use."""
+    directory = directory or os.getenv("TRAVEL_MATRIX_DIR", DEFAULT_MATRIX_DIR)
+    fingerprint = _fingerprint(catalogue)
+    matrix = TravelMatrix.load(catalogue, directory, fingerprint)
+    if matrix is None:
+        matrix = TravelMatrix.build(catalogue)
+        matrix.save(directory, fingerprint)
+        logger.info("Built travel matrix %s (%d venue pairs)", fingerprint, len(matrix.indices))
+    return matrix
@@ -0,0 +1,266 @@
+"""
+Venue catalogue for the weekend planner.
+
+Venues are loaded once at startup and bucketed into a lat/lon grid so that
+radius queries only touch the handful of cells around the family's home
+instead of scanning the whole catalogue on every request.
+
+Coordinates, the grid and opening hours are held as flat arrays, so a
+catalogue can be built from venue records or attached, without copying, to
+a memory-mapped generation shared by every worker (see catalogue_store.py).
+"""
+
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from opening_hours import ALWAYS_OPEN, WeekHours, can_fit, parse_opening_hours
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell size in degrees (~2.2km of latitude, ~1.4km of longitude in the UK)
+GRID_CELL_DEGREES = 0.02
+
+# Average door-to-door speeds per transport mode
+TRANSPORT_SPEEDS_KMH = {
+    "car": 30.0,
+    "public": 20.0,
+    "cycling": 14.0,
+    "walking": 4.5,
+}
+
+# Roads and paths are never straight lines
+ROUTE_DETOUR_FACTOR = 1.3
+
+# Venues slightly beyond the travel limit are still returned so that
+# score_and_rank can penalise rather than silently drop them
+SEARCH_RADIUS_SLACK = 1.5
+
+# Central Kingston upon Thames, used until a postcode can be resolved
+DEFAULT_ORIGIN = (51.4123, -0.3007)
+
+DEFAULT_CATALOGUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "venues.json")
+
+
+class Venue(NamedTuple):
+    """Immutable, slotted venue record shared by every request."""
+    name: str
+    category: str
+    location: str
+    lat: float
+    lon: float
+    cost_estimate: int
+    baby_friendly_score: float
+    weather_suitable: bool
+    stroller_accessible: bool
+    booking_url: Optional[str] = None
+    opening_hours: Optional[str] = None  # e.g. "Mo-Fr 09:30-17:00; Sa,Su 10:00-16:00"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def transport_speed_kmh(transport_mode: str) -> float:
+    """Average speed for a transport mode, falling back to driving."""
+    return TRANSPORT_SPEEDS_KMH.get(transport_mode, TRANSPORT_SPEEDS_KMH["car"])
+
+
+def estimate_travel_minutes(distance_km: float, transport_mode: str) -> int:
+    """Estimate door-to-door travel time for a straight-line distance."""
+    minutes = distance_km * ROUTE_DETOUR_FACTOR / transport_speed_kmh(transport_mode) * 60
+    return max(1, int(round(minutes)))
+
+
+def travel_radius_km(max_travel_time: int, transport_mode: str) -> float:
+    """Straight-line search radius reachable within the travel time limit."""
+    reachable_km = transport_speed_kmh(transport_mode) * max_travel_time / 60 / ROUTE_DETOUR_FACTOR
+    return reachable_km * SEARCH_RADIUS_SLACK
+
+
+@dataclass
+class CandidateSet:
+    """Per-request view of catalogue venues; venue records are never copied or mutated."""
+    venues: Sequence[Venue]
+    venue_ids: np.ndarray
+    distances_km: np.ndarray
+    travel_times: np.ndarray
+    scores: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.venue_ids)
+
+    def venue(self, position: int) -> Venue:
+        return self.venues[self.venue_ids[position]]
+
+    def take(self, positions: np.ndarray, scores: Optional[np.ndarray] = None) -> "CandidateSet":
+        """Reorder or subset the candidates, optionally attaching new scores."""
+        return CandidateSet(
+            venues=self.venues,
+            venue_ids=self.venue_ids[positions],
+            distances_km=self.distances_km[positions],
+            travel_times=self.travel_times[positions],
+            scores=(self.scores if scores is None else scores)[positions],
+        )
+
+
+def _grid_cell(lat: float, lon: float) -> Tuple[int, int]:
+    return (int(math.floor(lat / GRID_CELL_DEGREES)), int(math.floor(lon / GRID_CELL_DEGREES)))
+
+
+def _haversine_many(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    phi = math.radians(lat)
+    lats = np.radians(lats)
+    a = (np.sin((lats - phi) / 2) ** 2
+         + math.cos(phi) * np.cos(lats) * np.sin((np.radians(lons) - math.radians(lon)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class CatalogueArrays(NamedTuple):
+    """Per-venue arrays behind the spatial index and the opening hours filter."""
+    lat: np.ndarray  # float64
+    lon: np.ndarray  # float64
+    cells: np.ndarray  # int32 (cells, 2): grid row and column of each non-empty cell, sorted
+    cell_indptr: np.ndarray  # int64: cell i holds cell_venues[cell_indptr[i]:cell_indptr[i + 1]]
+    cell_venues: np.ndarray  # int32, ascending within each cell
+    hours_ids: np.ndarray  # int32 index into hours
+    hours: Tuple[Optional[str], ...]  # distinct opening hours; hours[0] is None (always open)
+
+
+def grid_index(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bucket venues into grid cells: (cells, cell_indptr, cell_venues) as in CatalogueArrays."""
+    count = len(lat)
+    rows = np.floor(lat / GRID_CELL_DEGREES).astype(np.int32)
+    cols = np.floor(lon / GRID_CELL_DEGREES).astype(np.int32)
+    order = np.lexsort((np.arange(count), cols, rows))
+    keys = np.stack([rows[order], cols[order]], axis=1)
+    starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+    starts = np.concatenate([[0], starts]) if count else np.empty(0, dtype=np.int64)
+    return keys[starts], np.append(starts, count).astype(np.int64), order.astype(np.int32)
+
+
+def catalogue_arrays(venues: Sequence[Venue]) -> CatalogueArrays:
+    """Build the catalogue arrays for a list of venue records."""
+    count = len(venues)
+    lat = np.fromiter((venue.lat for venue in venues), dtype=np.float64, count=count)
+    lon = np.fromiter((venue.lon for venue in venues), dtype=np.float64, count=count)
+    # Venues share a handful of distinct opening hours, so each is compiled
+    # once and venues point at it
+    hours_ids: Dict[Optional[str], int] = {None: 0}
+    ids = np.fromiter(
+        (hours_ids.setdefault(venue.opening_hours or None, len(hours_ids)) for venue in venues),
+        dtype=np.int32, count=count
+    )
+    return CatalogueArrays(lat, lon, *grid_index(lat, lon), hours_ids=ids, hours=tuple(hours_ids))
+
+
+class VenueCatalogue:
+    """Immutable set of venues with a uniform grid spatial index."""
+
+    def __init__(self, venues: Sequence[Venue], arrays: Optional[CatalogueArrays] = None):
+        self.venues = venues
+        self.arrays = arrays if arrays is not None else catalogue_arrays(venues)
+        self.lat = self.arrays.lat
+        self.lon = self.arrays.lon
+        self._cell_indptr = self.arrays.cell_indptr
+        self._cell_venues = self.arrays.cell_venues
+        self._cell_slots: Dict[Tuple[int, int], int] = {
+            (row, col): slot for slot, (row, col) in enumerate(self.arrays.cells.tolist())
+        }
+        self.hours_patterns: List[WeekHours] = [ALWAYS_OPEN, *(parse_opening_hours(hours) for hours in self.arrays.hours[1:])]
+        self.hours_ids = self.arrays.hours_ids
+
+    def __len__(self) -> int:
+        return len(self.venues)
+
+    @classmethod
+    def from_json(cls, path: str) -> "VenueCatalogue":
+        """Load a catalogue from a JSON list of venue objects."""
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        return cls([Venue(**record) for record in records])
+
+    def can_visit(self, venue_ids: np.ndarray, weekday: int, available: int, minutes: int) -> np.ndarray:
+        """Mask of the venues open for a `minutes` visit inside the `available` slots on that weekday."""
+        fits = np.fromiter(
+            (can_fit(pattern[weekday] & available, minutes) for pattern in self.hours_patterns),
+            dtype=bool, count=len(self.hours_patterns)
+        )
+        return fits[self.hours_ids[venue_ids]]
+
+    def free_slots(self, venue_id: int, weekday: int, available: int) -> int:
+        """Slots of `available` in which the venue is open on that weekday."""
+        return self.hours_patterns[self.hours_ids[venue_id]][weekday] & available
+
+    def cells(self) -> Dict[Tuple[int, int], np.ndarray]:
+        """The grid index, cell -> venue ids, for bulk builders (do not modify)."""
+        return {
+            cell: self._cell_venues[self._cell_indptr[slot]:self._cell_indptr[slot + 1]]
+            for cell, slot in self._cell_slots.items()
+        }
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Venue ids within radius and their distances in km, nearest first."""
+        lat_span = radius_km / 111.32
+        lon_span = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        min_row, min_col = _grid_cell(lat - lat_span, lon - lon_span)
+        max_row, max_col = _grid_cell(lat + lat_span, lon + lon_span)
+
+        slots = [
+            slot
+            for slot in (self._cell_slots.get((row, col)) for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1))
+            if slot is not None
+        ]
+        if not slots:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        venue_ids = np.concatenate([self._cell_venues[self._cell_indptr[slot]:self._cell_indptr[slot + 1]] for slot in slots])
+        distances = _haversine_many(lat, lon, self.lat[venue_ids], self.lon[venue_ids])
+        inside = np.flatnonzero(distances <= radius_km)
+        order = inside[np.argsort(distances[inside], kind="stable")]
+        return venue_ids[order], distances[order]
+
+    def nearby(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Return (venue_id, distance_km) pairs within radius, nearest first."""
+        venue_ids, distances = self.within(lat, lon, radius_km)
+        return list(zip(venue_ids.tolist(), distances.tolist()))
+
+    def candidates_near(self, lat: float, lon: float, max_travel_time: int, transport_mode: str,
+                        origin_minutes: Optional[np.ndarray] = None) -> CandidateSet:
+        """Venues reachable from (lat, lon), with per-request distances and travel times.
+
+        origin_minutes, when given, holds precomputed travel minutes from the
+        origin to every catalogue venue.
+        """
+        venue_ids, distances = self.within(lat, lon, travel_radius_km(max_travel_time, transport_mode))
+        if origin_minutes is not None:
+            travel_times = origin_minutes[venue_ids].astype(np.int32)
+        else:
+            travel_times = np.fromiter((estimate_travel_minutes(distance, transport_mode) for distance in distances.tolist()), dtype=np.int32, count=len(venue_ids))
+        return CandidateSet(
+            venues=self.venues,
+            venue_ids=venue_ids,
+            distances_km=distances.astype(np.float32),
+            travel_times=travel_times,
+            scores=np.zeros(len(venue_ids), dtype=np.float32),
+        )
+
+
+def load_catalogue(path: Optional[str] = None) -> VenueCatalogue:
+    """Load the venue catalogue from VENUE_CATALOGUE_PATH or the bundled file."""
+    path = path or os.getenv("VENUE_CATALOGUE_PATH", DEFAULT_CATALOGUE_PATH)
+    catalogue = VenueCatalogue.from_json(path)
+    logger.info("Loaded %d venues from %s", len(catalogue), path)
+    return catalogue
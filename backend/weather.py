@@ -0,0 +1,284 @@
+"""
+Weather forecasts for the weekend planner.
+
+Forecasts are fetched per region (outward postcode) by a background task
+and kept in memory, so the request path only ever reads the cache and never
+waits on the weather service. A region is fetched the first time a request
+asks for it and then refreshed every WEATHER_REFRESH_SECONDS for as long as
+requests keep asking for it; until its first fetch lands it gets a neutral
+forecast that penalises nothing.
+
+Two providers are available: an Open-Meteo HTTP client on the shared
+connection pool, and a file-backed stub (data/weather.json) used offline
+and in tests. Pick one with WEATHER_PROVIDER.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PROVIDERS = ("file", "http")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_WEATHER_PATH = os.path.join(DATA_DIR, "weather.json")
+DEFAULT_WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Venues in these categories are only weather suitable when the forecast allows
+OUTDOOR_CATEGORIES = frozenset({"Parks & Playgrounds", "Nature Walks", "Farm Visits"})
+
+# Outdoor plans are discouraged at or above this chance of rain, or in these conditions
+RAIN_THRESHOLD_PERCENT = int(os.getenv("WEATHER_RAIN_THRESHOLD_PERCENT", "60"))
+SEVERE_CONDITIONS = frozenset({"thunderstorm", "snow"})
+
+# Matches any date in the file stub
+ANY_DATE = "*"
+
+# Open-Meteo WMO weather codes, by the lowest code in each group
+WMO_CONDITIONS = (
+    (0, "clear"), (1, "partly cloudy"), (45, "fog"), (51, "drizzle"), (61, "rain"),
+    (71, "snow"), (80, "showers"), (85, "snow"), (95, "thunderstorm"),
+)
+
+
+class Forecast(NamedTuple):
+    condition: str
+    precipitation_probability: int  # percent
+    temperature_c: float
+
+    @property
+    def outdoor_ok(self) -> bool:
+        return self.precipitation_probability < RAIN_THRESHOLD_PERCENT and self.condition not in SEVERE_CONDITIONS
+
+    def summary(self) -> str:
+        """Parent-facing one-liner for the plan response."""
+        description = (
+            f"{self.condition.capitalize()} with a {self.precipitation_probability}% chance of rain, "
+            f"around {self.temperature_c:.0f}°C."
+        )
+        if self.outdoor_ok:
+            return f"{description} Lovely for outdoor fun - pack sun cream and a spare layer!"
+        return f"{description} Indoor activities are the safer bet, so bring rain gear if you head outside."
+
+
+# Used until a region's first forecast arrives: no weather penalty
+NEUTRAL_FORECAST = Forecast(condition="unknown", precipitation_probability=0, temperature_c=15.0)
+NEUTRAL_SUMMARY = "Forecast not available yet - pack layers and rain gear just in case!"
+
+# Region forecasts by ISO date (or ANY_DATE)
+DailyForecasts = Dict[str, Forecast]
+
+
+def summarise(forecast: Forecast) -> str:
+    return NEUTRAL_SUMMARY if forecast is NEUTRAL_FORECAST else forecast.summary()
+
+
+def wmo_condition(code: int) -> str:
+    condition = "clear"
+    for lowest, name in WMO_CONDITIONS:
+        if code >= lowest:
+            condition = name
+    return condition
+
+
+class WeatherProvider:
+    """Fetches daily forecasts for one region."""
+
+    async def fetch(self, region: str, lat: float, lon: float) -> DailyForecasts:
+        raise NotImplementedError
+
+
+class FileWeatherProvider(WeatherProvider):
+    """Reads forecasts from a JSON file: {"default": {...}, "regions": {"KT1": {...}}}.
+
+    A region entry is either one forecast for every date or a mapping of
+    ISO dates to forecasts. The file is re-read when it changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = 0.0
+        self._data: Dict = {}
+
+    def _load(self) -> Dict:
+        mtime = os.path.getmtime(self.path)
+        if mtime != self._mtime:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+            self._mtime = mtime
+        return self._data
+
+    async def fetch(self, region: str, lat: float, lon: float) -> DailyForecasts:
+        data = self._load()
+        entry = data.get("regions", {}).get(region, data.get("default"))
+        if entry is None:
+            return {}
+        if "condition" in entry:
+            return {ANY_DATE: Forecast(**entry)}
+        return {day: Forecast(**forecast) for day, forecast in entry.items()}
+
+
+class HTTPWeatherProvider(WeatherProvider):
+    """Open-Meteo daily forecasts over the shared pooled httpx.AsyncClient."""
+
+    def __init__(self, url: str, forecast_days: int = 7):
+        self.url = url
+        self.forecast_days = forecast_days
+
+    async def fetch(self, region: str, lat: float, lon: float) -> DailyForecasts:
+        from llm import get_async_http_client
+
+        response = await get_async_http_client().get(self.url, params={
+            "latitude": round(lat, 3),
+            "longitude": round(lon, 3),
+            "daily": "weathercode,precipitation_probability_max,temperature_2m_max",
+            "forecast_days": self.forecast_days,
+            "timezone": "Europe/London",
+        })
+        response.raise_for_status()
+        daily = response.json()["daily"]
+        return {
+            day: Forecast(
+                condition=wmo_condition(int(code or 0)),
+                precipitation_probability=int(rain or 0),
+                temperature_c=float(temperature or 0.0),
+            )
+            for day, code, rain, temperature in zip(
+                daily["time"], daily["weathercode"], daily["precipitation_probability_max"], daily["temperature_2m_max"]
+            )
+        }
+
+
+class WeatherService:
+    """Per-region forecast cache kept fresh by a background task."""
+
+    def __init__(self, provider: WeatherProvider, refresh_seconds: float, region_ttl_seconds: float,
+                 max_regions: int, concurrency: int):
+        self.provider = provider
+        self.refresh_seconds = refresh_seconds
+        self.region_ttl_seconds = region_ttl_seconds
+        self.max_regions = max_regions
+        self.concurrency = concurrency
+        self.refreshes = 0
+        self.failures = 0
+        self._forecasts: Dict[str, Tuple[float, DailyForecasts]] = {}  # region -> (fetched_at, forecasts)
+        self._wanted: Dict[str, Tuple[float, float, float]] = {}  # region -> (last_requested, lat, lon)
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def forecast_for(self, region: str, lat: float, lon: float, day: str) -> Forecast:
+        """Cached forecast for a region and ISO date; never blocks on the provider."""
+        now = time.monotonic()
+        with self._lock:
+            is_new = region not in self._wanted
+            if is_new and len(self._wanted) >= self.max_regions:
+                # Forget the region nobody has asked about for longest
+                oldest = min(self._wanted, key=lambda name: self._wanted[name][0])
+                del self._wanted[oldest]
+                self._forecasts.pop(oldest, None)
+            self._wanted[region] = (now, lat, lon)
+            entry = self._forecasts.get(region)
+        if is_new and entry is None:
+            self._request_refresh()
+        if entry is None:
+            return NEUTRAL_FORECAST
+        forecasts = entry[1]
+        return forecasts.get(day) or forecasts.get(ANY_DATE) or NEUTRAL_FORECAST
+
+    def _request_refresh(self) -> None:
+        if self._loop is not None and self._wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # Loop already closed during shutdown
+
+    async def refresh(self, force: bool = False) -> int:
+        """Fetch every wanted region that is missing or stale; returns how many were fetched."""
+        now = time.monotonic()
+        with self._lock:
+            # Stop refreshing regions nobody has asked about recently
+            for region in [name for name, (requested, _, _) in self._wanted.items() if now - requested > self.region_ttl_seconds]:
+                del self._wanted[region]
+                self._forecasts.pop(region, None)
+            due = [
+                (region, lat, lon)
+                for region, (_, lat, lon) in self._wanted.items()
+                if force or region not in self._forecasts or now - self._forecasts[region][0] >= self.refresh_seconds
+            ]
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(region: str, lat: float, lon: float) -> None:
+            async with slots:
+                try:
+                    forecasts = await self.provider.fetch(region, lat, lon)
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning("Weather fetch failed for %s: %s", region, e)
+                    return
+            with self._lock:
+                if region in self._wanted:
+                    self._forecasts[region] = (time.monotonic(), forecasts)
+            self.refreshes += 1
+
+        await asyncio.gather(*(fetch(*args) for args in due))
+        return len(due)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            await self.refresh()
+            try:
+                # Wake early when a request asks for a region we have never fetched
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the background refresh task on the running event loop."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "regions": len(self._wanted),
+            "cached": len(self._forecasts),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+def create_weather_service() -> WeatherService:
+    """Build the weather service from WEATHER_* environment variables."""
+    provider_name = os.getenv("WEATHER_PROVIDER", "file")
+    if provider_name not in WEATHER_PROVIDERS:
+        raise ValueError(f"Unknown weather provider {provider_name!r}, expected one of {WEATHER_PROVIDERS}")
+    if provider_name == "http":
+        provider: WeatherProvider = HTTPWeatherProvider(os.getenv("WEATHER_API_URL", DEFAULT_WEATHER_URL))
+    else:
+        provider = FileWeatherProvider(os.getenv("WEATHER_FILE_PATH") or DEFAULT_WEATHER_PATH)
+    return WeatherService(
+        provider,
+        refresh_seconds=float(os.getenv("WEATHER_REFRESH_SECONDS", "1800")),
+        region_ttl_seconds=float(os.getenv("WEATHER_REGION_TTL_SECONDS", str(24 * 60 * 60))),
+        max_regions=int(os.getenv("WEATHER_MAX_REGIONS", "2000")),
+        concurrency=int(os.getenv("WEATHER_CONCURRENCY", "8")),
+    )
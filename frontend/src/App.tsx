@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { ThemeProvider, createTheme } from '@mui/material/styles';
 import CssBaseline from '@mui/material/CssBaseline';
 import { Box, Container, Alert, Snackbar, Typography } from '@mui/material';
@@ -188,8 +188,11 @@ function App() {
   const [currentStep, setCurrentStep] = useState<AppStep>('children');
   const [userProfile, setUserProfile] = useState<UserProfile | null>(null);
   const [weekendResults, setWeekendResults] = useState<WeekendResponse | null>(null);
+  const [lastRequest, setLastRequest] = useState<WeekendRequest | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // Idempotency-Key of the plan request being submitted; a double click or a retry of the same request reuses it
+  const pendingSubmission = useRef<{ body: string; idempotencyKey: string } | null>(null);
 
   const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
@@ -244,27 +247,106 @@ function App() {
     }
   };
 
+  // When only budget, travel time or liked/disliked activities changed, the
+  // server can re-plan from the previous session instead of starting over
+  const sessionDelta = (request: WeekendRequest) => {
+    if (!lastRequest || !weekendResults?.sessionId) return null;
+    const { budget, maxTravelTime, activityPreferences, ...rest } = request;
+    const { budget: _b, maxTravelTime: _t, activityPreferences: lastPreferences, ...lastRest } = lastRequest;
+    const { likedActivities, dislikedActivities, ...otherPreferences } = activityPreferences;
+    const { likedActivities: _l, dislikedActivities: _d, ...lastOtherPreferences } = lastPreferences;
+    if (JSON.stringify(rest) !== JSON.stringify(lastRest) || JSON.stringify(otherPreferences) !== JSON.stringify(lastOtherPreferences)) {
+      return null;
+    }
+    return { budget, maxTravelTime, likedActivities, dislikedActivities };
+  };
+
   const handlePreferencesSubmit = async (request: WeekendRequest) => {
     setLoading(true);
     setError(null);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/simple/weekend-plan`, {
+      const delta = sessionDelta(request);
+      if (delta && weekendResults?.sessionId) {
+        const sessionResponse = await fetch(`${API_BASE_URL}/simple/weekend-plan/session/${weekendResults.sessionId}`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(delta),
+        });
+        // An expired session (404) falls through to a full generation
+        if (sessionResponse.status !== 404) {
+          if (!sessionResponse.ok) {
+            const errorData = await sessionResponse.json();
+            throw new Error(errorData.detail || 'Failed to generate weekend plans');
+          }
+          setWeekendResults(await sessionResponse.json());
+          setLastRequest(request);
+          setCurrentStep('results');
+          return;
+        }
+      }
+
+      const body = JSON.stringify(request);
+      let submission = pendingSubmission.current;
+      if (!submission || submission.body !== body) {
+        submission = { body, idempotencyKey: crypto.randomUUID() };
+        pendingSubmission.current = submission;
+      }
+      const response = await fetch(`${API_BASE_URL}/simple/weekend-plan/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': submission.idempotencyKey,
         },
-        body: JSON.stringify(request),
+        body,
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorData = await response.json();
         throw new Error(errorData.detail || 'Failed to generate weekend plans');
       }
 
-      const results = await response.json();
-      setWeekendResults(results);
-      setCurrentStep('results');
+      // NDJSON: one "plan" frame per plan (cheapest first), then a "summary" frame.
+      // Show the results page as soon as the first plan arrives.
+      let results: WeekendResponse = { plans: [], generationMs: 0, weatherSummary: '' };
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let sawSummary = false;
+      const handleFrame = (line: string) => {
+        if (!line.trim()) return;
+        const frame = JSON.parse(line);
+        if (frame.type === 'plan') {
+          results = { ...results, plans: [...results.plans, frame.plan] };
+          setWeekendResults(results);
+          setCurrentStep('results');
+        } else if (frame.type === 'summary') {
+          sawSummary = true;
+          results = { ...results, generationMs: frame.generationMs, weatherSummary: frame.weatherSummary, sessionId: frame.sessionId, travelTimesFrom: frame.travelTimesFrom };
+          setWeekendResults(results);
+          setCurrentStep('results');
+        } else if (frame.type === 'error') {
+          throw new Error(frame.detail || 'Failed to generate weekend plans');
+        }
+      };
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+        lines.forEach(handleFrame);
+      }
+      handleFrame(buffer);
+      // A stream cut off before its summary frame has no session and may be missing plans
+      if (!sawSummary) {
+        throw new Error('The plan stream ended early; please try again');
+      }
+      // Submitting the same preferences again now asks for fresh plans
+      pendingSubmission.current = null;
+      setLastRequest(request);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An unexpected error occurred');
     } finally {
@@ -296,6 +378,7 @@ function App() {
     setCurrentStep('children');
     setUserProfile(null);
     setWeekendResults(null);
+    setLastRequest(null);
     setError(null);
   };
 
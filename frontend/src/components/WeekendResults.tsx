@@ -111,9 +111,9 @@ const WeekendResults: React.FC<WeekendResultsProps> = ({
           const duration = stop.duration || 90; // Default 90 minutes
           const departureTime = new Date(arrivalTime.getTime() + duration * 60000);
           
-          // Calculate travel time to next stop
+          // Each stop carries the leg into it; the last one also carries the way home
           const nextStop = plan.stops[index + 1];
-          const travelTime = nextStop ? stop.travelTime : 0;
+          const travelTime = nextStop ? nextStop.travelTime : stop.returnTravelTime || 0;
           
           const step = (
             <ListItem key={index} sx={{ 
@@ -250,8 +250,8 @@ const WeekendResults: React.FC<WeekendResultsProps> = ({
                 </CardContent>
               </Card>
               
-              {/* Travel to next stop */}
-              {nextStop && (
+              {/* Travel to the next stop, or home after the last one */}
+              {travelTime > 0 && (
                 <Box display="flex" alignItems="center" mb={2} sx={{ pl: 2 }}>
                   <Box sx={{ 
                     width: 2, 
@@ -268,7 +268,7 @@ const WeekendResults: React.FC<WeekendResultsProps> = ({
                   }}>
                     {getTransportIcon('car')}
                     <Typography variant="body2" sx={{ ml: 1, fontWeight: 600 }}>
-                      {travelTime} min drive to {nextStop.name}
+                      {travelTime} min drive {nextStop ? `to ${nextStop.name}` : 'home'}
                     </Typography>
                   </Box>
                 </Box>
@@ -355,6 +355,11 @@ const WeekendResults: React.FC<WeekendResultsProps> = ({
           }}>
             {results.weatherSummary}
           </Typography>
+          {results.travelTimesFrom === 'district' && (
+            <Typography variant="body2" sx={{ color: '#6B7280', fontSize: '0.875rem', mt: 1 }}>
+              Travel times to and from home are estimated for your postcode district.
+            </Typography>
+          )}
         </Alert>
 
         {/* Plan Selection */}
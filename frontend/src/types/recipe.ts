@@ -55,7 +55,7 @@ export interface ActivityStop {
   note: string;
   location?: string;
   bookingUrl?: string;
-  travelTime: number; // in minutes
+  travelTime: number; // minutes travelling here, from home or the previous stop
   timeBreakdown: string; // detailed breakdown of activities
   topTips: string[];
   pros: string[];
@@ -69,6 +69,9 @@ export interface ActivityStop {
     duration: number;
     instructions: string;
   };
+  returnTravelTime?: number; // last stop only: minutes from here back home
+  lat?: number;
+  lon?: number;
 }
 
 export interface WeekendPlan {
@@ -86,6 +89,8 @@ export interface WeekendResponse {
   plans: WeekendPlan[];
   generationMs: number;
   weatherSummary: string;
+  sessionId?: string; // Send preference tweaks to /simple/weekend-plan/session/{sessionId}
+  travelTimesFrom?: 'home' | 'district'; // 'district' when the plans were cached for another home nearby
 }
 
 // Legacy types for backward compatibility (can be removed later)